@@ -0,0 +1,41 @@
+# coding=utf-8
+
+"""Measures LimitedDict cache hit latency for different cache sizes.
+
+Usage: python -m benchmarks.file_cache
+"""
+
+from __future__ import print_function
+
+import random
+import timeit
+
+from frontik.file_cache import LimitedDict
+
+SIZES = (10, 1000, 10000)
+HITS = 100000
+
+
+def measure_hits(size, step=None):
+    cache = LimitedDict(max_len=size, step=step)
+    for i in range(size):
+        cache[i] = i
+
+    keys = [random.randrange(size) for _ in range(HITS)]
+
+    def hits():
+        for key in keys:
+            cache[key]
+
+    return min(timeit.repeat(hits, number=1, repeat=3)) / HITS * 1e9
+
+
+def main():
+    print('{:>10} {:>20} {:>20}'.format('entries', 'hit, ns (step=None)', 'hit, ns (step=1)'))
+
+    for size in SIZES:
+        print('{:>10} {:>20.1f} {:>20.1f}'.format(size, measure_hits(size), measure_hits(size, step=1)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# coding=utf-8
+
+"""Compares parsing and encoding time of available JSON codecs for different payload sizes.
+
+Usage: python -m benchmarks.json_codec
+"""
+
+from __future__ import print_function
+
+import importlib
+import timeit
+
+from tornado.escape import utf8
+from tornado.options import options
+
+import frontik.options  # noqa
+from frontik.json_builder import _default
+from frontik.json_codec import get_json_codec, JSON_CODECS
+
+SIZES = (10, 1000, 10000)
+
+
+def make_payload(items):
+    return {
+        'items': [
+            {
+                'id': i,
+                'name': u'vacancy {}'.format(i),
+                'salary': {'from': 1000 * i, 'to': None, 'currency': 'RUR', 'gross': i % 2 == 0},
+                'area': {'id': str(i % 100), 'name': u'Москва', 'url': 'https://api.example.com/areas/1'},
+                'tags': ['python', 'tornado', 'lxml'],
+                'score': i / 7.0,
+            } for i in range(items)
+        ],
+        'found': items,
+        'page': 0,
+    }
+
+
+def get_codec_names():
+    names = [None]
+    for name in sorted(JSON_CODECS):
+        try:
+            importlib.import_module(name)
+            names.append(name)
+        except ImportError:
+            pass
+
+    return names
+
+
+def measure(fn, arg):
+    number = 5
+    return min(timeit.repeat(lambda: fn(arg), number=number, repeat=3)) / number * 1000
+
+
+def main():
+    print('{:>12} {:>10} {:>12} {:>10} {:>10}'.format('codec', 'items', 'size, KB', 'loads, ms', 'dumps, ms'))
+
+    for name in get_codec_names():
+        options.json_codec = name
+        codec = get_json_codec()
+
+        for items in SIZES:
+            payload = make_payload(items)
+            body = utf8(codec.dumps(payload, _default))
+
+            print('{:>12} {:>10} {:>12.1f} {:>10.3f} {:>10.3f}'.format(
+                name or 'default', items, len(body) / 1024.0,
+                measure(codec.loads, body), measure(lambda obj: codec.dumps(obj, _default), payload)
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# coding=utf-8
+
+"""Measures logging overhead of a typical page: 50 calls of the request logger (30 debug, 15 info, 5 warning)
+with request context, written to a temporary file with the default log format.
+
+Usage: python -m benchmarks.request_logging
+"""
+
+from __future__ import print_function
+
+import logging
+import os
+import tempfile
+import time
+import timeit
+
+from tornado.options import options
+
+import frontik.options  # noqa
+from frontik.loggers import ROOT_LOGGER, bootstrap_core_logging, set_request_log_context, stop_background_logging
+from frontik.loggers.request import RequestLogger
+from frontik.request_context import RequestContext
+
+LOG_LEVELS = ('debug', 'info', 'warning')
+QUEUE_SIZES = (0, 100000)
+PAGES = 1000
+
+
+class Request(object):
+    def __init__(self):
+        self._start_time = time.time()
+
+
+def handle_page(request_id):
+    with RequestContext({'request_id': request_id}):
+        set_request_log_context(request_id, 'pages.benchmark.Page')
+        log = RequestLogger(Request())
+
+        for i in range(5):
+            log.debug('using %s producer', 'xml')
+            log.debug('requesting %s', 'http://backend/api')
+            log.debug('finished %s "%r" in %.2fms', 'postprocessor', i, 0.5)
+            log.info('got %d %d bytes %s in %.2fms', 200, 1024, 'http://backend/api', 12.3)
+            log.debug('stage "%s" completed in %.2fms', 'page', 1.2)
+            log.info('got %d %d bytes %s in %.2fms', 200, 2048, 'http://backend/other', 15.6)
+            log.debug('applying XSL %s', 'page.xsl')
+            log.debug('applying XSL %s', 'page.xsl')
+            log.info('finished XSLT in %.2fms', 3.4)
+            log.warning('got %d %s in %.2fms', 500, 'http://backend/broken', 20.1)
+            log.debug('stage "%s" completed in %.2fms', 'postprocess', 0.3)
+            log.debug('stage "%s" completed in %.2fms', 'flush', 0.1)
+
+
+def measure(log_level, queue_size, log_file):
+    ROOT_LOGGER.handlers = []
+    options.loglevel = log_level
+    options.logfile = log_file
+    options.log_queue_size = queue_size
+    bootstrap_core_logging()
+
+    def pages():
+        for i in range(PAGES):
+            handle_page(str(i))
+
+    result = min(timeit.repeat(pages, number=1, repeat=3)) / PAGES * 1e6
+
+    stop_background_logging()
+    for handler in ROOT_LOGGER.handlers:
+        handler.close()
+
+    return result
+
+
+def main():
+    log_fd, log_file = tempfile.mkstemp()
+    os.close(log_fd)
+
+    print('{:>10} {:>22} {:>22}'.format(
+        'loglevel', *('page, us (queue={})'.format(queue_size) for queue_size in QUEUE_SIZES)
+    ))
+
+    try:
+        for log_level in LOG_LEVELS:
+            print('{:>10} {:>22.1f} {:>22.1f}'.format(
+                log_level, *(measure(log_level, queue_size, log_file) for queue_size in QUEUE_SIZES)
+            ))
+    finally:
+        ROOT_LOGGER.handlers = []
+        logging.shutdown()
+        os.remove(log_file)
+
+
+if __name__ == '__main__':
+    main()
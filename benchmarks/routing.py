@@ -0,0 +1,103 @@
+# coding=utf-8
+
+"""Compares route lookup in FrontikRouter with sequential regex matching for different numbers of routes.
+FrontikRouter uses sequential matching itself for up to `LINEAR_SCAN_MAX_ROUTES` routes and a trie for more routes.
+The cache is measured with unique query strings, which don't affect the cache key.
+
+Usage: python -m benchmarks.routing
+"""
+
+from __future__ import print_function
+
+import random
+import re
+import timeit
+
+from tornado.options import options
+
+import frontik.options  # noqa
+from frontik.routing import FrontikRouter
+
+SIZES = (10, 50, 100, 1000)
+REQUESTS = 10000
+
+
+class Request(object):
+    def __init__(self, uri):
+        self.uri = uri
+        self.path = uri.partition('?')[0]
+
+
+class Application(object):
+    def __init__(self, urls):
+        self.urls = urls
+
+    def application_urls(self):
+        return self.urls
+
+
+def make_urls(size):
+    urls = []
+    for i in range(size // 2):
+        urls.append(('/section{}/page'.format(i), lambda app, request: None))
+        urls.append(('/section{}/item/(?P<id>[0-9]+)'.format(i), lambda app, request: None))
+
+    return urls
+
+
+def make_uris(size, unique_ids=False, unique_queries=False):
+    uris = []
+    for _ in range(REQUESTS):
+        i = random.randrange(size // 2)
+        if random.random() < 0.5:
+            uri = '/section{}/page'.format(i)
+        else:
+            uri = '/section{}/item/{}'.format(i, random.randrange(1000000) if unique_ids else 1)
+
+        if unique_queries:
+            uri += '?r={}'.format(random.randrange(1000000))
+
+        uris.append(uri)
+
+    return uris
+
+
+def measure_sequential(urls, uris):
+    handlers = [(re.compile(pattern), handler) for pattern, handler in urls]
+
+    def route():
+        for uri in uris:
+            for pattern, handler in handlers:
+                if pattern.match(uri):
+                    break
+
+    return min(timeit.repeat(route, number=1, repeat=3)) / REQUESTS * 1e6
+
+
+def measure_router(urls, uris, cache_size):
+    options.routing_cache_size = cache_size
+    router = FrontikRouter(Application(urls))
+    requests = [Request(uri) for uri in uris]
+
+    def route():
+        for request in requests:
+            router._get_route(request)
+
+    return min(timeit.repeat(route, number=1, repeat=3)) / REQUESTS * 1e6
+
+
+def main():
+    print('{:>8} {:>16} {:>16} {:>16}'.format('routes', 'sequential, us', 'router, us', 'router+cache, us'))
+
+    for size in SIZES:
+        urls = make_urls(size)
+        print('{:>8} {:>16.2f} {:>16.2f} {:>16.2f}'.format(
+            size,
+            measure_sequential(urls, make_uris(size, unique_ids=True)),
+            measure_router(urls, make_uris(size, unique_ids=True), cache_size=0),
+            measure_router(urls, make_uris(size, unique_queries=True), cache_size=1000),
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# coding=utf-8
+
+"""Compares XSLT transformation of a Doc with and without copying the input tree.
+
+Usage: python -m benchmarks.xslt
+"""
+
+from __future__ import print_function
+
+import copy
+import timeit
+
+from lxml import etree
+
+from frontik.doc import Doc
+
+SIZES = (1000, 10000, 100000)
+
+XSL = etree.XSLT(etree.XML(b'''
+<xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+    <xsl:output method="html"/>
+    <xsl:template match="doc">
+        <ul><xsl:apply-templates select="item"/></ul>
+    </xsl:template>
+    <xsl:template match="item">
+        <li id="{@id}"><xsl:value-of select="."/></li>
+    </xsl:template>
+</xsl:stylesheet>
+'''))
+
+
+def make_doc(size):
+    doc = Doc()
+    chunk = etree.Element('chunk')
+    for i in range(size):
+        etree.SubElement(chunk, 'item', id=str(i)).text = 'item {}'.format(i)
+
+    doc.put(list(chunk))
+    return doc
+
+
+def measure(doc, copy_tree):
+    def transform():
+        tree = doc.to_etree_element()
+        str(XSL(copy.deepcopy(tree) if copy_tree else tree))
+
+    return min(timeit.repeat(transform, number=5, repeat=3)) / 5 * 1000
+
+
+def main():
+    print('{:>10} {:>15} {:>22} {:>18}'.format('elements', 'copied nodes', 'with deepcopy, ms', 'without copy, ms'))
+
+    for size in SIZES:
+        doc = make_doc(size)
+        copied_nodes = sum(1 for _ in doc.to_etree_element().iter())
+        print('{:>10} {:>15} {:>22.2f} {:>18.2f}'.format(
+            size, copied_nodes, measure(doc, copy_tree=True), measure(doc, copy_tree=False)
+        ))
+
+
+if __name__ == '__main__':
+    main()
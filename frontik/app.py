@@ -1,24 +1,41 @@
 # coding=utf-8
 
 import importlib
+import logging
+import re
 import time
 from functools import partial
 
 from lxml import etree
 from tornado.concurrent import Future
 from tornado.httpclient import AsyncHTTPClient
+from tornado.ioloop import IOLoop
 from tornado.options import options
 from tornado.stack_context import StackContext
+import tornado.web
 from tornado.web import Application, RequestHandler
 
+import frontik.jobs
+import frontik.metrics
+import frontik.process
 import frontik.producers.json_producer
 import frontik.producers.xml_producer
+from frontik import http_codes
+from frontik.circuit_breaker import circuit_breakers
 from frontik.debug import DebugTransform
-from frontik.handler import ErrorHandler
-from frontik.loggers import bootstrap_app_loggers, request
+from frontik.http_client import OUTER_TIMEOUT_MS_HEADER, request_coalescer, response_cache, retry_budget, upstream_stats
+from frontik.http_client_pool import get_http_client_pools_stats
+from frontik.handler import ErrorHandler, PageHandler
+from frontik.handler_active_limit import make_active_handlers_limit
+from frontik.loggers import bootstrap_app_loggers, get_background_logging_stats, request, set_request_log_context
+from frontik.profiler import (
+    DEFAULT_DURATION, DEFAULT_INTERVAL, MAX_DURATION, MIN_INTERVAL, format_collapsed_stacks, sampling_profiler
+)
 from frontik.request_context import RequestContext
 from frontik.routing import FileMappingRouter, FrontikRouter
 
+app_logger = logging.getLogger('frontik.app')
+
 
 def get_frontik_and_apps_versions(application):
     from frontik.version import version
@@ -39,6 +56,18 @@ def get_frontik_and_apps_versions(application):
     return versions
 
 
+def _get_deadline(request):
+    timeout_ms = request.headers.get(OUTER_TIMEOUT_MS_HEADER)
+    if timeout_ms is None:
+        return None
+
+    try:
+        return time.time() + float(timeout_ms) / 1000
+    except ValueError:
+        app_logger.warning('invalid %s header value: %s', OUTER_TIMEOUT_MS_HEADER, timeout_ms)
+        return None
+
+
 class VersionHandler(RequestHandler):
     def get(self):
         self.set_header('Content-Type', 'text/xml')
@@ -50,12 +79,82 @@ class VersionHandler(RequestHandler):
 class StatusHandler(RequestHandler):
     def get(self):
         self.set_header('Content-Type', 'application/json; charset=UTF-8')
-        self.finish(self.application.get_current_status())
+        status = self.application.get_current_status()
+        # not a part of worker status, which is published every second
+        status['upstreams'] = upstream_stats.get_stats()
+        self.finish(status)
+
+
+class UpstreamsStatusHandler(RequestHandler):
+    def get(self):
+        self.set_header('Content-Type', 'application/json; charset=UTF-8')
+        self.finish(upstream_stats.get_stats())
+
+
+class MetricsHandler(RequestHandler):
+    def get(self):
+        self.set_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.finish(frontik.metrics.registry.expose())
+
+
+class ProfileHandler(PageHandler):
+    """Runs the sampling profiler of the worker for `duration` seconds and returns collapsed stacks"""
+
+    _timeout = None
+
+    def get_page(self):
+        self.require_debug_access()
+
+        duration = self._get_float_argument('duration', DEFAULT_DURATION, 0, MAX_DURATION)
+        interval = self._get_float_argument('interval', DEFAULT_INTERVAL, MIN_INTERVAL, duration)
+
+        if sampling_profiler.running:
+            raise tornado.web.HTTPError(http_codes.CONFLICT, 'profiler is already running')
+
+        app_logger.info('starting profiler for %.2fs with %.3fs interval', duration, interval)
+        sampling_profiler.start(interval)
+        self._timeout = self.add_timeout(time.time() + duration, self.finish_group.add(self._finish_profile))
+
+    def on_connection_close(self):
+        if self._timeout is not None:
+            self.remove_timeout(self._timeout)
+            self._timeout = None
+            sampling_profiler.stop()
+            app_logger.info('profiler is stopped, connection was closed')
+
+        super(ProfileHandler, self).on_connection_close()
+
+    def _finish_profile(self):
+        self._timeout = None
+        samples = sampling_profiler.stop()
+
+        self.set_header('Content-Type', 'text/plain; charset=utf-8')
+        self.text = format_collapsed_stacks(samples)
+
+    def _get_float_argument(self, name, default, min_value, max_value):
+        value = self.get_argument(name, None)
+        if value is None:
+            return default
+
+        try:
+            value = float(value)
+        except ValueError:
+            value = None
+
+        if value is None or not min_value <= value <= max_value:
+            raise tornado.web.HTTPError(
+                http_codes.BAD_REQUEST, '%s must be a number from %s to %s', name, min_value, max_value
+            )
+
+        return value
 
 
 class FrontikApplication(Application):
     request_id = 0
 
+    # producer factories with caches warmed up in the master process before forking workers
+    _preforked_producers = None
+
     class DefaultConfig(object):
         pass
 
@@ -66,12 +165,12 @@ class FrontikApplication(Application):
         if tornado_settings is None:
             tornado_settings = {}
 
-        self.app_settings = settings
-        self.config = self.application_config()
-        self.app = settings.get('app')
+        self._init_config(settings)
 
-        self.xml = frontik.producers.xml_producer.XMLProducerFactory(self)
-        self.json = frontik.producers.json_producer.JsonProducerFactory(self)
+        if FrontikApplication._preforked_producers is not None:
+            self.xml, self.json = FrontikApplication._preforked_producers
+        else:
+            self.xml, self.json = self._create_producer_factories()
 
         AsyncHTTPClient.configure('tornado.curl_httpclient.CurlAsyncHTTPClient', max_clients=options.max_http_clients)
         self.http_client = self.curl_http_client = AsyncHTTPClient()
@@ -79,9 +178,19 @@ class FrontikApplication(Application):
         self.router = FrontikRouter(self)
         self.loggers_initializers = bootstrap_app_loggers(self)
 
-        super(FrontikApplication, self).__init__([
+        service_urls = [
             (r'/version/?', VersionHandler),
             (r'/status/?', StatusHandler),
+            (r'/status/upstreams/?', UpstreamsStatusHandler),
+            (r'/metrics/?', MetricsHandler),
+            (r'/profile/?', ProfileHandler),
+        ]
+
+        # service urls are not limited by active handlers limit
+        self.service_urls_regex = re.compile('|'.join('(?:{})$'.format(pattern) for pattern, _ in service_urls))
+        self.active_limit = make_active_handlers_limit(self._reject_request)
+
+        super(FrontikApplication, self).__init__(service_urls + [
             (r'.*', self.router),
         ], **tornado_settings)
 
@@ -92,8 +201,17 @@ class FrontikApplication(Application):
         if request_id is None:
             request_id = FrontikApplication.next_request_id()
 
-        with StackContext(partial(RequestContext, {'request_id': request_id})):
-            return super(FrontikApplication, self).__call__(request)
+        with StackContext(partial(RequestContext, {'request_id': request_id, 'deadline': _get_deadline(request)})):
+            set_request_log_context(request_id)
+
+            if self.service_urls_regex.match(request.path):
+                return super(FrontikApplication, self).__call__(request)
+
+            self.active_limit.execute(request, partial(super(FrontikApplication, self).__call__, request))
+
+    def _reject_request(self, request):
+        handler = tornado.web.ErrorHandler(self, request, status_code=503)
+        handler._execute([transform(request) for transform in self.transforms])
 
     def reverse_url(self, name, *args, **kwargs):
         return self.router.reverse_url(name, *args, **kwargs)
@@ -114,11 +232,53 @@ class FrontikApplication(Application):
         version.text = 'unknown'
         return [version]
 
+    def _init_config(self, settings):
+        self.app_settings = settings
+        self.config = self.application_config()
+        self.app = settings.get('app')
+
+    def _create_producer_factories(self):
+        return (
+            frontik.producers.xml_producer.XMLProducerFactory(self),
+            frontik.producers.json_producer.JsonProducerFactory(self),
+        )
+
+    @classmethod
+    def warm_up_caches_before_fork(cls, **settings):
+        """Creates producer factories and warms up their caches in the master process.
+
+        Only the configuration of the application is initialized here (`application_config` is called on an instance,
+        which `__init__` was not called for). Worker processes get the factories with compiled XSL files and templates
+        through copy-on-write and do not warm up caches in `init_async`.
+        """
+        application = cls.__new__(cls)
+        application._init_config(settings)
+
+        xml, json = application._create_producer_factories()
+        application.xml, application.json = xml, json
+        application.warm_up_caches()
+
+        FrontikApplication._preforked_producers = (xml, json)
+
     def init_async(self):
+        if options.warm_up_caches and FrontikApplication._preforked_producers is None:
+            self.warm_up_caches()
+
+        if 'process' in (options.xsl_executor, options.json_executor):
+            # worker processes are forked after warming up, so they get compiled XSL files and templates
+            frontik.jobs.get_executor('process').start()
+
         init_future = Future()
         init_future.set_result(None)
         return init_future
 
+    def warm_up_caches(self):
+        """Compiles all XSL files, Jinja templates and loads all XML files into producer caches"""
+        start_time = time.time()
+        self.xml.warm_up(app_logger)
+        self.json.warm_up(app_logger)
+        app_logger.info('caches warmed up in %.2fms', (time.time() - start_time) * 1000)
+
     @staticmethod
     def next_request_id():
         FrontikApplication.request_id += 1
@@ -133,16 +293,31 @@ class FrontikApplication(Application):
         else:
             uptime_value = '{:.2f} hours and {:.2f} minutes'.format(cur_uptime / 3600, (cur_uptime % 3600) / 60)
 
-        return {
+        status = {
             'uptime': uptime_value,
             'workers': {
                 'total': options.max_http_clients,
-                'free':  len(self.curl_http_client._free_list)
-            }
+                'free':  len(self.curl_http_client._free_list),
+                'queued': len(self.curl_http_client._requests)
+            },
+            'handlers': self.active_limit.get_stats(),
+            'coalescing': request_coalescer.get_stats(),
+            'http_cache': response_cache.get_stats(),
+            'circuit_breakers': circuit_breakers.get_stats(),
+            'hedging': retry_budget.get_stats(),
+            'pools': get_http_client_pools_stats(),
+            'logging': get_background_logging_stats()
         }
 
+        if frontik.process.status_storage is not None:
+            status['processes'] = frontik.process.get_workers_status()
+
+        return status
+
     def log_request(self, handler):
+        self.active_limit.release(handler.request)
         super(FrontikApplication, self).log_request(handler)
         if isinstance(getattr(handler, 'log', None), request.RequestLogger):
             handler.log.stage_tag('flush')
             handler.log.log_stages(handler.get_status())
+            handler.log.log_access(handler.request.method, handler.get_status())
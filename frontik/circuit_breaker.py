@@ -0,0 +1,133 @@
+# coding=utf-8
+
+import logging
+import time
+from collections import deque
+
+from tornado.options import options
+
+from frontik.file_cache import LimitedDict
+
+circuit_breaker_logger = logging.getLogger('frontik.circuit_breaker')
+
+
+class CircuitBreaker(object):
+    """Stops sending requests to an upstream host, which fails too often.
+
+    Results of the last `window` requests are kept. A request fails if it got 5xx or 599 status code
+    or took more than `slow_time` seconds (when `slow_time` is set). When there are at least `min_requests` results
+    and the share of failed ones reaches `error_rate`, the circuit is opened and requests are not sent
+    for `open_time` seconds. After that a single probe request is allowed (the circuit is half-open):
+    the circuit is closed if it succeeds and opened again otherwise.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, host, window, min_requests, error_rate, slow_time, open_time):
+        self.host = host
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.slow_time = slow_time
+        self.open_time = open_time
+
+        self.state = CircuitBreaker.CLOSED
+        self.results = deque(maxlen=window)
+        self.failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def allow_request(self, request):
+        if self.state == CircuitBreaker.CLOSED:
+            return True
+
+        if self.state == CircuitBreaker.OPEN:
+            if time.time() < self.opened_at + self.open_time:
+                return False
+
+            self._set_state(CircuitBreaker.HALF_OPEN)
+
+        if self.probe_in_flight:
+            return False
+
+        self.probe_in_flight = True
+        request._frontik_circuit_breaker_probe = True
+        return True
+
+    def add_result(self, request, response):
+        failed = (
+            response.code == 599 or response.code >= 500 or
+            bool(self.slow_time) and response.request_time > self.slow_time
+        )
+
+        if self.state == CircuitBreaker.HALF_OPEN:
+            # ignore responses to requests sent before the circuit was opened
+            if getattr(request, '_frontik_circuit_breaker_probe', False):
+                self.probe_in_flight = False
+                self._set_state(CircuitBreaker.OPEN if failed else CircuitBreaker.CLOSED)
+            return
+
+        if self.state == CircuitBreaker.OPEN:
+            return
+
+        if len(self.results) == self.results.maxlen:
+            self.failures -= self.results[0]
+
+        self.results.append(failed)
+        self.failures += failed
+
+        if len(self.results) >= self.min_requests and self.failures >= self.error_rate * len(self.results):
+            circuit_breaker_logger.warning(
+                '%d of %d last requests to %s failed', self.failures, len(self.results), self.host
+            )
+            self._set_state(CircuitBreaker.OPEN)
+
+    def cancel_request(self, request):
+        if getattr(request, '_frontik_circuit_breaker_probe', False):
+            self.probe_in_flight = False
+
+    def _set_state(self, state):
+        circuit_breaker_logger.warning('circuit breaker for %s is %s', self.host, state.replace('_', '-'))
+        self.state = state
+
+        if state == CircuitBreaker.OPEN:
+            self.opened_at = time.time()
+        elif state == CircuitBreaker.CLOSED:
+            self.results.clear()
+            self.failures = 0
+
+
+class CircuitBreakers(object):
+    """Circuit breakers for upstream hosts, at most `http_client_stats_hosts` recently used ones"""
+
+    def __init__(self):
+        self._breakers = None
+        self.rejected = 0
+
+    def get(self, host):
+        if self._breakers is None:
+            self._breakers = LimitedDict(options.http_client_stats_hosts)
+
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(
+                host,
+                options.http_client_circuit_breaker_window,
+                options.http_client_circuit_breaker_min_requests,
+                options.http_client_circuit_breaker_error_rate,
+                options.http_client_circuit_breaker_slow_time,
+                options.http_client_circuit_breaker_open_time
+            )
+
+        return breaker
+
+    def get_stats(self):
+        breakers = [self._breakers.get(host) for host in self._breakers.keys()] if self._breakers is not None else []
+
+        return {
+            'open': sorted(b.host for b in breakers if b.state == CircuitBreaker.OPEN),
+            'half_open': sorted(b.host for b in breakers if b.state == CircuitBreaker.HALF_OPEN),
+            'rejected': self.rejected,
+        }
+
+
+circuit_breakers = CircuitBreakers()
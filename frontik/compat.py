@@ -3,14 +3,16 @@
 import sys
 
 __all__ = [
-    'basestring_type', 'iteritems', 'long_type', 'SimpleCookie', 'unicode_type',
+    'basestring_type', 'iteritems', 'long_type', 'MutableMapping', 'queue', 'SimpleCookie', 'unicode_type',
     'urlencode', 'urlparse'
 ]
 
 PY3 = sys.version_info >= (3,)
 
 if PY3:
+    import queue
     import urllib.parse as urlparse
+    from collections.abc import MutableMapping
     from urllib.parse import urlencode
 
     basestring_type = str
@@ -21,6 +23,8 @@ if PY3:
         return d.items(**kw)
 
 else:
+    import Queue as queue
+    from collections import MutableMapping
     from urllib import urlencode
     import urlparse
 
@@ -1,7 +1,6 @@
 # coding=utf-8
 
 import base64
-import copy
 import inspect
 import logging
 import os
@@ -17,6 +16,7 @@ from lxml.builder import E
 from tornado.escape import to_unicode, utf8
 from tornado.httpclient import HTTPResponse
 from tornado.httputil import HTTPHeaders
+from tornado.options import options
 from tornado.web import OutputTransform
 
 import frontik.util
@@ -28,7 +28,7 @@ from frontik.request_context import RequestContext
 debug_log = logging.getLogger('frontik.debug')
 
 
-def response_to_xml(response):
+def response_to_xml(response, max_body_size=None):
     time_info = etree.Element('time_info')
     content_type = response.headers.get('Content-Type', '')
     mode = ''
@@ -41,7 +41,9 @@ def response_to_xml(response):
     try_charsets = (charset, 'cp1251')
 
     try:
-        if 'text/html' in content_type:
+        if max_body_size is not None and response.body is not None and len(response.body) > max_body_size:
+            body = _truncate_body(response.body, charset, max_body_size)
+        elif 'text/html' in content_type:
             body = frontik.util.decode_string_from_charset(response.body, try_charsets)
             body = body.replace('\r', '\\r').replace('\n', '\\n').replace("'", "\\'").replace("<", "&lt;")
         elif 'protobuf' in content_type:
@@ -87,13 +89,24 @@ def response_to_xml(response):
     return response
 
 
-def request_to_xml(request):
+def _truncate_body(body, charset, max_body_size):
+    try:
+        text = body[:max_body_size].decode(charset, 'ignore')
+    except LookupError:
+        text = body[:max_body_size].decode('utf-8', 'ignore')
+
+    return u'{}\n... ({} bytes total, truncated)'.format(text, len(body))
+
+
+def request_to_xml(request, max_body_size=None):
     content_type = request.headers.get('Content-Type', '')
     body = etree.Element('body', content_type=content_type)
 
     if request.body:
         try:
-            if 'json' in content_type:
+            if max_body_size is not None and len(request.body) > max_body_size:
+                body.text = _truncate_body(request.body, 'utf-8', max_body_size)
+            elif 'json' in content_type:
                 body.text = _pretty_print_json(json.loads(request.body))
             elif 'protobuf' in content_type:
                 body.text = repr(request.body)
@@ -272,16 +285,70 @@ def _pretty_print_json(node):
 
 
 class DebugBufferedHandler(BufferedHandler):
+    """Converts log records of the request to debug log entries as soon as they are logged.
+
+    Records (and responses or exceptions attached to them) are not kept until the end of the request.
+    Request and response bodies longer than `debug_response_body_limit` bytes are truncated, and after the total size
+    of entries reaches `debug_log_size_limit` bytes, bodies are not added at all. Debug logs of inherited requests,
+    XSLT profiles and exception traces are added only if they fit into `debug_log_size_limit` as a whole
+    (exceptions are replaced with truncated tracebacks otherwise).
+    """
+
     FIELDS = ['created', 'filename', 'funcName', 'levelname', 'levelno', 'lineno', 'module', 'msecs',
               'name', 'pathname', 'process', 'processName', 'relativeCreated', 'threadName']
 
+    def __init__(self, level=logging.NOTSET):
+        super(DebugBufferedHandler, self).__init__(level)
+        self.log_data = etree.Element('log')
+        self.size = 0
+        self.truncated = 0
+
+    def handle(self, record):
+        try:
+            entry = self._produce_one(record)
+        except Exception:
+            entry = E.entry(E.text(traceback.format_exc()), msg='cannot produce log entry', levelname='ERROR')
+
+        self.log_data.append(entry)
+
     def produce_all(self):
-        log_data = etree.Element('log')
+        if self.truncated:
+            self.log_data.set('truncated-bodies', str(self.truncated))
+
+        return self.log_data
 
-        for record in self.records:
-            log_data.append(self._produce_one(record))
+    def _get_max_body_size(self, body):
+        body_size = len(body) if body is not None else 0
+        max_body_size = max(0, min(options.debug_response_body_limit, options.debug_log_size_limit - self.size))
 
-        return copy.deepcopy(log_data)
+        if body_size > max_body_size:
+            self.truncated += 1
+
+        self.size += min(body_size, max_body_size)
+        return max_body_size
+
+    def _fits(self, node):
+        size = len(etree.tostring(node))
+        if self.size + size > options.debug_log_size_limit:
+            self.truncated += 1
+            return False
+
+        self.size += size
+        return True
+
+    def _exception_to_xml(self, exc_info):
+        exc_node = _exception_to_xml(exc_info)
+        if self._fits(exc_node):
+            return exc_node
+
+        text = ''.join(map(to_unicode, traceback.format_exception(*exc_info)))
+        body = text.encode('utf-8')
+        max_body_size = self._get_max_body_size(body)
+
+        if len(body) > max_body_size:
+            text = _truncate_body(body, 'utf-8', max_body_size)
+
+        return E.exception(E.text(text))
 
     def _produce_one(self, record):
         entry_attrs = {}
@@ -291,6 +358,7 @@ class DebugBufferedHandler(BufferedHandler):
                 entry_attrs[field] = to_unicode(str(val))
 
         entry_attrs['msg'] = to_unicode(record.getMessage())
+        self.size += len(entry_attrs['msg'])
 
         try:
             entry = etree.Element('entry', **entry_attrs)
@@ -301,7 +369,7 @@ class DebugBufferedHandler(BufferedHandler):
         entry.set('asctime', str(datetime.fromtimestamp(record.created)))
 
         if record.exc_info is not None:
-            entry.append(_exception_to_xml(record.exc_info))
+            entry.append(self._exception_to_xml(record.exc_info))
 
         if getattr(record, '_labels', None) is not None:
             labels = E.labels()
@@ -310,15 +378,15 @@ class DebugBufferedHandler(BufferedHandler):
             entry.append(labels)
 
         if getattr(record, '_response', None) is not None:
-            entry.append(response_to_xml(record._response))
+            entry.append(response_to_xml(record._response, self._get_max_body_size(record._response.body)))
 
         if getattr(record, '_request', None) is not None:
-            entry.append(request_to_xml(record._request))
+            entry.append(request_to_xml(record._request, self._get_max_body_size(record._request.body)))
 
-        if getattr(record, '_debug_response', None) is not None:
+        if getattr(record, '_debug_response', None) is not None and self._fits(record._debug_response):
             entry.append(E.debug(record._debug_response))
 
-        if getattr(record, '_xslt_profile', None) is not None:
+        if getattr(record, '_xslt_profile', None) is not None and self._fits(record._xslt_profile):
             entry.append(record._xslt_profile)
 
         if getattr(record, '_xml', None) is not None:
@@ -343,6 +411,16 @@ class DebugBufferedHandler(BufferedHandler):
 DEBUG_HEADER_NAME = 'X-Hh-Debug'
 DEBUG_XSL = os.path.join(os.path.dirname(__file__), 'debug/debug.xsl')
 
+_debug_xsl_transform = None
+
+
+def _get_debug_xsl_transform():
+    global _debug_xsl_transform
+    if _debug_xsl_transform is None:
+        _debug_xsl_transform = etree.XSLT(etree.parse(DEBUG_XSL))
+
+    return _debug_xsl_transform
+
 
 class DebugTransform(OutputTransform):
     def __init__(self, application, request):
@@ -439,7 +517,7 @@ class DebugTransform(OutputTransform):
 
         if not getattr(self.request, '_debug_inherited', False):
             try:
-                transform = etree.XSLT(etree.parse(DEBUG_XSL))
+                transform = _get_debug_xsl_transform()
                 log_document = utf8(str(transform(debug_log_data)))
             except Exception:
                 debug_log.exception('XSLT debug file error')
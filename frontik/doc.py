@@ -1,11 +1,21 @@
 # coding=utf-8
 
-import lxml.etree as etree
+import logging
+import re
+import uuid
 
+import lxml.etree as etree
 from tornado.concurrent import Future
 
 from frontik.compat import basestring_type, iteritems
-from frontik.http_client import RequestResult
+from frontik.http_client import FailedRequestException, RequestResult, XML_CONTENT_TYPE, _parse_response_xml
+
+doc_logger = logging.getLogger('frontik.doc')
+
+_RAW_XML_PLACEHOLDER = 'frontik-raw-xml-{}-'.format(uuid.uuid4().hex)
+_RAW_XML_PLACEHOLDER_RE = re.compile(b'<!--' + _RAW_XML_PLACEHOLDER.encode('ascii') + b'([0-9]+)-->')
+_XML_DECLARATION_RE = re.compile(br'^\s*<\?xml[^>]*\?>')
+_XML_ENCODING_RE = re.compile(br'encoding=["\']([^"\']*)["\']')
 
 
 def _is_valid_element(node):
@@ -18,6 +28,51 @@ def _is_valid_element(node):
     return True
 
 
+def _is_raw_xml_result(chunk):
+    if chunk.exception is not None or not isinstance(chunk.data, bytes) or chunk.response is None:
+        return False
+
+    return XML_CONTENT_TYPE.search(chunk.response.headers.get('Content-Type', '')) is not None
+
+
+def _get_raw_xml(body):
+    """Returns the body without XML declaration or None if it can not be inserted into utf-8 document as is"""
+    if body.startswith(b'\xef\xbb\xbf'):
+        body = body[3:]
+
+    declaration = _XML_DECLARATION_RE.match(body)
+    if declaration is not None:
+        encoding = _XML_ENCODING_RE.search(declaration.group(0))
+        if encoding is not None and encoding.group(1).lower() not in (b'utf-8', b'utf8'):
+            return None
+
+        body = body[declaration.end():]
+
+    body = body.strip()
+    if not body.startswith(b'<') or body.startswith(b'<!') or body.startswith(b'<?'):
+        return None
+
+    if not _is_well_formed(body):
+        return None
+
+    return body
+
+
+class _NoTreeTarget(object):
+    """Parser target, which does not build the tree, so that parsing only checks well-formedness"""
+
+    def close(self):
+        return None
+
+
+def _is_well_formed(body):
+    try:
+        etree.fromstring(body, etree.XMLParser(target=_NoTreeTarget()))
+        return True
+    except etree.XMLSyntaxError:
+        return False
+
+
 class Doc(object):
     __slots__ = ('root_node', 'data')
 
@@ -49,8 +104,34 @@ class Doc(object):
     def get_error_node(exception):
         return etree.Element('error', **{k: str(v) for k, v in iteritems(exception.attrs)})
 
+    def resolve_results(self):
+        """Parses lazy results of requests in the doc. Must be called in the IOLoop thread before the doc
+        is converted to etree in another thread, because parsing uses the response cache and the request context"""
+
+        def resolve(chunk):
+            if isinstance(chunk, list):
+                for chunk_i in chunk:
+                    resolve(chunk_i)
+
+            elif isinstance(chunk, Doc):
+                chunk.resolve_results()
+
+            elif isinstance(chunk, RequestResult):
+                if chunk.exception is None:
+                    resolve(chunk.data)
+
+            elif isinstance(chunk, Future):
+                if chunk.done():
+                    resolve(chunk.result())
+
+        resolve(self.root_node)
+        resolve(self.data)
+
     def to_etree_element(self):
-        res = self.root_node.to_etree_element() if isinstance(self.root_node, Doc) else self.root_node
+        return self._to_etree_element(None)
+
+    def _to_etree_element(self, raw_chunks):
+        res = self.root_node._to_etree_element(raw_chunks) if isinstance(self.root_node, Doc) else self.root_node
 
         def chunk_to_element(chunk):
             if isinstance(chunk, list):
@@ -58,12 +139,18 @@ class Doc(object):
                     for i in chunk_to_element(chunk_i):
                         yield i
 
+            elif isinstance(chunk, Doc):
+                yield chunk._to_etree_element(raw_chunks)
+
             elif hasattr(chunk, 'to_etree_element'):
                 yield chunk.to_etree_element()
 
             elif isinstance(chunk, RequestResult):
                 if chunk.exception is not None:
                     yield self.get_error_node(chunk.exception)
+                elif _is_raw_xml_result(chunk):
+                    for i in raw_xml_to_element(chunk):
+                        yield i
                 else:
                     for i in chunk_to_element(chunk.data):
                         yield i
@@ -79,10 +166,30 @@ class Doc(object):
             elif chunk is not None:
                 raise ValueError('Unexpected value of type {} in doc'.format(type(chunk)))
 
+        def raw_xml_to_element(chunk):
+            raw_xml = _get_raw_xml(chunk.data) if raw_chunks is not None else None
+
+            if raw_xml is not None:
+                raw_chunks.append(raw_xml)
+                yield etree.Comment(_RAW_XML_PLACEHOLDER + str(len(raw_chunks) - 1))
+                return
+
+            try:
+                yield _parse_response_xml(chunk.response, logger=doc_logger)
+            except FailedRequestException as ex:
+                yield self.get_error_node(ex)
+
         for chunk_element in chunk_to_element(self.data):
             res.append(chunk_element)
 
         return res
 
     def to_string(self):
-        return etree.tostring(self.to_etree_element(), encoding='utf-8', xml_declaration=True)
+        """Well-formed XML bodies of results of requests made with `parse_response=False` are inserted as is"""
+        raw_chunks = []
+        result = etree.tostring(self._to_etree_element(raw_chunks), encoding='utf-8', xml_declaration=True)
+
+        if raw_chunks:
+            result = _RAW_XML_PLACEHOLDER_RE.sub(lambda match: raw_chunks[int(match.group(1))], result)
+
+        return result
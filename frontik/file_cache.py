@@ -1,62 +1,230 @@
 import copy
 import os
+import time
 
 import tornado.options
 
+from frontik.compat import MutableMapping
+from frontik.metrics import Counter
+
+FILE_CACHE_HITS = Counter('frontik_file_cache_hits_total', 'Hits of file caches by cache name', ['cache'])
+FILE_CACHE_MISSES = Counter('frontik_file_cache_misses_total', 'Misses of file caches by cache name', ['cache'])
+
+
+class LimitedDict(MutableMapping):
+    """Dictionary with a limited number of items and LRU eviction policy.
+
+    Items are kept in a doubly-linked list, from the least recently used to the most recently used one.
+    If `step` is set, new items are inserted at `step` position from the eviction end
+    and each access moves the item `step` positions away from it, otherwise
+    new and accessed items are moved straight to the most recently used end.
+    All operations are O(1) (O(step) when `step` is set).
+
+    `LimitedDict` implements `MutableMapping` interface, but it is not a subclass of `dict`.
+    Iteration, `keys`, `values` and `items` go from the least recently used item to the most recently used one
+    and do not change the order of items.
+    """
+
+    PREV, NEXT, KEY, VALUE = 0, 1, 2, 3
 
-# This implementation is broken in so many ways
-class LimitedDict(dict):
     def __init__(self, max_len=None, step=None, deepcopy=False):
-        dict.__init__(self)
-        self._order = []
+        self._map = {}
+        self._root = root = []
+        root[:] = [root, root, None, None]
+
         self.max_len = max_len
         self.step = step
         self.deepcopy = deepcopy
 
+    def __len__(self):
+        return len(self._map)
+
+    def __contains__(self, key):
+        return key in self._map
+
     def __getitem__(self, key):
-        val = dict.__getitem__(self, key)
+        node = self._map[key]
+
         if self.max_len is not None:
             if self.step:
-                ind = self._order.index(key)
-                self._order.remove(key)
-                self._order.insert(ind+self.step, key)
+                prev_node = node[self.PREV]
+                self._unlink(node)
+                self._link_after(self._walk(prev_node, self.step), node)
             else:
-                self._order.remove(key)
-                self._order.append(key)
+                self._unlink(node)
+                self._link_after(self._root[self.PREV], node)
+
+        val = node[self.VALUE]
         return copy.deepcopy(val) if self.deepcopy else val
 
     def __setitem__(self, key, value):
-        dict.__setitem__(self, key, value)
-        if self.max_len is not None:
-            if self.step:
-                self._order.insert(self.step, key)
-            else:
-                self._order.append(key)
-        if self.max_len is not None and len(self._order) > self.max_len:
-            self.pop(self._order.pop(0))
+        node = self._map.get(key)
+        if node is not None:
+            self._unlink(node)
+
+        node = [None, None, key, value]
+        self._map[key] = node
+
+        if self.step:
+            self._link_after(self._walk(self._root, self.step), node)
+        else:
+            self._link_after(self._root[self.PREV], node)
+
+        if self.max_len is not None and len(self._map) > self.max_len:
+            self.pop(self._root[self.NEXT][self.KEY])
+
+    def __delitem__(self, key):
+        self._unlink(self._map.pop(key))
+
+    def get(self, key, default=None):
+        return self[key] if key in self._map else default
+
+    def pop(self, key, *default):
+        if key not in self._map and default:
+            return default[0]
+
+        node = self._map.pop(key)
+        self._unlink(node)
+        return node[self.VALUE]
+
+    def clear(self):
+        self._map.clear()
+        self._root[:] = [self._root, self._root, None, None]
+
+    def __iter__(self):
+        for node in self._iter_nodes():
+            yield node[self.KEY]
+
+    def keys(self):
+        return [node[self.KEY] for node in self._iter_nodes()]
+
+    def values(self):
+        return [copy.deepcopy(node[self.VALUE]) if self.deepcopy else node[self.VALUE] for node in self._iter_nodes()]
+
+    def items(self):
+        return list(zip(self.keys(), self.values()))
+
+    def _iter_nodes(self):
+        node = self._root[self.NEXT]
+        while node is not self._root:
+            yield node
+            node = node[self.NEXT]
+
+    def _walk(self, node, steps):
+        for _ in range(steps):
+            if node[self.NEXT] is self._root:
+                break
+            node = node[self.NEXT]
+
+        return node
+
+    def _link_after(self, prev_node, node):
+        next_node = prev_node[self.NEXT]
+        node[self.PREV] = prev_node
+        node[self.NEXT] = next_node
+        prev_node[self.NEXT] = next_node[self.PREV] = node
+
+    def _unlink(self, node):
+        prev_node, next_node = node[self.PREV], node[self.NEXT]
+        prev_node[self.NEXT] = next_node
+        next_node[self.PREV] = prev_node
 
 
 class FileCache(object):
     """
     load_fn :: filename -> (status, result)
+
+    If `revalidate_interval` is set, the file is checked with `os.stat` on cache hit at most once in
+    `revalidate_interval` seconds, and reloaded if its inode, modification time or size has changed.
     """
-    def __init__(self, cache_name, root_dir, load_fn, max_len=None, step=None, deepcopy=False):
+
+    class Entry(object):
+        __slots__ = ('value', 'stat', 'next_check')
+
+        def __init__(self, value, stat, next_check):
+            self.value = value
+            self.stat = stat
+            self.next_check = next_check
+
+    def __init__(self, cache_name, root_dir, load_fn, max_len=None, step=None, deepcopy=False,
+                 revalidate_interval=None):
         self.cache_name = cache_name
         self.root_dir = root_dir
         self.load_fn = load_fn
-        self.cache = LimitedDict(max_len, step, deepcopy)
+        self.deepcopy = deepcopy
+        self.revalidate_interval = revalidate_interval
+        self.cache = LimitedDict(max_len, step)
+
+        self._hits = FILE_CACHE_HITS.labels(cache_name)
+        self._misses = FILE_CACHE_MISSES.labels(cache_name)
 
     def load(self, filename, log):
         if filename in self.cache:
-            log.debug('got %s file from cache (%s cache size: %s)', filename, self.cache_name, len(self.cache))
-            return self.cache[filename]
+            entry = self.cache[filename]
+
+            if self.revalidate_interval is None or not self._is_stale(entry, filename):
+                self._hits.inc()
+                log.debug('got %s file from cache (%s cache size: %s)', filename, self.cache_name, len(self.cache))
+                return copy.deepcopy(entry.value) if self.deepcopy else entry.value
+
+            log.info('file %s has changed, reloading', filename)
+
+        self._misses.inc()
+        real_filename = self._get_real_filename(filename)
+        stat = self._get_stat(real_filename) if self.revalidate_interval is not None else None
 
-        real_filename = os.path.normpath(os.path.join(self.root_dir, filename))
         log.debug('reading file "%s"', real_filename)
         result = self.load_fn(real_filename, log)
-        self.cache[filename] = result
+        self.cache[filename] = FileCache.Entry(result, stat, self._get_next_check())
+
+        return copy.deepcopy(result) if self.deepcopy else result
+
+    def warm_up(self, log, extension=None):
+        """Loads all files from `root_dir` with the given extension into the cache"""
+        if self.cache.max_len == 0:
+            log.info('%s cache is disabled, skipping warm up', self.cache_name)
+            return
+
+        for dir_path, _, filenames in os.walk(self.root_dir):
+            for name in sorted(filenames):
+                if extension is not None and not name.endswith(extension):
+                    continue
+
+                filename = os.path.relpath(os.path.join(dir_path, name), self.root_dir)
+                start_time = time.time()
+
+                try:
+                    self.load(filename, log)
+                    load_time = (time.time() - start_time) * 1000
+                    log.info('loaded %s file %s in %.2fms', self.cache_name, filename, load_time)
+                except Exception as e:
+                    log.warning('failed to load %s file %s: %s', self.cache_name, filename, e)
+
+    def _is_stale(self, entry, filename):
+        now = time.time()
+        if now < entry.next_check:
+            return False
 
-        return result
+        entry.next_check = self._get_next_check(now)
+        return self._get_stat(self._get_real_filename(filename)) != entry.stat
+
+    def _get_next_check(self, now=None):
+        if self.revalidate_interval is None:
+            return None
+
+        return (time.time() if now is None else now) + self.revalidate_interval
+
+    def _get_real_filename(self, filename):
+        return os.path.normpath(os.path.join(self.root_dir, filename))
+
+    @staticmethod
+    def _get_stat(real_filename):
+        try:
+            stat = os.stat(real_filename)
+        except OSError:
+            return None
+
+        return stat.st_ino, stat.st_mtime, stat.st_size
 
 
 class InvalidOptionCache(object):
@@ -66,11 +234,15 @@ class InvalidOptionCache(object):
     def load(self, filename, *args, **kwargs):
         raise Exception('{0} option is undefined'.format(self.option))
 
+    def warm_up(self, *args, **kwargs):
+        pass
+
 
-def make_file_cache(cache_name, option_name, root_dir, fun, max_len=None, step=None, deepcopy=False):
+def make_file_cache(cache_name, option_name, root_dir, fun, max_len=None, step=None, deepcopy=False,
+                    revalidate_interval=None):
     if root_dir:
         # disable cache in development environment
         max_len = 0 if tornado.options.options.debug else max_len
-        return FileCache(cache_name, root_dir, fun, max_len, step, deepcopy)
+        return FileCache(cache_name, root_dir, fun, max_len, step, deepcopy, revalidate_interval)
     else:
         return InvalidOptionCache(option_name)
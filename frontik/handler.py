@@ -10,7 +10,6 @@ import tornado.web
 from tornado.ioloop import IOLoop
 
 import frontik.auth
-import frontik.handler_active_limit
 import frontik.producers.json_producer
 import frontik.producers.xml_producer
 import frontik.util
@@ -19,6 +18,7 @@ from frontik.compat import iteritems
 from frontik.debug import DebugMode
 from frontik.http_client import HttpClient
 from frontik.http_codes import process_status_code
+from frontik.loggers import set_request_log_context
 from frontik.loggers.request import RequestLogger
 from frontik.request_context import RequestContext
 
@@ -49,6 +49,9 @@ class BaseHandler(tornado.web.RequestHandler):
 
     preprocessors = ()
 
+    # time in seconds from the start of the request, after which requests to backends are not sent
+    page_timeout = None
+
     def __init__(self, application, request, **kwargs):
         self._prepared = False
         self.name = self.__class__.__name__
@@ -79,7 +82,6 @@ class BaseHandler(tornado.web.RequestHandler):
         super(BaseHandler, self).initialize(**kwargs)
 
     def prepare(self):
-        self.active_limit = frontik.handler_active_limit.PageHandlerActiveLimit(self)
         self.debug_mode = DebugMode(self)
         self.finish_group = AsyncGroup(self.check_finished(self._finish_page_cb), name='finish')
 
@@ -90,6 +92,11 @@ class BaseHandler(tornado.web.RequestHandler):
         self.xml = self.xml_producer  # deprecated synonym
         self.doc = self.xml_producer.doc
 
+        if self.page_timeout is not None:
+            deadline = self.request._start_time + self.page_timeout
+            outer_deadline = RequestContext.get('deadline')
+            RequestContext.set('deadline', deadline if outer_deadline is None else min(deadline, outer_deadline))
+
         self._prepared = True
 
         super(BaseHandler, self).prepare()
@@ -158,6 +165,7 @@ class BaseHandler(tornado.web.RequestHandler):
 
     def _execute(self, transforms, *args, **kwargs):
         RequestContext.set('handler_name', repr(self))
+        set_request_log_context(self.request_id, repr(self))
         return super(BaseHandler, self)._execute(transforms, *args, **kwargs)
 
     @tornado.web.asynchronous
@@ -355,8 +363,13 @@ class BaseHandler(tornado.web.RequestHandler):
         return super(BaseHandler, self).write_error(status_code, **kwargs)
 
     def cleanup(self):
-        if hasattr(self, 'active_limit'):
-            self.active_limit.release()
+        # responses to remaining requests and results of templating can't be used anymore
+        self._http_client.cancel_requests()
+        if self._prepared:
+            self.xml_producer.cancel()
+            self.json_producer.cancel()
+
+        self.application.active_limit.release(self.request)
 
     def finish(self, chunk=None):
         self.log.stage_tag('postprocess')
@@ -422,50 +435,58 @@ class PageHandler(BaseHandler):
 
     def get_url(self, url, data=None, headers=None, connect_timeout=None, request_timeout=None, callback=None,
                 follow_redirects=True, labels=None, add_to_finish_group=True,
-                parse_response=True, parse_on_error=False):
+                parse_response=True, parse_on_error=False, coalesce=None, hedge=None, hedge_host=None,
+                pool=None, priority=0):
 
         return self._http_client.get_url(
             url, data=data, headers=headers, connect_timeout=connect_timeout, request_timeout=request_timeout,
             callback=callback, follow_redirects=follow_redirects, labels=labels,
-            add_to_finish_group=add_to_finish_group, parse_response=parse_response, parse_on_error=parse_on_error
+            add_to_finish_group=add_to_finish_group, parse_response=parse_response, parse_on_error=parse_on_error,
+            coalesce=coalesce, hedge=hedge, hedge_host=hedge_host, pool=pool, priority=priority
         )
 
     def head_url(self, url, data=None, headers=None, connect_timeout=None, request_timeout=None, callback=None,
-                 follow_redirects=True, labels=None, add_to_finish_group=True):
+                 follow_redirects=True, labels=None, add_to_finish_group=True, hedge=None, hedge_host=None,
+                 pool=None, priority=0):
 
         return self._http_client.head_url(
             url, data=data, headers=headers, connect_timeout=connect_timeout, request_timeout=request_timeout,
             callback=callback, follow_redirects=follow_redirects, labels=labels,
-            add_to_finish_group=add_to_finish_group
+            add_to_finish_group=add_to_finish_group, hedge=hedge, hedge_host=hedge_host, pool=pool, priority=priority
         )
 
     def post_url(self, url, data='', headers=None, files=None, connect_timeout=None, request_timeout=None,
                  callback=None, follow_redirects=True, content_type=None, labels=None,
-                 add_to_finish_group=True, parse_response=True, parse_on_error=False):
+                 add_to_finish_group=True, parse_response=True, parse_on_error=False, pool=None, priority=0):
 
         return self._http_client.post_url(
             url, data=data, headers=headers, files=files,
             connect_timeout=connect_timeout, request_timeout=request_timeout,
             callback=callback, follow_redirects=follow_redirects, content_type=content_type, labels=labels,
-            add_to_finish_group=add_to_finish_group, parse_response=parse_response, parse_on_error=parse_on_error
+            add_to_finish_group=add_to_finish_group, parse_response=parse_response, parse_on_error=parse_on_error,
+            pool=pool, priority=priority
         )
 
     def put_url(self, url, data='', headers=None, connect_timeout=None, request_timeout=None, callback=None,
-                content_type=None, labels=None, add_to_finish_group=True, parse_response=True, parse_on_error=False):
+                content_type=None, labels=None, add_to_finish_group=True, parse_response=True, parse_on_error=False,
+                pool=None, priority=0):
 
         return self._http_client.put_url(
             url, data=data, headers=headers, connect_timeout=connect_timeout, request_timeout=request_timeout,
             callback=callback, content_type=content_type, labels=labels,
-            add_to_finish_group=add_to_finish_group, parse_response=parse_response, parse_on_error=parse_on_error
+            add_to_finish_group=add_to_finish_group, parse_response=parse_response, parse_on_error=parse_on_error,
+            pool=pool, priority=priority
         )
 
     def delete_url(self, url, data=None, headers=None, connect_timeout=None, request_timeout=None, callback=None,
-                   content_type=None, labels=None, add_to_finish_group=True, parse_response=True, parse_on_error=False):
+                   content_type=None, labels=None, add_to_finish_group=True, parse_response=True, parse_on_error=False,
+                   pool=None, priority=0):
 
         return self._http_client.delete_url(
             url, data=data, headers=headers, connect_timeout=connect_timeout, request_timeout=request_timeout,
             callback=callback, content_type=content_type, labels=labels,
-            add_to_finish_group=add_to_finish_group, parse_response=parse_response, parse_on_error=parse_on_error
+            add_to_finish_group=add_to_finish_group, parse_response=parse_response, parse_on_error=parse_on_error,
+            pool=pool, priority=priority
         )
 
 
@@ -1,23 +1,209 @@
 # coding=utf-8
 
+import logging
+import time
+import warnings
 import weakref
+from collections import deque
 
 import tornado.options
+from tornado.ioloop import IOLoop
+from tornado.stack_context import wrap
 
 import frontik.handler
+from frontik.metrics import Counter, Gauge
+
+limit_logger = logging.getLogger('frontik.handler_active_limit')
+
+ACTIVE_HANDLERS = Gauge('frontik_handlers_active', 'Number of requests being handled')
+HANDLERS_LIMIT = Gauge('frontik_handlers_limit', 'Limit of simultaneously handled requests')
+QUEUED_HANDLERS = Gauge('frontik_handlers_queued', 'Number of requests waiting for a free handler')
+REJECTED_REQUESTS = Counter('frontik_handlers_rejected_total', 'Number of requests rejected by handlers limit')
+
+
+class ActiveHandlersLimit(object):
+    """Limits the number of simultaneously handled requests.
+
+    Requests are checked before the handler is created. When there are more than `limit` active requests,
+    new requests wait in a queue of `queue_size` requests for at most `queue_timeout` seconds,
+    and are rejected (with `reject_request` function) when the queue is full or the timeout expires.
+    """
+
+    def __init__(self, reject_request, limit, queue_size=0, queue_timeout=0):
+        self.reject_request = reject_request
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+
+        self.active = 0
+        self.queue = deque()
+        self.rejected = 0
+
+        ACTIVE_HANDLERS.set_function(lambda: self.active)
+        HANDLERS_LIMIT.set_function(lambda: self.limit)
+        QUEUED_HANDLERS.set_function(lambda: len(self.queue))
+
+    def execute(self, request, dispatch):
+        if self._has_free_slot():
+            self._acquire(request)
+            dispatch()
+            return
+
+        if len(self.queue) < self.queue_size:
+            entry = [request, wrap(dispatch), None]
+            entry[2] = IOLoop.current().add_timeout(time.time() + self.queue_timeout, lambda: self._on_timeout(entry))
+            self.queue.append(entry)
+            return
+
+        self._reject(request, 'too many handlers ({})'.format(self.active))
+
+    def acquire(self, request):
+        """Counts the request as active regardless of the limit, returns False if it is already counted"""
+        if getattr(request, '_frontik_limit_acquired', False):
+            return False
+
+        self._acquire(request)
+        return True
+
+    def release(self, request):
+        if not getattr(request, '_frontik_limit_acquired', False):
+            return
+
+        request._frontik_limit_acquired = False
+        self.active -= 1
+        self._on_request_finished(time.time() - request._frontik_limit_start_time)
+
+        while self.queue and self._has_free_slot():
+            request, dispatch, timeout = self.queue.popleft()
+            IOLoop.current().remove_timeout(timeout)
+
+            if _is_connection_closed(request):
+                limit_logger.info(
+                    'dropping %s %s: connection closed while waiting in queue', request.method, request.uri
+                )
+                continue
+
+            self._acquire(request)
+            dispatch()
+
+    def get_stats(self):
+        return {
+            'active': self.active,
+            'limit': self.limit,
+            'queued': len(self.queue),
+            'rejected': self.rejected,
+        }
+
+    def _has_free_slot(self):
+        return self.active <= self.limit
+
+    def _acquire(self, request):
+        self.active += 1
+        request._frontik_limit_acquired = True
+        request._frontik_limit_start_time = time.time()
+
+    def _on_timeout(self, entry):
+        self.queue.remove(entry)
+        self._reject(entry[0], 'waited in queue for {}s'.format(self.queue_timeout))
+
+    def _reject(self, request, reason):
+        self.rejected += 1
+        REJECTED_REQUESTS.inc()
+        limit_logger.warning('dropping %s %s: %s', request.method, request.uri, reason)
+        self.reject_request(request)
+
+    def _on_request_finished(self, request_time):
+        pass
+
+
+class AdaptiveActiveHandlersLimit(ActiveHandlersLimit):
+    """Tunes the limit from `max_limit` down to `min_limit` using observed request times (AIMD).
+
+    Request times are averaged over windows of `WINDOW_SIZE` requests. If the average is more than
+    `LATENCY_TOLERANCE` times higher than the baseline (the lowest average seen, slowly following
+    the current one), the limit is multiplied by `DECREASE_FACTOR`. Otherwise, if the limit has been reached
+    during the window, it is increased by one.
+    """
+
+    WINDOW_SIZE = 50
+    LATENCY_TOLERANCE = 2.0
+    DECREASE_FACTOR = 0.9
+    BASELINE_DRIFT = 0.05
+
+    def __init__(self, reject_request, min_limit, max_limit, queue_size=0, queue_timeout=0):
+        super(AdaptiveActiveHandlersLimit, self).__init__(reject_request, max_limit, queue_size, queue_timeout)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.baseline_time = None
+
+        self._window_time = 0
+        self._window_count = 0
+        self._window_saturated = False
+
+    def get_stats(self):
+        stats = super(AdaptiveActiveHandlersLimit, self).get_stats()
+        stats['baseline_time'] = self.baseline_time
+        return stats
+
+    def _acquire(self, request):
+        super(AdaptiveActiveHandlersLimit, self)._acquire(request)
+        if not self._has_free_slot():
+            self._window_saturated = True
+
+    def _on_request_finished(self, request_time):
+        self._window_time += request_time
+        self._window_count += 1
+
+        if self._window_count < self.WINDOW_SIZE:
+            return
+
+        average_time = self._window_time / self._window_count
+
+        if self.baseline_time is None or average_time < self.baseline_time:
+            self.baseline_time = average_time
+        else:
+            self.baseline_time += (average_time - self.baseline_time) * self.BASELINE_DRIFT
+
+        if average_time > self.baseline_time * self.LATENCY_TOLERANCE:
+            new_limit = max(self.min_limit, int(self.limit * self.DECREASE_FACTOR))
+        elif self._window_saturated:
+            new_limit = min(self.max_limit, self.limit + 1)
+        else:
+            new_limit = self.limit
+
+        if new_limit != self.limit:
+            limit_logger.info(
+                'handlers limit changed from %d to %d (average time %.2fms, baseline %.2fms)',
+                self.limit, new_limit, average_time * 1000, self.baseline_time * 1000
+            )
+            self.limit = new_limit
+
+        self._window_time = 0
+        self._window_count = 0
+        self._window_saturated = False
 
 
 class PageHandlerActiveLimit(object):
-    working_handlers_count = 0
+    """Deprecated: requests are limited by `application.active_limit` before handlers are created.
+
+    Kept for backwards compatibility, the request of `handler` is counted with `application.active_limit`
+    (unless it is already counted, which is always the case for requests dispatched by `FrontikApplication`).
+    """
 
     def __init__(self, handler):
+        warnings.warn(
+            'PageHandlerActiveLimit is deprecated, requests are limited by application.active_limit',
+            DeprecationWarning, stacklevel=2
+        )
+
         self.handler = weakref.proxy(handler)
+        self.active_limit = handler.application.active_limit
         self.acquired = False
 
-        if PageHandlerActiveLimit.working_handlers_count > tornado.options.options.handlers_count:
+        if not getattr(handler.request, '_frontik_limit_acquired', False) and not self.active_limit._has_free_slot():
             self.handler.log.warning(
                 'dropping %s %s: too many handlers (%d)',
-                self.handler.request.method, self.handler.request.uri, PageHandlerActiveLimit.working_handlers_count
+                self.handler.request.method, self.handler.request.uri, self.active_limit.active
             )
 
             raise frontik.handler.HTTPError(503)
@@ -26,12 +212,28 @@ class PageHandlerActiveLimit(object):
 
     def acquire(self):
         if not self.acquired:
-            PageHandlerActiveLimit.working_handlers_count += 1
-            self.acquired = True
-            self.handler.log.info('handlers count + 1 = %d', PageHandlerActiveLimit.working_handlers_count)
+            self.acquired = self.active_limit.acquire(self.handler.request)
 
     def release(self):
         if self.acquired:
-            PageHandlerActiveLimit.working_handlers_count -= 1
+            self.active_limit.release(self.handler.request)
             self.acquired = False
-            self.handler.log.info('handlers count - 1 = %d', PageHandlerActiveLimit.working_handlers_count)
+
+
+def _is_connection_closed(request):
+    stream = getattr(request.connection, 'stream', None)
+    return stream is not None and stream.closed()
+
+
+def make_active_handlers_limit(reject_request):
+    options = tornado.options.options
+
+    if options.handlers_count_adaptive:
+        return AdaptiveActiveHandlersLimit(
+            reject_request, options.handlers_count_min, options.handlers_count,
+            options.handlers_queue_size, options.handlers_queue_timeout
+        )
+
+    return ActiveHandlersLimit(
+        reject_request, options.handlers_count, options.handlers_queue_size, options.handlers_queue_timeout
+    )
@@ -1,23 +1,40 @@
 # coding=utf-8
 
-from collections import namedtuple
+from collections import deque, namedtuple, OrderedDict
 from functools import partial
+import copy
+import logging
 import re
+import threading
 import time
 
 import pycurl
-import simplejson
 from lxml import etree
 from tornado.concurrent import Future
 from tornado.curl_httpclient import CurlAsyncHTTPClient
+from tornado.httpclient import HTTPError, HTTPResponse
+from tornado.httputil import HTTPHeaders
+from tornado.ioloop import IOLoop
 from tornado.options import options
+from tornado.stack_context import wrap
 
 from frontik.async import AsyncGroup
 from frontik.auth import DEBUG_AUTH_HEADER_NAME
-from frontik.compat import iteritems
+from frontik.circuit_breaker import circuit_breakers
+from frontik.compat import iteritems, urlparse
 from frontik.debug import DEBUG_HEADER_NAME, response_from_debug
+from frontik.file_cache import LimitedDict
+from frontik.http_client_pool import get_http_client_pool
+from frontik.json_codec import get_json_codec
+from frontik.metrics import Counter, Histogram
+from frontik.request_context import RequestContext
 import frontik.util
 
+OUTER_TIMEOUT_MS_HEADER = 'X-Outer-Timeout-Ms'
+
+UPSTREAM_RESPONSES = Counter('frontik_http_client_responses_total', 'Responses from upstreams', ['code'])
+UPSTREAM_REQUEST_DURATION = Histogram('frontik_http_client_request_duration_seconds', 'Time of requests to upstreams')
+
 
 class HttpClient(object):
     def __init__(self, handler, http_client_impl, modify_http_request_hook):
@@ -25,6 +42,9 @@ class HttpClient(object):
         self.modify_http_request_hook = modify_http_request_hook
         self.http_client_impl = http_client_impl
 
+        self._in_flight_requests = set()
+        self._cancelled = False
+
     def group(self, futures, callback=None, name=None):
         if callable(callback):
             results_holder = {}
@@ -47,45 +67,53 @@ class HttpClient(object):
 
     def get_url(self, url, data=None, headers=None, connect_timeout=None, request_timeout=None,
                 callback=None, follow_redirects=True, labels=None,
-                add_to_finish_group=True, parse_response=True, parse_on_error=False):
+                add_to_finish_group=True, parse_response=True, parse_on_error=False, coalesce=None,
+                hedge=None, hedge_host=None, pool=None, priority=0):
 
         future = Future()
         request = frontik.util.make_get_request(url, data, headers, connect_timeout, request_timeout, follow_redirects)
         request._frontik_labels = labels
+        request._frontik_pool = pool
+        request._frontik_priority = priority
+        request._frontik_coalesce = coalesce
 
-        self.fetch(
+        self._fetch_with_hedging(
             request,
             partial(self._parse_response, future, callback, parse_response, parse_on_error),
-            add_to_finish_group=add_to_finish_group
+            add_to_finish_group, hedge, hedge_host
         )
 
         return future
 
     def head_url(self, url, data=None, headers=None, connect_timeout=None, request_timeout=None,
                  callback=None, follow_redirects=True, labels=None,
-                 add_to_finish_group=True):
+                 add_to_finish_group=True, hedge=None, hedge_host=None, pool=None, priority=0):
 
         future = Future()
         request = frontik.util.make_head_request(url, data, headers, connect_timeout, request_timeout, follow_redirects)
         request._frontik_labels = labels
+        request._frontik_pool = pool
+        request._frontik_priority = priority
 
-        self.fetch(
+        self._fetch_with_hedging(
             request,
             partial(self._parse_response, future, callback, False, False),
-            add_to_finish_group=add_to_finish_group
+            add_to_finish_group, hedge, hedge_host
         )
 
         return future
 
     def post_url(self, url, data='', headers=None, files=None, connect_timeout=None, request_timeout=None,
                  callback=None, follow_redirects=True, content_type=None, labels=None,
-                 add_to_finish_group=True, parse_response=True, parse_on_error=False):
+                 add_to_finish_group=True, parse_response=True, parse_on_error=False, pool=None, priority=0):
 
         future = Future()
         request = frontik.util.make_post_request(
             url, data, headers, files, content_type, connect_timeout, request_timeout, follow_redirects
         )
         request._frontik_labels = labels
+        request._frontik_pool = pool
+        request._frontik_priority = priority
 
         self.fetch(
             request,
@@ -97,11 +125,13 @@ class HttpClient(object):
 
     def put_url(self, url, data='', headers=None, connect_timeout=None, request_timeout=None,
                 callback=None, content_type=None, labels=None,
-                add_to_finish_group=True, parse_response=True, parse_on_error=False):
+                add_to_finish_group=True, parse_response=True, parse_on_error=False, pool=None, priority=0):
 
         future = Future()
         request = frontik.util.make_put_request(url, data, headers, content_type, connect_timeout, request_timeout)
         request._frontik_labels = labels
+        request._frontik_pool = pool
+        request._frontik_priority = priority
 
         self.fetch(
             request,
@@ -113,11 +143,13 @@ class HttpClient(object):
 
     def delete_url(self, url, data=None, headers=None, connect_timeout=None, request_timeout=None,
                    callback=None, content_type=None, labels=None,
-                   add_to_finish_group=True, parse_response=True, parse_on_error=False):
+                   add_to_finish_group=True, parse_response=True, parse_on_error=False, pool=None, priority=0):
 
         future = Future()
         request = frontik.util.make_delete_request(url, data, headers, content_type, connect_timeout, request_timeout)
         request._frontik_labels = labels
+        request._frontik_pool = pool
+        request._frontik_priority = priority
 
         self.fetch(
             request,
@@ -149,6 +181,10 @@ class HttpClient(object):
 
         request.headers['X-Request-Id'] = self.handler.request_id
 
+        # requests, which are not in the finish group, are expected to complete after the page is finished
+        if getattr(request, '_frontik_cancellable', None) is None:
+            request._frontik_cancellable = add_to_finish_group
+
         if request.connect_timeout is None:
             request.connect_timeout = options.http_client_default_connect_timeout
         if request.request_timeout is None:
@@ -157,8 +193,24 @@ class HttpClient(object):
         request.connect_timeout *= options.timeout_multiplier
         request.request_timeout *= options.timeout_multiplier
 
-        def req_callback(response):
-            response = self._log_response(request, response)
+        # timeouts clamped by the page deadline depend on the time of the call, so coalescing uses the original ones
+        request._frontik_timeouts = (request.connect_timeout, request.request_timeout)
+
+        deadline = RequestContext.get('deadline')
+        if deadline is not None:
+            remaining_time = deadline - time.time()
+            request.connect_timeout = min(request.connect_timeout, remaining_time)
+            request.request_timeout = min(request.request_timeout, remaining_time)
+
+        self._set_outer_timeout_header(request)
+
+        use_cache = self._can_use_cache(request)
+
+        def req_callback(response, from_cache=False):
+            response = self._log_response(request, response, from_cache)
+
+            if use_cache and not from_cache:
+                response_cache.put(request, response)
 
             if callable(callback):
                 callback(response)
@@ -175,7 +227,232 @@ class HttpClient(object):
                 self._prepare_curl_callback, next_callback=request.prepare_curl_callback
             )
 
-        return self.http_client_impl.fetch(self.modify_http_request_hook(request), req_callback)
+        request = self.modify_http_request_hook(request)
+
+        if use_cache:
+            cached_response = response_cache.get(request)
+            if cached_response is not None:
+                future = Future()
+                future.set_result(cached_response)
+                IOLoop.current().add_callback(partial(req_callback, cached_response, from_cache=True))
+                return future
+
+        if request.request_timeout <= 0:
+            return self._reject_request(request, req_callback, 'request deadline has expired')
+
+        if options.http_client_circuit_breaker:
+            breaker = circuit_breakers.get(get_upstream_host(request.url))
+            if not breaker.allow_request(request):
+                circuit_breakers.rejected += 1
+                return self._reject_request(request, req_callback, 'circuit breaker is open')
+
+            req_callback = partial(self._add_circuit_breaker_result, breaker, request, req_callback)
+
+            try:
+                return self._send(request, req_callback)
+            except Exception:
+                # the callback is never called, so the probe would never be released
+                breaker.cancel_request(request)
+                raise
+
+        return self._send(request, req_callback)
+
+    def _send(self, request, callback):
+        pool = getattr(request, '_frontik_pool', None)
+        if pool is not None:
+            return get_http_client_pool(pool).fetch(
+                request, getattr(request, '_frontik_priority', 0), self._fetch_pooled_impl, callback
+            )
+
+        return self._fetch_impl(request, callback)
+
+    def _fetch_pooled_impl(self, request, callback):
+        # timeouts are reduced by the time spent in the pool queue
+        self._set_outer_timeout_header(request)
+        return self._fetch_impl(request, callback)
+
+    @staticmethod
+    def _set_outer_timeout_header(request):
+        request.headers[OUTER_TIMEOUT_MS_HEADER] = str(max(int(request.request_timeout * 1000), 0))
+
+    def _fetch_impl(self, request, callback):
+        # coalesced requests can be shared with other handlers, so they are never cancelled
+        if self._can_coalesce(request):
+            return request_coalescer.fetch(self.http_client_impl, request, callback)
+
+        if self._can_cancel(request):
+            # requests from client pools can be sent after cancellation
+            if self._cancelled:
+                request._frontik_cancelled = True
+                return self._reject_request(request, callback, 'request was cancelled')
+
+            self._in_flight_requests.add(request)
+            callback = partial(self._on_in_flight_response, request, callback)
+
+        return self.http_client_impl.fetch(request, callback)
+
+    def _on_in_flight_response(self, request, callback, response):
+        self._in_flight_requests.discard(request)
+        callback(response)
+
+    def cancel_requests(self):
+        """Cancels GET and HEAD requests in the finish group, which are in flight or wait for a free curl handle
+        or in client pools. Callbacks of cancelled requests are called with 599 response.
+        """
+        self._cancelled = True
+
+        if not self._in_flight_requests:
+            return
+
+        self.handler.log.info('cancelling %d requests', len(self._in_flight_requests))
+        for request in list(self._in_flight_requests):
+            request._frontik_cancelled = True
+            _cancel_curl_request(self.http_client_impl, request)
+
+    def _can_cancel(self, request):
+        return (
+            request.method in ('GET', 'HEAD') and getattr(request, '_frontik_cancellable', False) and
+            isinstance(self.http_client_impl, CurlAsyncHTTPClient)
+        )
+
+    def _fetch_with_hedging(self, request, callback, add_to_finish_group, hedge, hedge_host):
+        """Sends a second (hedged) request if there is no response after a delay, or retries the request
+        if it has failed. The first successful response (or the last failed one) is passed to the callback.
+        """
+        if hedge is None:
+            hedge = options.http_client_hedge_requests or hedge_host is not None
+
+        if not hedge:
+            self.fetch(request, callback, add_to_finish_group=add_to_finish_group)
+            return
+
+        if add_to_finish_group:
+            callback = self.handler.finish_group.add(self.handler.check_finished(callback))
+
+        retry_budget.add_request()
+        request._frontik_cancellable = add_to_finish_group
+        hedge_request = self._copy_request(request, hedge_host)
+        state = {'pending': 0, 'done': False, 'hedge_sent': False, 'timeout': None}
+
+        def send(request_to_send):
+            state['pending'] += 1
+            self.fetch(request_to_send, partial(on_response, request_to_send), add_to_finish_group=False)
+
+        def send_hedge(label):
+            if state['timeout'] is not None:
+                self.handler.remove_timeout(state['timeout'])
+                state['timeout'] = None
+
+            if state['done'] or state['hedge_sent'] or self.handler._finished or self._cancelled:
+                return False
+
+            if not retry_budget.withdraw():
+                return False
+
+            if label == 'retry':
+                retry_budget.retried += 1
+            else:
+                retry_budget.hedged += 1
+
+            state['hedge_sent'] = True
+            hedge_request._frontik_labels = list(request._frontik_labels or []) + [label]
+            send(hedge_request)
+            return True
+
+        def on_response(sent_request, response):
+            state['pending'] -= 1
+            if state['done']:
+                return
+
+            if response.code == 599 or response.code >= 500:
+                if state['pending'] > 0:
+                    return
+
+                # rejected requests have not reached the upstream, retrying them would only waste the budget
+                if not getattr(response, '_frontik_rejected', False) and send_hedge('retry'):
+                    return
+
+            state['done'] = True
+            if state['timeout'] is not None:
+                self.handler.remove_timeout(state['timeout'])
+
+            if sent_request is hedge_request:
+                retry_budget.won += 1
+
+            callback(response)
+
+        hedge_delay = self._get_hedge_delay(request)
+        send(request)
+
+        if hedge_delay is not None and not state['done']:
+            state['timeout'] = self.handler.add_timeout(time.time() + hedge_delay, partial(send_hedge, 'hedged'))
+
+    @staticmethod
+    def _get_hedge_delay(request):
+        if options.http_client_hedge_delay > 0:
+            return options.http_client_hedge_delay
+
+        percentile = upstream_stats.get_percentile(
+            get_upstream_host(request.url), 'total', options.http_client_hedge_percentile
+        )
+
+        return percentile / 1000 if percentile is not None else None
+
+    @staticmethod
+    def _copy_request(request, host=None):
+        # must be copied before fetch, which modifies the request
+        request_copy = copy.copy(request)
+        request_copy.headers = HTTPHeaders(request.headers)
+        request_copy._frontik_coalesce = False
+
+        if host is not None:
+            host = urlparse.urlsplit(host).netloc if '://' in host else host
+            url = request.url if '://' in request.url else 'http://' + request.url
+            request_copy.url = urlparse.urlunsplit(urlparse.urlsplit(url)._replace(netloc=host))
+
+        return request_copy
+
+    def _reject_request(self, request, callback, reason):
+        response = HTTPResponse(request, 599, error=HTTPError(599, reason), request_time=0)
+        response._frontik_rejected = True
+
+        future = Future()
+        future.set_result(response)
+        IOLoop.current().add_callback(partial(callback, response))
+        return future
+
+    @staticmethod
+    def _add_circuit_breaker_result(breaker, request, callback, response):
+        # coalesced requests share the same response object, which is counted once,
+        # but the result of a probe is always added, otherwise the circuit would stay half-open forever
+        is_probe = getattr(request, '_frontik_circuit_breaker_probe', False)
+        if is_probe or not getattr(response, '_frontik_circuit_breaker_result_added', False):
+            response._frontik_circuit_breaker_result_added = True
+
+            if _is_upstream_response(request, response):
+                breaker.add_result(request, response)
+            else:
+                breaker.cancel_request(request)
+
+        callback(response)
+
+    def _can_coalesce(self, request):
+        coalesce = getattr(request, '_frontik_coalesce', None)
+        if coalesce is None:
+            coalesce = options.http_client_coalesce_requests
+
+        # a probe must check the upstream with a new request instead of sharing a request sent before
+        return (
+            coalesce and request.method == 'GET' and not self.handler.debug_mode.pass_debug and
+            request.streaming_callback is None and request.header_callback is None and
+            not getattr(request, '_frontik_circuit_breaker_probe', False)
+        )
+
+    def _can_use_cache(self, request):
+        return (
+            options.http_client_cache_size > 0 and request.method == 'GET' and
+            not self.handler.debug_mode.pass_debug and request.streaming_callback is None
+        )
 
     def _prepare_curl_callback(self, curl, next_callback):
         curl.setopt(pycurl.NOSIGNAL, 1)
@@ -183,29 +460,47 @@ class HttpClient(object):
         if callable(next_callback):
             next_callback(curl)
 
-    def _log_response(self, request, response):
+    def _log_response(self, request, response, from_cache=False):
         try:
+            # coalesced requests share the same response object
+            if (not from_cache and not getattr(response, '_frontik_stats_added', False) and
+                    _is_upstream_response(request, response)):
+                response._frontik_stats_added = True
+                upstream_stats.add(request, response)
+
+            if not from_cache:
+                self.handler.log.add_upstream_response(response)
+                UPSTREAM_RESPONSES.labels(str(response.code)).inc()
+                UPSTREAM_REQUEST_DURATION.observe(response.request_time)
+
             debug_extra = {}
-            if response.headers.get(DEBUG_HEADER_NAME):
+            if not from_cache and response.headers.get(DEBUG_HEADER_NAME):
                 debug_response = response_from_debug(request, response)
                 if debug_response is not None:
                     debug_xml, response = debug_response
                     debug_extra['_debug_response'] = debug_xml
 
+            if response.code >= 500 and not getattr(request, '_frontik_cancelled', False):
+                log_level = logging.WARNING
+            else:
+                log_level = logging.INFO
+
+            if not self.handler.log.isEnabledFor(log_level):
+                return response
+
             if self.handler.debug_mode.enabled:
                 debug_extra.update({'_response': response, '_request': request})
                 if getattr(request, '_frontik_labels', None) is not None:
                     debug_extra['_labels'] = request._frontik_labels
 
-            log_message = 'got {code}{size} {url} in {time:.2f}ms'.format(
+            log_message = 'got {code}{size} {url} {time}'.format(
                 code=response.code,
                 url=response.effective_url,
                 size=' {0} bytes'.format(len(response.body)) if response.body is not None else '',
-                time=response.request_time * 1000
+                time='from cache' if from_cache else 'in {0:.2f}ms'.format(response.request_time * 1000)
             )
 
-            log_method = self.handler.log.warn if response.code >= 500 else self.handler.log.info
-            log_method(log_message, extra=debug_extra)
+            self.handler.log.log(log_level, log_message, extra=debug_extra)
 
         except Exception:
             self.handler.log.exception('Cannot log response info')
@@ -217,7 +512,7 @@ class HttpClient(object):
         result = RequestResult()
 
         try:
-            if response.error and not parse_on_error:
+            if getattr(response, '_frontik_rejected', False) or response.error and not parse_on_error:
                 self._set_response_error(response)
             elif not parse_response:
                 data = response.body
@@ -225,7 +520,14 @@ class HttpClient(object):
                 content_type = response.headers.get('Content-Type', '')
                 for k, v in iteritems(DEFAULT_REQUEST_TYPES):
                     if k.search(content_type):
-                        data = v(response, logger=self.handler.log)
+                        if not callable(callback):
+                            # nobody needs the data yet, it is parsed on the first access to the result
+                            parse = partial(response_cache.parse, response, v, logger=self.handler.log)
+                            result.set_lazy(parse, response)
+                            future.set_result(result)
+                            return
+
+                        data = response_cache.parse(response, v, logger=self.handler.log)
                         break
         except FailedRequestException as ex:
             result.set_exception(ex)
@@ -237,7 +539,14 @@ class HttpClient(object):
         future.set_result(result)
 
     def _set_response_error(self, response):
-        log_func = self.handler.log.error if response.code >= 500 else self.handler.log.warning
+        # cancelled requests are not failures of the upstream
+        if getattr(response.request, '_frontik_cancelled', False):
+            log_func = self.handler.log.info
+        elif response.code >= 500:
+            log_func = self.handler.log.error
+        else:
+            log_func = self.handler.log.warning
+
         log_func('{code} failed {url} ({reason!s})'.format(
             code=response.code, url=response.effective_url, reason=response.error)
         )
@@ -245,27 +554,463 @@ class HttpClient(object):
         raise FailedRequestException(reason=str(response.error), code=response.code)
 
 
+def _is_upstream_response(request, response):
+    """Returns False for responses to requests, which were rejected before sending or cancelled"""
+    return not getattr(response, '_frontik_rejected', False) and not getattr(request, '_frontik_cancelled', False)
+
+
+def _cancel_curl_request(http_client_impl, request):
+    # tornado.curl_httpclient.CurlAsyncHTTPClient does not support cancelling requests
+    for i, (queued_request, callback) in enumerate(http_client_impl._requests):
+        if queued_request.request is request:
+            del http_client_impl._requests[i]
+            callback(HTTPResponse(
+                queued_request, 599, error=HTTPError(599, 'request was cancelled'),
+                request_time=time.time() - queued_request.start_time
+            ))
+            return
+
+    # free curl handles may have no info attribute at all
+    for curl in http_client_impl._curls:
+        info = getattr(curl, 'info', None)
+        if info is not None and info['request'].request is request:
+            http_client_impl._finish(curl, pycurl.E_ABORTED_BY_CALLBACK, 'request was cancelled')
+            http_client_impl._process_queue()
+            return
+
+
+def get_upstream_host(url):
+    # curl accepts urls without scheme
+    return urlparse.urlsplit(url if '://' in url else 'http://' + url).netloc
+
+
+class RequestCoalescer(object):
+    """Shares a single in-flight request between identical concurrent GET requests.
+
+    Requests are considered identical if they have the same url, headers (except for X-Request-Id
+    and X-Outer-Timeout-Ms), credentials and timeouts (before they are limited by the page deadline).
+    Each waiting caller gets the same response object in its own stack context.
+    """
+
+    IGNORED_HEADERS = frozenset(('X-Request-Id', OUTER_TIMEOUT_MS_HEADER))
+
+    def __init__(self):
+        self._pending = {}
+        self.requests = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def get_key(request):
+        headers = tuple(sorted(
+            (name, value) for name, value in iteritems(HTTPHeaders(request.headers))
+            if name not in RequestCoalescer.IGNORED_HEADERS
+        ))
+
+        timeouts = getattr(request, '_frontik_timeouts', (request.connect_timeout, request.request_timeout))
+
+        return (
+            request.method, request.url, headers, timeouts, request.follow_redirects,
+            request.proxy_host, request.proxy_port, request.auth_username, request.auth_password
+        )
+
+    def fetch(self, http_client_impl, request, callback):
+        key = self.get_key(request)
+        future = Future()
+
+        self.requests += 1
+
+        if key in self._pending:
+            self.coalesced += 1
+            self._pending[key].append((future, wrap(callback)))
+            return future
+
+        self._pending[key] = [(future, wrap(callback))]
+
+        try:
+            http_client_impl.fetch(request, partial(self._on_response, key))
+        except Exception:
+            del self._pending[key]
+            raise
+
+        return future
+
+    def _on_response(self, key, response):
+        io_loop = IOLoop.current()
+
+        for future, callback in self._pending.pop(key):
+            future.set_result(response)
+            io_loop.add_callback(callback, response)
+
+    def get_stats(self):
+        return {
+            'requests': self.requests,
+            'coalesced': self.coalesced,
+            'hit_rate': round(float(self.coalesced) / self.requests, 4) if self.requests else 0.0,
+            'in_flight': len(self._pending),
+        }
+
+
+request_coalescer = RequestCoalescer()
+
+
+class ResponseCache(object):
+    """Process-wide LRU cache for GET responses with `Cache-Control: max-age` (or `s-maxage`) header.
+
+    Responses are keyed on method, url and the values of request headers listed in response `Vary` header.
+    Responses to requests with `Authorization` or `Cookie` headers are stored only if they are explicitly allowed
+    to be stored in a shared cache with `public` or `s-maxage` directive (see RFC 7234, section 3.2).
+    The total size of cached bodies is limited by `http_client_cache_size` option.
+
+    Parsed XML is stored alongside the response, so cache hits skip both network and parsing.
+    Each read returns a deep copy of the stored tree, which can be freely modified by the caller.
+    The size of a parsed tree is estimated as the body size multiplied by `http_client_cache_xml_size_factor`.
+    """
+
+    UNCACHEABLE_DIRECTIVES = frozenset(('no-store', 'no-cache', 'private'))
+    SHARED_CACHE_DIRECTIVES = frozenset(('public', 's-maxage'))
+    CREDENTIALS_HEADERS = ('Authorization', 'Cookie')
+
+    class Entry(object):
+        __slots__ = ('key', 'response', 'vary', 'vary_values', 'expires', 'size', 'data')
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def get_key(request):
+        return request.method, request.url
+
+    @staticmethod
+    def _parse_cache_control(headers):
+        directives = {}
+        for directive in headers.get('Cache-Control', '').split(','):
+            name, _, value = directive.strip().partition('=')
+            directives[name.lower()] = value.strip('"')
+
+        return directives
+
+    @staticmethod
+    def get_max_age(request, response):
+        directives = ResponseCache._parse_cache_control(response.headers)
+        if ResponseCache.UNCACHEABLE_DIRECTIVES.intersection(directives):
+            return None
+
+        has_credentials = any(name in request.headers for name in ResponseCache.CREDENTIALS_HEADERS)
+        if has_credentials and not ResponseCache.SHARED_CACHE_DIRECTIVES.intersection(directives):
+            return None
+
+        try:
+            max_age = int(directives.get('s-maxage') or directives.get('max-age'))
+            age = int(response.headers.get('Age', 0))
+        except (TypeError, ValueError):
+            return None
+
+        return max_age - age
+
+    def get(self, request):
+        if 'no-cache' in self._parse_cache_control(request.headers):
+            return None
+
+        key = self.get_key(request)
+        entry = self._entries.get(key)
+
+        if entry is not None and entry.expires < time.time():
+            self._remove(key)
+            entry = None
+
+        if entry is None or entry.vary_values != tuple(request.headers.get(name) for name in entry.vary):
+            self.misses += 1
+            return None
+
+        # move entry to the end of LRU order
+        del self._entries[key]
+        self._entries[key] = entry
+
+        self.hits += 1
+        return entry.response
+
+    def put(self, request, response):
+        if response.code != 200 or response.body is None:
+            return
+
+        if getattr(response, '_frontik_cache_entry', None) is not None:
+            return
+
+        max_age = self.get_max_age(request, response)
+        if max_age is None or max_age <= 0:
+            return
+
+        vary = tuple(sorted(
+            name.strip() for name in response.headers.get('Vary', '').split(',') if name.strip()
+        ))
+        if '*' in vary:
+            return
+
+        entry = ResponseCache.Entry()
+        entry.key = self.get_key(request)
+        entry.response = response
+        entry.vary = vary
+        entry.vary_values = tuple(request.headers.get(name) for name in vary)
+        entry.expires = time.time() + max_age
+        entry.size = len(response.body)
+        entry.data = None
+
+        if entry.size > options.http_client_cache_size:
+            return
+
+        self._remove(entry.key)
+        self._entries[entry.key] = entry
+        self.size += entry.size
+        response._frontik_cache_entry = entry
+
+        self._evict()
+
+    def parse(self, response, parser, logger):
+        entry = getattr(response, '_frontik_cache_entry', None)
+        if entry is None or parser is not _parse_response_xml:
+            return parser(response, logger=logger)
+
+        if entry.data is None:
+            entry.data = parser(response, logger=logger)
+
+            if self._entries.get(entry.key) is entry:
+                tree_size = int(len(response.body) * options.http_client_cache_xml_size_factor)
+                self.size += tree_size
+                entry.size += tree_size
+                self._evict()
+
+        return copy.deepcopy(entry.data)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def _evict(self):
+        while self.size > options.http_client_cache_size and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.size -= entry.size
+            self.evictions += 1
+
+    def get_stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'size': self.size,
+        }
+
+
+response_cache = ResponseCache()
+
+
+class UpstreamStats(object):
+    """Collects statistics of responses from each upstream host.
+
+    Curl `time_info` phases (in milliseconds, counted from the start of the request like curl does,
+    except for `queue`, which is the time spent waiting for a free curl handle) are kept for the last
+    `http_client_stats_window` responses from each host. Connection is considered reused if curl
+    reports zero connect time for a response, which was actually received.
+    Percentiles returned by `get_percentile` are cached and recomputed after every
+    `PERCENTILE_UPDATE_RESPONSES` new responses from the host.
+    """
+
+    TIME_PHASES = ('queue', 'namelookup', 'connect', 'pretransfer', 'starttransfer', 'total')
+    PERCENTILES = (50, 95, 99)
+    MIN_PERCENTILE_RESPONSES = 20
+    PERCENTILE_UPDATE_RESPONSES = 10
+
+    class HostStats(object):
+        __slots__ = ('requests', 'errors', 'failed', 'reused', 'samples', 'times', 'percentiles')
+
+        def __init__(self, window):
+            self.requests = 0
+            self.errors = 0
+            self.failed = 0
+            self.reused = 0
+            self.samples = 0
+            self.times = dict((phase, deque(maxlen=window)) for phase in UpstreamStats.TIME_PHASES)
+            self.percentiles = {}
+
+    def __init__(self):
+        self._hosts = None
+
+    def add(self, request, response):
+        if self._hosts is None:
+            self._hosts = LimitedDict(options.http_client_stats_hosts)
+
+        host = get_upstream_host(request.url)
+        stats = self._hosts.get(host)
+        if stats is None:
+            stats = self._hosts[host] = UpstreamStats.HostStats(options.http_client_stats_window)
+
+        stats.requests += 1
+
+        if response.code == 599:
+            stats.failed += 1
+        elif response.code >= 500:
+            stats.errors += 1
+
+        time_info = response.time_info
+        if not time_info:
+            return
+
+        if response.code != 599 and time_info.get('connect') == 0:
+            stats.reused += 1
+
+        stats.samples += 1
+        for phase, times in iteritems(stats.times):
+            if phase in time_info:
+                times.append(time_info[phase] * 1000)
+
+    def get_stats(self):
+        hosts = {}
+
+        for host in (self._hosts.keys() if self._hosts is not None else []):
+            stats = self._hosts.get(host)
+            received = stats.requests - stats.failed
+
+            hosts[host] = {
+                'requests': stats.requests,
+                'errors': stats.errors,
+                'failed': stats.failed,
+                'reuse_ratio': round(float(stats.reused) / received, 4) if received else 0.0,
+                'time': dict(
+                    (phase, self._get_percentiles(times)) for phase, times in iteritems(stats.times) if times
+                ),
+            }
+
+        return hosts
+
+    def get_percentile(self, host, phase, percentile):
+        """Returns percentile of `phase` time for the host in milliseconds or None if there are too few responses"""
+        stats = self._hosts.get(host) if self._hosts is not None else None
+        if stats is None or len(stats.times[phase]) < UpstreamStats.MIN_PERCENTILE_RESPONSES:
+            return None
+
+        cached = stats.percentiles.get((phase, percentile))
+        if cached is not None and stats.samples - cached[1] < UpstreamStats.PERCENTILE_UPDATE_RESPONSES:
+            return cached[0]
+
+        value = self._get_percentile(sorted(stats.times[phase]), percentile)
+        stats.percentiles[(phase, percentile)] = (value, stats.samples)
+        return value
+
+    @staticmethod
+    def _get_percentiles(times):
+        times = sorted(times)
+        return dict(
+            ('p{}'.format(p), round(UpstreamStats._get_percentile(times, p), 2)) for p in UpstreamStats.PERCENTILES
+        )
+
+    @staticmethod
+    def _get_percentile(sorted_times, percentile):
+        return sorted_times[int(round((len(sorted_times) - 1) * percentile / 100.0))]
+
+
+upstream_stats = UpstreamStats()
+
+
+class RetryBudget(object):
+    """Limits the number of hedged and retried requests to prevent retry storms.
+
+    Each request with hedging enabled adds `http_client_retry_budget` tokens (up to `MAX_TOKENS`),
+    each hedged or retried request takes one token, so in the long run there are at most
+    `http_client_retry_budget` additional requests per request.
+    """
+
+    MAX_TOKENS = 10.0
+
+    def __init__(self):
+        self.tokens = self.MAX_TOKENS
+        self.requests = 0
+        self.hedged = 0
+        self.retried = 0
+        self.won = 0
+        self.exhausted = 0
+
+    def add_request(self):
+        self.requests += 1
+        self.tokens = min(self.MAX_TOKENS, self.tokens + options.http_client_retry_budget)
+
+    def withdraw(self):
+        if self.tokens < 1:
+            self.exhausted += 1
+            return False
+
+        self.tokens -= 1
+        return True
+
+    def get_stats(self):
+        return {
+            'requests': self.requests,
+            'hedged': self.hedged,
+            'retried': self.retried,
+            'won': self.won,
+            'exhausted': self.exhausted,
+            'tokens': round(self.tokens, 2),
+        }
+
+
+retry_budget = RetryBudget()
+
+
 class FailedRequestException(Exception):
     def __init__(self, **kwargs):
         self.attrs = kwargs
 
 
 class RequestResult(object):
-    __slots__ = ('data', 'response', 'exception')
+    """Result of a request, which is set to the future returned by `HttpClient` methods.
+
+    If there is no callback, response body is not parsed until `data` or `exception` is accessed.
+    """
+
+    __slots__ = ('_data', 'response', '_exception', '_parse')
 
     ResponseData = namedtuple('ResponseData', ('data', 'response'))
 
     def __init__(self):
-        self.data = None
+        self._data = None
         self.response = None
-        self.exception = None
+        self._exception = None
+        self._parse = None
+
+    @property
+    def data(self):
+        self._parse_data()
+        return self._data
+
+    @property
+    def exception(self):
+        self._parse_data()
+        return self._exception
 
     def set(self, data, response):
-        self.data = data
+        self._data = data
+        self.response = response
+
+    def set_lazy(self, parse, response):
+        self._parse = parse
         self.response = response
 
     def set_exception(self, exception):
-        self.exception = exception
+        self._exception = exception
+
+    def _parse_data(self):
+        if self._parse is None:
+            return
+
+        parse, self._parse = self._parse, None
+        try:
+            self._data = parse()
+        except FailedRequestException as ex:
+            self._exception = ex
 
 
 def _parse_response(response, logger, parser=None, response_type=None):
@@ -285,17 +1030,30 @@ def _parse_response(response, logger, parser=None, response_type=None):
         raise FailedRequestException(url=response.effective_url, reason='invalid {0}'.format(response_type))
 
 
-_xml_parser = etree.XMLParser(strip_cdata=False)
+# lxml parsers can not be used concurrently, documents are converted to etree in executor threads
+_xml_parsers = threading.local()
+
+
+def _parse_xml(body):
+    parser = getattr(_xml_parsers, 'parser', None)
+    if parser is None:
+        parser = _xml_parsers.parser = etree.XMLParser(strip_cdata=False)
+
+    return etree.fromstring(body, parser=parser)
+
+
 _parse_response_xml = partial(_parse_response,
-                              parser=lambda x: etree.fromstring(x, parser=_xml_parser),
+                              parser=_parse_xml,
                               response_type='XML')
 
 _parse_response_json = partial(_parse_response,
-                               parser=simplejson.loads,
+                               parser=lambda x: get_json_codec().loads(x),
                                response_type='JSON')
 
+XML_CONTENT_TYPE = re.compile('.*xml.?')
+
 DEFAULT_REQUEST_TYPES = {
-    re.compile('.*xml.?'): _parse_response_xml,
+    XML_CONTENT_TYPE: _parse_response_xml,
     re.compile('.*json.?'): _parse_response_json,
     re.compile('.*text/plain.?'): (lambda response, logger: response.body),
 }
@@ -0,0 +1,151 @@
+# coding=utf-8
+
+import heapq
+import itertools
+import logging
+import time
+from functools import partial
+
+from tornado.concurrent import Future
+from tornado.httpclient import HTTPError, HTTPResponse
+from tornado.ioloop import IOLoop
+from tornado.options import options
+from tornado.stack_context import wrap
+
+from frontik.compat import iteritems
+
+pool_logger = logging.getLogger('frontik.http_client_pool')
+
+
+class HttpClientPool(object):
+    """Limits the number of simultaneous requests sent with the shared curl client.
+
+    Requests above the limit wait in the queue, requests with higher `priority` are sent first
+    (requests with the same priority are sent in FIFO order). A request, which could not be sent during
+    its `request_timeout`, gets a response with 599 status code. The time spent in the queue is subtracted
+    from the timeouts of the request before it is sent.
+    """
+
+    def __init__(self, name, max_requests):
+        self.name = name
+        self.max_requests = max_requests
+
+        self.active = 0
+        self.queue = []
+        self.queued = 0
+        self.timed_out = 0
+        self._counter = itertools.count()
+
+    def fetch(self, request, priority, fetch_impl, callback):
+        """Calls `fetch_impl(request, callback)` when there is a free slot in the pool"""
+        future = Future()
+        callback = wrap(callback)
+
+        if self.active < self.max_requests:
+            self._send(request, fetch_impl, future, callback)
+            return future
+
+        send = wrap(partial(self._send_queued, request, fetch_impl, future, callback, time.time()))
+        entry = [-priority, next(self._counter), send]
+        entry.append(IOLoop.current().add_timeout(
+            time.time() + request.request_timeout, partial(self._on_timeout, entry, request, future, callback)
+        ))
+
+        heapq.heappush(self.queue, entry)
+        self.queued += 1
+        return future
+
+    def get_stats(self):
+        return {
+            'active': self.active,
+            'limit': self.max_requests,
+            'queued': self.queued,
+            'timed_out': self.timed_out,
+        }
+
+    def _send(self, request, fetch_impl, future, callback):
+        self.active += 1
+        try:
+            fetch_impl(request, partial(self._on_response, future, callback))
+        except Exception:
+            # the callback is never called, so the slot would never be released
+            self.active -= 1
+            raise
+
+    def _send_queued(self, request, fetch_impl, future, callback, queued_at):
+        remaining_time = request.request_timeout - (time.time() - queued_at)
+        if remaining_time <= 0:
+            self.timed_out += 1
+            self._reject(request, future, callback, 'timeout while waiting in {} pool'.format(self.name))
+            return
+
+        request.request_timeout = remaining_time
+        request.connect_timeout = min(request.connect_timeout, remaining_time)
+
+        try:
+            self._send(request, fetch_impl, future, callback)
+        except Exception as e:
+            # the request is sent on completion of another one, so the error is delivered to the callback
+            # instead of being raised in the callback of an unrelated request
+            pool_logger.exception('failed to send request to %s from %s pool', request.url, self.name)
+            self._reject(request, future, callback, 'failed to send request from {} pool: {}'.format(self.name, e))
+
+    def _on_response(self, future, callback, response):
+        self.active -= 1
+        self._process_queue()
+
+        future.set_result(response)
+        callback(response)
+
+    def _process_queue(self):
+        while self.queue and self.active < self.max_requests:
+            _, _, send, timeout = heapq.heappop(self.queue)
+
+            # entries are removed from the heap lazily after timeout
+            if send is None:
+                continue
+
+            self.queued -= 1
+            IOLoop.current().remove_timeout(timeout)
+            send()
+
+    def _on_timeout(self, entry, request, future, callback):
+        entry[2] = None
+        self.queued -= 1
+        self.timed_out += 1
+
+        pool_logger.warning(
+            'request to %s waited in %s pool for %ss, giving up', request.url, self.name, request.request_timeout
+        )
+
+        self._reject(request, future, callback, 'timeout while waiting in {} pool'.format(self.name))
+
+    @staticmethod
+    def _reject(request, future, callback, reason):
+        response = HTTPResponse(request, 599, error=HTTPError(599, reason), request_time=request.request_timeout)
+        # the upstream has not received the request, so the response is not counted by circuit breakers and retries
+        response._frontik_rejected = True
+
+        future.set_result(response)
+        callback(response)
+
+
+_pools = None
+
+
+def get_http_client_pool(name):
+    global _pools
+    if _pools is None:
+        _pools = dict(
+            (pool_name, HttpClientPool(pool_name, max_requests))
+            for pool_name, max_requests in iteritems(options.http_client_pools or {})
+        )
+
+    if name not in _pools:
+        raise ValueError('Unknown http client pool: "{}"'.format(name))
+
+    return _pools[name]
+
+
+def get_http_client_pools_stats():
+    return dict((name, pool.get_stats()) for name, pool in iteritems(_pools or {}))
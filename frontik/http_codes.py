@@ -8,6 +8,8 @@ else:
     import httplib as httpcodes
 
 OK = int(httpcodes.OK)
+BAD_REQUEST = int(httpcodes.BAD_REQUEST)
+CONFLICT = int(httpcodes.CONFLICT)
 SERVICE_UNAVAILABLE = int(httpcodes.SERVICE_UNAVAILABLE)
 UNAUTHORIZED = int(httpcodes.UNAUTHORIZED)
 
@@ -1,9 +1,24 @@
 # coding=utf-8
 
-from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+from functools import partial
+
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from concurrent.futures import process as futures_process
 from tornado.concurrent import chain_future, dummy_executor, TracebackFuture
 from tornado.ioloop import IOLoop
 from tornado.options import options
+from tornado.web import HTTPError
+
+from frontik.loggers import stop_background_logging
+
+try:
+    from concurrent.futures.process import BrokenProcessPool
+except ImportError:  # futures backport for Python 2
+    BrokenProcessPool = None
+
+jobs_logger = logging.getLogger('frontik.jobs')
 
 
 class IOLoopExecutor(object):
@@ -20,7 +35,159 @@ class IOLoopExecutor(object):
         return future
 
 
+class ProcessExecutor(object):
+    """Runs jobs in a pool of worker processes, which are forked on the first `submit` or `start` call.
+
+    Jobs and their arguments and results must be picklable.
+    If `queue_size` jobs are already submitted and not finished, `submit` raises HTTPError with 503 status code.
+    If a worker process dies (for example, is killed by OOM killer), jobs running at that moment fail
+    with `BrokenProcessPool` exception and the pool is recreated on the next `submit` (on Python 3 only).
+    If `job_timeout` is set, a job which is not finished in `job_timeout` seconds fails with `TimeoutError`
+    and the pool is recreated on the next `submit`, so that jobs do not wait forever for a dead worker
+    on Python 2, where `futures` backport does not detect it. Timeouts are scheduled on the current IOLoop.
+    """
+
+    def __init__(self, max_workers, queue_size, job_timeout=None):
+        self.max_workers = max_workers
+        self._executor = None
+        self._broken = False
+        self._lock = threading.Lock()
+        self.queue_size = queue_size
+        self.job_timeout = job_timeout
+        self.pending = 0
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self.pending >= self.queue_size:
+                raise HTTPError(503, 'process executor queue is full (%d jobs)', self.pending)
+
+            self.pending += 1
+
+        job = {'finished': False, 'future': None}
+        try:
+            if self._executor is None or self._broken:
+                self._create_executor()
+
+            try:
+                future = self._executor.submit(fn, *args, **kwargs)
+            except Exception as e:
+                if BrokenProcessPool is None or not isinstance(e, BrokenProcessPool):
+                    raise
+
+                self._create_executor()
+                future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._finish_job(job)
+            raise
+
+        if self.job_timeout:
+            job['future'] = Future()
+            io_loop = IOLoop.current()
+            timeout = io_loop.add_timeout(io_loop.time() + self.job_timeout, partial(self._on_job_timeout, job))
+            future.add_done_callback(lambda _: io_loop.add_callback(io_loop.remove_timeout, timeout))
+
+        future.add_done_callback(partial(self._job_done, job))
+        return future if job['future'] is None else job['future']
+
+    def start(self):
+        """Forks worker processes, so that they share everything loaded by the current process"""
+        return self.submit(_noop)
+
+    def _create_executor(self):
+        if self._executor is not None:
+            jobs_logger.error('process executor is broken, creating a new pool of worker processes')
+            _terminate_executor(self._executor)
+
+        # locks held by the log writer thread would stay locked in worker processes,
+        # which are forked by the first submit to the new pool
+        stop_background_logging()
+
+        self._executor = ProcessPoolExecutor(self.max_workers)
+        self._broken = False
+
+    def _finish_job(self, job):
+        with self._lock:
+            if job['finished']:
+                return False
+
+            job['finished'] = True
+            self.pending -= 1
+            return True
+
+    def _job_done(self, job, future):
+        if not self._finish_job(job):
+            # the job has already failed with timeout
+            return
+
+        if BrokenProcessPool is not None and not future.cancelled():
+            if isinstance(future.exception(), BrokenProcessPool):
+                self._broken = True
+
+        if job['future'] is not None:
+            if future.cancelled():
+                job['future'].cancel()
+            elif future.exception() is not None:
+                job['future'].set_exception(future.exception())
+            else:
+                job['future'].set_result(future.result())
+
+    def _on_job_timeout(self, job):
+        if not self._finish_job(job):
+            return
+
+        # the worker running the job can be dead or stuck, so the job is abandoned together with the pool
+        jobs_logger.error('process executor job has not finished in %ss', self.job_timeout)
+        self._broken = True
+        job['future'].set_exception(TimeoutError('job has not finished in {}s'.format(self.job_timeout)))
+
+
+class ProcessJobError(Exception):
+    """Picklable replacement for an exception raised by a job in a worker process.
+    `details` contains the text which would be logged in the parent process for the original exception.
+    """
+
+    def __init__(self, message, details=None):
+        super(ProcessJobError, self).__init__(message, details)
+        self.details = details
+
+    @classmethod
+    def from_exception(cls, exception, details=None):
+        return cls('{}: {}'.format(exception.__class__.__name__, exception), details)
+
+    def __str__(self):
+        return self.args[0]
+
+
+def _noop():
+    pass
+
+
+def _terminate_executor(executor):
+    """Kills worker processes of a broken pool (they can be stuck) and shuts the pool down without waiting"""
+    processes = executor._processes or ()
+    management_thread = executor._queue_management_thread
+    queues = (executor._call_queue, executor._result_queue)
+
+    for process in (processes.values() if isinstance(processes, dict) else processes):
+        process.terminate()
+
+    pending_work_items = list(executor._pending_work_items.values())
+    executor.shutdown(wait=False)
+
+    if BrokenProcessPool is None:
+        # futures backport does not notice killed workers, so unfinished jobs of the pool would never finish
+        # and the exit of the process would wait for its management thread forever
+        for work_item in pending_work_items:
+            if not work_item.future.done():
+                work_item.future.set_exception(RuntimeError('worker processes of the pool were terminated'))
+
+        futures_process._threads_queues.pop(management_thread, None)
+        for queue in queues:
+            queue.cancel_join_thread()
+
+
 _threadpool_executor = None
+_process_executor = None
 _ioloop_executor = IOLoopExecutor()
 
 
@@ -30,6 +197,14 @@ def get_executor(executor_type):
         if _threadpool_executor is None:
             _threadpool_executor = ThreadPoolExecutor(options.executor_pool_size)
         return _threadpool_executor
+    elif executor_type == 'process':
+        global _process_executor
+        if _process_executor is None:
+            _process_executor = ProcessExecutor(
+                options.process_executor_pool_size, options.process_executor_queue_size,
+                options.process_executor_job_timeout
+            )
+        return _process_executor
     elif executor_type == 'ioloop':
         return _ioloop_executor
     else:
@@ -1,11 +1,13 @@
 # coding=utf-8
 
 import json
+from functools import partial
 
 from tornado.concurrent import Future
 
 from frontik.compat import basestring_type, iteritems
 from frontik.http_client import RequestResult
+from frontik.json_codec import get_json_codec
 
 
 def _encode_value(v):
@@ -38,6 +40,14 @@ def _encode_value(v):
     return v
 
 
+def _default(obj):
+    value = _encode_value(obj)
+    if value is obj:
+        raise TypeError('{!r} is not JSON serializable'.format(obj))
+
+    return value
+
+
 class FrontikJsonEncoder(json.JSONEncoder):
     """
     This encoder supports additional value types:
@@ -104,10 +114,46 @@ class JsonBuilder(object):
 
     def to_string(self):
         if self._encoder is None:
-            return json.dumps(self._concat_chunks(), cls=FrontikJsonEncoder, ensure_ascii=False)
+            return get_json_codec().dumps(self._concat_chunks(), _default)
 
         if issubclass(self._encoder, FrontikJsonEncoder):
             return json.dumps(self._concat_chunks(), cls=self._encoder, ensure_ascii=False)
 
         # For backwards compatibility, remove when all encoders extend FrontikJsonEncoder
         return json.dumps(self.to_dict(), cls=self._encoder, ensure_ascii=False)
+
+    def iter_encode(self):
+        """ Return generator, which yields JSON representation of the data in parts, one part for each top-level key.
+        Each value is encoded with a single call of the JSON codec (C speedups are used when they are available).
+        Separators between parts are taken from the output of the codec, so concatenation of all parts
+        is the same JSON document as `to_string()` result, formatted the same way.
+        """
+        if self._encoder is None:
+            data = self._concat_chunks()
+            encode = partial(get_json_codec().dumps, default=_default)
+        elif issubclass(self._encoder, FrontikJsonEncoder):
+            data = self._concat_chunks()
+            encode = self._encoder(ensure_ascii=False).encode
+        else:
+            # For backwards compatibility, remove when all encoders extend FrontikJsonEncoder
+            data = self.to_dict()
+            encode = self._encoder(ensure_ascii=False).encode
+
+        # item separator of the codec, for example ', ' for standard json module and ',' for compact codecs
+        item_separator = encode([0, 0])[2:-2]
+
+        if self.root_node is not None:
+            data = data[self.root_node]
+            prefix, suffix = encode({self.root_node: {}})[:-2], u'}}'
+        else:
+            prefix, suffix = u'{', u'}'
+
+        yield prefix
+
+        separator = u''
+        for key, value in iteritems(data):
+            # encoding one-item dict converts non-string keys the same way as encoding the whole dict does
+            yield separator + encode({key: value})[1:-1]
+            separator = item_separator
+
+        yield suffix
@@ -0,0 +1,100 @@
+# coding=utf-8
+
+import importlib
+import json
+import logging
+
+import simplejson
+from tornado.options import options
+
+json_codec_logger = logging.getLogger('frontik.json_codec')
+
+
+class JsonCodec(object):
+    """`loads` parses JSON from bytes or string, `dumps(obj, default)` returns string.
+    `default` is called for objects, which can't be serialized by the codec itself.
+    """
+
+    __slots__ = ('name', 'loads', 'dumps')
+
+    def __init__(self, name, loads, dumps):
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+
+def _make_default_codec():
+    return JsonCodec(
+        'default', simplejson.loads,
+        lambda obj, default: json.dumps(obj, default=default, ensure_ascii=False)
+    )
+
+
+def _make_json_codec(module):
+    return JsonCodec(
+        module.__name__, module.loads,
+        lambda obj, default: module.dumps(obj, default=default, ensure_ascii=False)
+    )
+
+
+def _make_rapidjson_codec(rapidjson):
+    # older versions of python-rapidjson can't serialize dicts with non-string keys, which other codecs support
+    if not hasattr(rapidjson, 'MM_COERCE_KEYS_TO_STRINGS'):
+        json_codec_logger.warning(
+            'rapidjson %s does not support non-string keys, using it only for parsing', rapidjson.__version__
+        )
+        return JsonCodec('rapidjson', rapidjson.loads, _make_default_codec().dumps)
+
+    return JsonCodec(
+        'rapidjson', rapidjson.loads,
+        lambda obj, default: rapidjson.dumps(
+            obj, default=default, ensure_ascii=False, mapping_mode=rapidjson.MM_COERCE_KEYS_TO_STRINGS
+        )
+    )
+
+
+def _make_orjson_codec(orjson):
+    return JsonCodec(
+        'orjson', orjson.loads,
+        lambda obj, default: orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    )
+
+
+JSON_CODECS = {
+    'json': _make_json_codec,
+    'simplejson': _make_json_codec,
+    'rapidjson': _make_rapidjson_codec,
+    'orjson': _make_orjson_codec,
+}
+
+_codecs = {}
+
+
+def get_json_codec():
+    """Returns codec selected by `json_codec` option.
+
+    By default (and if the selected library is not installed) JSON is parsed with simplejson
+    and encoded with standard json module.
+    """
+    name = options.json_codec
+
+    if name not in _codecs:
+        _codecs[name] = _load_codec(name)
+
+    return _codecs[name]
+
+
+def _load_codec(name):
+    if name is None:
+        return _make_default_codec()
+
+    if name not in JSON_CODECS:
+        raise ValueError('Invalid value for json_codec: "{0}"'.format(name))
+
+    try:
+        module = importlib.import_module(name)
+    except ImportError:
+        json_codec_logger.warning('json codec %s is not available, falling back to simplejson', name)
+        return _make_default_codec()
+
+    return JSON_CODECS[name](module)
@@ -1,12 +1,16 @@
 # coding=utf-8
 
+import json
 import logging
+import os
 import socket
+import threading
 from logging.handlers import SysLogHandler
 
 from tornado.log import LogFormatter
 from tornado.options import options
 
+from frontik.compat import queue
 from frontik.loggers import sentry
 from frontik.request_context import RequestContext
 
@@ -24,16 +28,44 @@ for this request handler (for example, add some specific methods for the handler
 LOGGERS = (sentry, )
 
 ROOT_LOGGER = logging.root
+ACCESS_LOGGER = logging.getLogger('frontik.access')
+ACCESS_LOG_QUEUE_SIZE = 10000
 
 
 class ContextFilter(logging.Filter):
+    """Adds `handler_name` and `request_id` fields of the current request to records and appends them
+    to the record name. Log context is computed once per request (see `set_request_log_context`).
+    """
+
     def filter(self, record):
-        handler_name = RequestContext.get('handler_name')
-        request_id = RequestContext.get('request_id')
-        record.name = '.'.join(filter(None, [record.name, handler_name, request_id]))
+        # the same record is passed to each handler
+        if hasattr(record, 'request_id'):
+            return True
+
+        context = RequestContext.get('log_context')
+        if context is None:
+            record.handler_name = record.request_id = None
+        else:
+            record.handler_name, record.request_id, name_suffix = context
+            record.name += name_suffix
+
         return True
 
 
+def set_request_log_context(request_id, handler_name=None):
+    name_suffix = ''.join('.' + part for part in (handler_name, request_id) if part)
+    RequestContext.set('log_context', (handler_name, request_id, name_suffix))
+
+
+class AccessLogFormatter(logging.Formatter):
+    """Formats access log records (see `RequestLogger.log_access`) as JSON objects"""
+
+    def format(self, record):
+        fields = dict(record._access_log)
+        fields['time'] = round(record.created, 3)
+        return json.dumps(fields, sort_keys=True)
+
+
 class BufferedHandler(logging.Handler):
     def __init__(self, level=logging.NOTSET):
         super(BufferedHandler, self).__init__(level)
@@ -48,8 +80,141 @@ class BufferedHandler(logging.Handler):
 
 class GlobalLogHandler(logging.Handler):
     def handle(self, record):
-        if RequestContext.get('log_handler'):
-            RequestContext.get('log_handler').handle(record)
+        log_handler = RequestContext.get('log_handler')
+        if log_handler is not None:
+            log_handler.handle(record)
+
+
+_background_handlers = []
+
+
+class BackgroundLogHandler(logging.Handler):
+    """Passes records to `handlers` in a background thread, so that slow disk or syslog do not block IOLoop.
+
+    Records are formatted by `handlers` in the background thread. At most `queue_size` records wait in the queue,
+    new records are dropped while it is full. Records are taken from the queue in batches of at most `BATCH_SIZE`,
+    `handlers` are flushed after each batch. The thread is started on the first record in each process.
+    """
+
+    BATCH_SIZE = 100
+
+    def __init__(self, handlers, queue_size):
+        super(BackgroundLogHandler, self).__init__()
+        self.handlers = handlers
+        self.queue_size = queue_size
+
+        self.written = 0
+        self.dropped = 0
+
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+        _background_handlers.append(self)
+
+    def handle(self, record):
+        if not self.filter(record):
+            return False
+
+        self._start()
+
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+        return True
+
+    def stop(self):
+        """Writes all queued records and stops the thread, it is started again on the next record"""
+        self.acquire()
+        try:
+            if self._pid == os.getpid():
+                self._queue.put(None)
+                self._thread.join()
+
+            self._queue = self._thread = self._pid = None
+        finally:
+            self.release()
+
+    def close(self):
+        self.stop()
+
+        if self in _background_handlers:
+            _background_handlers.remove(self)
+
+        super(BackgroundLogHandler, self).close()
+
+    def get_stats(self):
+        return {
+            'queued': self._queue.qsize() if self._pid == os.getpid() else 0,
+            'written': self.written,
+            'dropped': self.dropped,
+        }
+
+    def _start(self):
+        if self._pid == os.getpid():
+            return
+
+        self.acquire()
+        try:
+            # the thread of the parent process does not exist after fork
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(self.queue_size)
+                self._thread = threading.Thread(
+                    target=self._write_records, args=(self._queue,), name='frontik-log-writer'
+                )
+                self._thread.daemon = True
+                self._thread.start()
+                self._pid = os.getpid()
+        finally:
+            self.release()
+
+    def _write_records(self, records):
+        stopped = False
+
+        while not stopped:
+            batch = [records.get()]
+            try:
+                while len(batch) < self.BATCH_SIZE:
+                    batch.append(records.get_nowait())
+            except queue.Empty:
+                pass
+
+            for record in batch:
+                if record is None:
+                    stopped = True
+                    break
+
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+
+                self.written += 1
+
+            for handler in self.handlers:
+                handler.flush()
+
+
+_output_level = logging.NOTSET
+
+
+def get_output_level():
+    """Returns the lowest level of records written to file, stderr or syslog"""
+    return _output_level
+
+
+def stop_background_logging():
+    for handler in _background_handlers:
+        handler.stop()
+
+
+def get_background_logging_stats():
+    if not _background_handlers:
+        return None
+
+    stats = [handler.get_stats() for handler in _background_handlers]
+    return dict((name, sum(s[name] for s in stats)) for name in stats[0])
 
 
 def bootstrap_app_loggers(app):
@@ -58,9 +223,10 @@ def bootstrap_app_loggers(app):
 
 def bootstrap_core_logging():
     """This is a replacement for standard Tornado logging configuration."""
+    global _output_level
 
     handlers = []
-    level = getattr(logging, options.loglevel.upper())
+    level = _output_level = getattr(logging, options.loglevel.upper())
     context_filter = ContextFilter()
     ROOT_LOGGER.setLevel(logging.NOTSET)
 
@@ -99,10 +265,34 @@ def bootstrap_core_logging():
 
     for handler in handlers:
         handler.setLevel(level)
+
+    if options.log_queue_size > 0 and handlers:
+        background_handler = BackgroundLogHandler(handlers, options.log_queue_size)
+        background_handler.setLevel(level)
+        handlers = [background_handler]
+
+    for handler in handlers:
         handler.addFilter(context_filter)
         ROOT_LOGGER.addHandler(handler)
 
     ROOT_LOGGER.addHandler(GlobalLogHandler())
 
+    if options.access_log_file:
+        access_log_handler = logging.handlers.WatchedFileHandler(options.access_log_file)
+        access_log_handler.setFormatter(AccessLogFormatter())
+
+        # handlers of the previous call are replaced, so that records are not written twice
+        for handler in list(ACCESS_LOGGER.handlers):
+            if isinstance(handler, BackgroundLogHandler):
+                ACCESS_LOGGER.removeHandler(handler)
+                handler.close()
+                for file_handler in handler.handlers:
+                    file_handler.close()
+
+        ACCESS_LOGGER.propagate = False
+        ACCESS_LOGGER.addHandler(
+            BackgroundLogHandler([access_log_handler], options.log_queue_size or ACCESS_LOG_QUEUE_SIZE)
+        )
+
     if not ROOT_LOGGER.handlers:
         ROOT_LOGGER.addHandler(logging.NullHandler())
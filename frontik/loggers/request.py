@@ -4,14 +4,26 @@ import logging
 import time
 from collections import namedtuple
 
+from frontik.loggers import ACCESS_LOGGER, get_output_level
+from frontik.metrics import Counter, Histogram
 from frontik.request_context import RequestContext
 
 logger = None  # for smooth transition from LoggerAdapter instances to the global logger
 
 _logger = logging.getLogger('frontik.handler')
 
+STAGE_DURATION = Histogram('frontik_stage_duration_seconds', 'Duration of page generation stages', ['stage'])
+REQUEST_DURATION = Histogram('frontik_request_duration_seconds', 'Total time of handling requests')
+REQUESTS = Counter('frontik_requests_total', 'Number of handled requests', ['code'])
+
 
 class RequestLogger(logging.LoggerAdapter):
+    """Logger of the request handler.
+
+    Records below the level of file, stderr and syslog output are not created at all (on Python 3), unless
+    the request has its own log handler (in debug mode). Request id and handler name are added to records
+    by `ContextFilter`.
+    """
 
     Stage = namedtuple('Stage', ('name', 'delta', 'start_delta'))
 
@@ -20,6 +32,12 @@ class RequestLogger(logging.LoggerAdapter):
         self._last_stage_time = self._start_time = request._start_time
         self.stages = []
 
+        # times are in milliseconds
+        self.upstream_requests = 0
+        self.upstream_time = 0
+        self.upstream_bytes = 0
+        self.executor_wait_time = 0
+
         super(RequestLogger, self).__init__(_logger, {})
 
         # backcompatibility with logger
@@ -35,7 +53,10 @@ class RequestLogger(logging.LoggerAdapter):
         stage = RequestLogger.Stage(stage_name, delta, start_delta)
 
         self.stages.append(stage)
-        self.debug('stage "%s" completed in %.2fms', stage.name, stage.delta, extra={'_stage': stage})
+        STAGE_DURATION.labels(stage_name).observe(delta / 1000)
+
+        if self.isEnabledFor(logging.DEBUG):
+            self.debug('stage "%s" completed in %.2fms', stage.name, stage.delta, extra={'_stage': stage})
 
     def get_current_total(self):
         return sum(s.delta for s in self.stages)
@@ -46,6 +67,9 @@ class RequestLogger(logging.LoggerAdapter):
         stages_str = ' '.join('{s.name}={s.delta:.2f}'.format(s=s) for s in self.stages)
         total = sum(s.delta for s in self.stages)
 
+        REQUESTS.labels(str(status_code)).inc()
+        REQUEST_DURATION.observe(total / 1000)
+
         self.info(
             'timings for %(page)s : %(stages)s',
             {
@@ -54,10 +78,42 @@ class RequestLogger(logging.LoggerAdapter):
             },
         )
 
-    def process(self, msg, kwargs):
-        if 'extra' in kwargs:
-            kwargs['extra'].update(self.extra)
-        else:
-            kwargs['extra'] = self.extra
+    def add_upstream_response(self, response):
+        self.upstream_requests += 1
+        self.upstream_time += response.request_time * 1000
+        self.upstream_bytes += len(response.body) if response.body is not None else 0
+
+    def add_executor_wait_time(self, submit_time, start_time):
+        self.executor_wait_time += max(0, start_time - submit_time) * 1000
+
+    def log_access(self, method, status_code):
+        """Writes access log record (if `access_log_file` option is set) with stages and upstream timings"""
+        if not ACCESS_LOGGER.handlers:
+            return
+
+        stages = {}
+        for stage in self.stages:
+            stages[stage.name] = round(stages.get(stage.name, 0) + stage.delta, 2)
+
+        ACCESS_LOGGER.info('access log', extra={'_access_log': {
+            'request_id': RequestContext.get('request_id'),
+            'handler': RequestContext.get('handler_name'),
+            'method': method,
+            'status': status_code,
+            'total': round(self.get_current_total(), 2),
+            'stages': stages,
+            'upstream_requests': self.upstream_requests,
+            'upstream_time': round(self.upstream_time, 2),
+            'upstream_bytes': self.upstream_bytes,
+            'executor_wait_time': round(self.executor_wait_time, 2),
+        }})
+
+    def isEnabledFor(self, level):
+        if level < get_output_level() and RequestContext.get('log_handler') is None:
+            return False
+
+        return self.logger.isEnabledFor(level)
 
+    def process(self, msg, kwargs):
+        # context of the request is added to records by ContextFilter
         return msg, kwargs
@@ -0,0 +1,195 @@
+# coding=utf-8
+
+from bisect import bisect_left
+from collections import OrderedDict
+
+from frontik.compat import iteritems
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MetricsRegistry(object):
+    """Metrics of the process, which are served in Prometheus text format on `/metrics` page"""
+
+    def __init__(self):
+        self._metrics = OrderedDict()
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError('Metric "{}" is already registered'.format(metric.name))
+
+        self._metrics[metric.name] = metric
+
+    def expose(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.expose())
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class _Value(object):
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _HistogramValue(object):
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Metric(object):
+    """Base class of metrics.
+
+    Metrics with `labelnames` have a separate value for each combination of label values, which is returned
+    by `labels` method. Values of metrics without labels are updated with methods of the metric itself.
+    """
+
+    TYPE = None
+
+    def __init__(self, name, documentation, labelnames=(), metrics_registry=registry):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+        if not self.labelnames:
+            self._value = self._values[()] = self._make_value()
+
+        metrics_registry.register(self)
+
+    def labels(self, *labelvalues):
+        value = self._values.get(labelvalues)
+        if value is None:
+            if len(labelvalues) != len(self.labelnames):
+                raise ValueError('Metric "{}" has labels {}'.format(self.name, self.labelnames))
+
+            value = self._values[labelvalues] = self._make_value()
+
+        return value
+
+    def expose(self):
+        lines = [
+            '# HELP {} {}'.format(self.name, self.documentation),
+            '# TYPE {} {}'.format(self.name, self.TYPE),
+        ]
+
+        for labelvalues, value in sorted(iteritems(self._values)):
+            lines.extend(self._expose_value(list(zip(self.labelnames, labelvalues)), value))
+
+        return lines
+
+    def _make_value(self):
+        return _Value()
+
+    def _expose_value(self, labels, value):
+        return [_format_sample(self.name, labels, value.value)]
+
+
+class Counter(Metric):
+    TYPE = 'counter'
+
+    def inc(self, amount=1):
+        self._value.inc(amount)
+
+
+class Gauge(Metric):
+    """Gauge, which is either set explicitly or computed with `function` on exposition"""
+
+    TYPE = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), metrics_registry=registry):
+        super(Gauge, self).__init__(name, documentation, labelnames, metrics_registry)
+        self._function = None
+
+    def inc(self, amount=1):
+        self._value.inc(amount)
+
+    def dec(self, amount=1):
+        self._value.dec(amount)
+
+    def set(self, value):
+        self._value.set(value)
+
+    def set_function(self, function):
+        self._function = function
+
+    def _expose_value(self, labels, value):
+        return [_format_sample(self.name, labels, self._function() if self._function is not None else value.value)]
+
+
+class Histogram(Metric):
+    """Histogram with fixed `buckets` (upper bounds of observed values), `+Inf` bucket is added automatically"""
+
+    TYPE = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, metrics_registry=registry):
+        self.buckets = tuple(sorted(buckets))
+        super(Histogram, self).__init__(name, documentation, labelnames, metrics_registry)
+
+    def observe(self, value):
+        self._value.observe(value)
+
+    def _make_value(self):
+        return _HistogramValue(self.buckets)
+
+    def _expose_value(self, labels, value):
+        lines = []
+        total = 0
+
+        for bound, count in zip(self.buckets + (float('inf'),), value.counts):
+            total += count
+            lines.append(_format_sample(self.name + '_bucket', labels + [('le', bound)], total))
+
+        lines.append(_format_sample(self.name + '_sum', labels, value.sum))
+        lines.append(_format_sample(self.name + '_count', labels, total))
+        return lines
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+
+    return repr(value)
+
+
+def _escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_sample(name, labels, value):
+    if not labels:
+        return '{} {}'.format(name, _format_number(value))
+
+    labels_str = ','.join(
+        '{}="{}"'.format(
+            label, _format_number(label_value) if label == 'le' else _escape_label_value(label_value)
+        ) for label, label_value in labels
+    )
+
+    return '{}{{{}}} {}'.format(name, labels_str, _format_number(value))
@@ -0,0 +1,251 @@
+# coding=utf-8
+
+import errno
+import json
+import logging
+import mmap
+import os
+import random
+import signal
+import struct
+import sys
+import time
+from collections import deque
+
+from tornado.escape import to_unicode, utf8
+
+from frontik.loggers import stop_background_logging
+
+process_logger = logging.getLogger('frontik.process')
+
+# the server is stopped, if workers are restarted more than MAX_WORKER_RESTARTS times in WORKER_RESTARTS_WINDOW seconds
+MAX_WORKER_RESTARTS = 10
+WORKER_RESTARTS_WINDOW = 60
+# a worker, which crashed earlier than WORKER_MIN_UPTIME seconds after start, is restarted with exponential backoff
+WORKER_MIN_UPTIME = 10
+WORKER_RESTART_DELAY = 0.1
+MAX_WORKER_RESTART_DELAY = 10
+STATUS_SLOT_SIZE = 64 * 1024
+_STATUS_HEADER = struct.Struct('>I')
+
+worker_id = None
+status_storage = None
+
+
+class WorkerStatusStorage(object):
+    """Anonymous shared memory, which is created in the master process before forking.
+    Each worker periodically writes its status to its own slot, and any worker can read statuses of all workers.
+    """
+
+    def __init__(self, workers_count):
+        self.workers_count = workers_count
+        self._mmap = mmap.mmap(-1, workers_count * STATUS_SLOT_SIZE)
+
+    def write(self, slot, status):
+        data = utf8(json.dumps(status))
+        if len(data) > STATUS_SLOT_SIZE - _STATUS_HEADER.size:
+            data = utf8(json.dumps({'error': 'status is too large'}))
+
+        offset = slot * STATUS_SLOT_SIZE
+        self._mmap[offset:offset + _STATUS_HEADER.size + len(data)] = _STATUS_HEADER.pack(len(data)) + data
+
+    def clear(self, slot):
+        offset = slot * STATUS_SLOT_SIZE
+        self._mmap[offset:offset + _STATUS_HEADER.size] = _STATUS_HEADER.pack(0)
+
+    def read(self, slot):
+        offset = slot * STATUS_SLOT_SIZE
+        length, = _STATUS_HEADER.unpack(self._mmap[offset:offset + _STATUS_HEADER.size])
+        if length == 0:
+            return None
+
+        data_offset = offset + _STATUS_HEADER.size
+        try:
+            return json.loads(to_unicode(self._mmap[data_offset:data_offset + length]))
+        except ValueError:  # status is being written at the moment
+            return None
+
+    def read_all(self):
+        return [self.read(slot) for slot in range(self.workers_count)]
+
+
+def get_workers_status():
+    statuses = status_storage.read_all()
+    alive = [s for s in statuses if s is not None]
+
+    return {
+        'count': status_storage.workers_count,
+        'alive': len(alive),
+        'workers': {
+            'total': sum(s.get('workers', {}).get('total', 0) for s in alive),
+            'free': sum(s.get('workers', {}).get('free', 0) for s in alive),
+        },
+        'statuses': statuses,
+    }
+
+
+def publish_worker_status(status):
+    status['pid'] = os.getpid()
+    status['worker_id'] = worker_id
+    status_storage.write(worker_id, status)
+
+
+def fork_workers(workers_count, stop_timeout):
+    """Forks `workers_count` worker processes and supervises them.
+
+    Returns worker id (from 0 to `workers_count - 1`) in worker processes. In the master process this function
+    restarts crashed workers and never returns: on SIGTERM or SIGINT it is passed to all workers,
+    remaining workers are killed after `stop_timeout` seconds and the master process exits.
+
+    Workers crashing soon after start are restarted with exponential backoff. If there are more than
+    `MAX_WORKER_RESTARTS` restarts in `WORKER_RESTARTS_WINDOW` seconds, the server is stopped.
+    """
+
+    global status_storage
+    status_storage = WorkerStatusStorage(workers_count)
+
+    children = {}
+    state = {'shutdown': False}
+    restart_times = deque()
+    pending_restarts = {}
+    crashes = [0] * workers_count
+
+    def fork_worker(worker_number):
+        # locks held by the log writer thread would stay locked in the child process
+        stop_background_logging()
+
+        pid = os.fork()
+        if pid == 0:
+            _init_worker(worker_number)
+            return True
+
+        children[pid] = (worker_number, time.time())
+        process_logger.info('started worker %d, pid %d', worker_number, pid)
+        return False
+
+    def kill_children(signum):
+        for pid in children:
+            try:
+                os.kill(pid, signum)
+            except OSError as e:
+                if e.errno != errno.ESRCH:
+                    raise
+
+    def shutdown_handler(signum, frame):
+        if state['shutdown']:
+            return
+
+        process_logger.info('requested shutdown, stopping %d workers', len(children))
+        state['shutdown'] = True
+        pending_restarts.clear()
+        kill_children(signal.SIGTERM)
+        signal.alarm(int(stop_timeout) + 1)
+
+    def kill_handler(signum, frame):
+        process_logger.warning('workers did not stop in %s seconds, killing them', stop_timeout)
+        kill_children(signal.SIGKILL)
+
+    def schedule_restart(worker_number, start_time):
+        now = time.time()
+
+        while restart_times and restart_times[0] < now - WORKER_RESTARTS_WINDOW:
+            restart_times.popleft()
+
+        if len(restart_times) >= MAX_WORKER_RESTARTS:
+            process_logger.error(
+                'workers were restarted %d times in %d seconds, shutting down',
+                len(restart_times), WORKER_RESTARTS_WINDOW
+            )
+            shutdown_handler(signal.SIGTERM, None)
+            return
+
+        restart_times.append(now)
+
+        if now - start_time < WORKER_MIN_UPTIME:
+            delay = min(WORKER_RESTART_DELAY * 2 ** crashes[worker_number], MAX_WORKER_RESTART_DELAY)
+            crashes[worker_number] += 1
+        else:
+            delay = 0
+            crashes[worker_number] = 0
+
+        if delay > 0:
+            process_logger.info('restarting worker %d in %.1f seconds', worker_number, delay)
+
+        pending_restarts[worker_number] = now + delay
+
+    def wait_child():
+        if not pending_restarts:
+            return os.wait()
+
+        # poll children until the nearest pending restart
+        while pending_restarts:
+            timeout = min(pending_restarts.values()) - time.time()
+            if timeout <= 0:
+                break
+
+            if children:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+                if pid != 0:
+                    return pid, status
+
+            time.sleep(min(timeout, 0.1))
+
+        return None, None
+
+    for i in range(workers_count):
+        if fork_worker(i):
+            return i
+
+    signal.signal(signal.SIGTERM, shutdown_handler)
+    signal.signal(signal.SIGINT, shutdown_handler)
+    signal.signal(signal.SIGALRM, kill_handler)
+
+    while children or pending_restarts:
+        now = time.time()
+        for worker_number, restart_time in list(pending_restarts.items()):
+            if restart_time <= now:
+                del pending_restarts[worker_number]
+                if fork_worker(worker_number):
+                    return worker_number
+
+        try:
+            pid, status = wait_child()
+        except OSError as e:
+            if e.errno == errno.EINTR:
+                continue
+            raise
+
+        if pid not in children:
+            continue
+
+        worker_number, start_time = children.pop(pid)
+        status_storage.clear(worker_number)
+
+        if state['shutdown']:
+            process_logger.info('worker %d (pid %d) stopped', worker_number, pid)
+            continue
+
+        if os.WIFSIGNALED(status):
+            process_logger.warning(
+                'worker %d (pid %d) killed by signal %d', worker_number, pid, os.WTERMSIG(status)
+            )
+        else:
+            process_logger.warning(
+                'worker %d (pid %d) exited with status %d', worker_number, pid, os.WEXITSTATUS(status)
+            )
+
+        schedule_restart(worker_number, start_time)
+
+    process_logger.info('all workers stopped')
+    sys.exit(0)
+
+
+def _init_worker(worker_number):
+    global worker_id
+    worker_id = worker_number
+
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGALRM):
+        signal.signal(signum, signal.SIG_DFL)
+
+    # forked processes must not share random state
+    random.seed()
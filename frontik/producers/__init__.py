@@ -1,5 +1,14 @@
 # coding=utf-8
 
+from frontik.metrics import Histogram
+
+PRODUCER_DURATION = Histogram(
+    'frontik_producer_duration_seconds', 'Time of applying XSL and templates', ['producer']
+)
+EXECUTOR_WAIT_DURATION = Histogram(
+    'frontik_executor_wait_seconds', 'Time XSLT and templating jobs waited for the executor', ['producer']
+)
+
 
 class ProducerFactory(object):
     def get_producer(self, handler):
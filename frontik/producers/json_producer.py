@@ -1,5 +1,6 @@
 # coding=utf-8
 
+import pickle
 import time
 import weakref
 
@@ -11,7 +12,10 @@ from tornado.options import options
 import frontik.jobs
 import frontik.json_builder
 from frontik.util import get_cookie_or_url_param_value, raise_future_exception
-from frontik.producers import ProducerFactory
+from frontik.producers import EXECUTOR_WAIT_DURATION, PRODUCER_DURATION, ProducerFactory
+
+# Jinja environment for jobs running in the process executor, worker processes get a copy of it when they are forked
+_process_environment = None
 
 
 class JsonProducerFactory(ProducerFactory):
@@ -27,6 +31,31 @@ class JsonProducerFactory(ProducerFactory):
         else:
             self.environment = None
 
+        if options.json_executor == 'process':
+            global _process_environment
+            _process_environment = getattr(self.environment, 'environment', self.environment)
+
+    def warm_up(self, log):
+        if self.environment is None:
+            return
+
+        environment = getattr(self.environment, 'environment', self.environment)
+
+        try:
+            templates = environment.list_templates()
+        except TypeError:
+            log.info('template loader does not support listing templates, skipping warm up')
+            return
+
+        for template_name in templates:
+            start_time = time.time()
+
+            try:
+                environment.get_template(template_name)
+                log.info('compiled template %s in %.2fms', template_name, (time.time() - start_time) * 1000)
+            except Exception as e:
+                log.warning('failed to compile template %s: %s', template_name, e)
+
     def get_producer(self, handler):
         return JsonProducer(
             handler,
@@ -47,6 +76,7 @@ class JsonProducer(object):
         self.template_filename = None
         self.environment = getattr(environment, 'environment', environment)  # Temporary for transition period
         self.jinja_context_provider = jinja_context_provider
+        self._job_future = None
 
     def __call__(self, callback):
         if get_cookie_or_url_param_value(self.handler, 'notpl') is not None:
@@ -62,6 +92,11 @@ class JsonProducer(object):
     def set_template(self, filename):
         self.template_filename = filename
 
+    def cancel(self):
+        """Cancels templating job, if it has not been started by the executor yet"""
+        if self._job_future is not None and self._job_future.cancel():
+            self.log.info('templating job cancelled')
+
     def _finish_with_template(self, callback):
         if not self.environment:
             raise Exception('Cannot apply template, no Jinja2 environment configured')
@@ -69,43 +104,59 @@ class JsonProducer(object):
         if self.handler._headers.get('Content-Type') is None:
             self.handler.set_header('Content-Type', 'text/html; charset=utf-8')
 
-        def job():
-            start_time = time.time()
-            template = self.environment.get_template(self.template_filename)
-
+        def get_jinja_context():
             if callable(self.jinja_context_provider):
-                jinja_context = self.jinja_context_provider(self.handler)
+                return self.jinja_context_provider(self.handler)
             else:
-                jinja_context = self.json.to_dict()
+                return self.json.to_dict()
 
-            result = template.render(**jinja_context)
+        def job():
+            start_time = time.time()
+            template = self.environment.get_template(self.template_filename)
+            result = template.render(**get_jinja_context())
             return start_time, result
 
         def job_callback(future):
-            if future.exception() is not None:
+            if future.cancelled():
+                return
+
+            exception = future.exception()
+            if exception is not None:
                 self.log.error('failed applying template %s', self.template_filename)
 
-                exception = future.exception()
-                if isinstance(exception, jinja2.TemplateSyntaxError):
-                    self.log.error(
-                        u'%s in file "%s", line %d\n\t%s',
-                        exception.__class__.__name__, to_unicode(exception.filename),
-                        exception.lineno, to_unicode(exception.message)
-                    )
-                elif isinstance(exception, jinja2.TemplateError):
-                    self.log.error(u'%s error\n\t%s', exception.__class__.__name__, to_unicode(exception.message))
+                if isinstance(exception, frontik.jobs.ProcessJobError):
+                    error_log = exception.details
+                else:
+                    error_log = _get_template_error_log(exception)
+
+                if error_log:
+                    self.log.error(error_log)
 
                 raise_future_exception(future)
                 return
 
             start_time, result = future.result()
+            self.log.add_executor_wait_time(submit_time, start_time)
+
+            template_time = time.time() - start_time
+            PRODUCER_DURATION.labels('template').observe(template_time)
+            EXECUTOR_WAIT_DURATION.labels('template').observe(max(0, start_time - submit_time))
 
             self.log.stage_tag('tpl')
-            self.log.info('applied template %s in %.2fms', self.template_filename, (time.time() - start_time) * 1000)
+            self.log.info('applied template %s in %.2fms', self.template_filename, template_time * 1000)
 
             callback(utf8(result))
 
-        future = self.executor.submit(job)
+        if isinstance(self.executor, frontik.jobs.ProcessExecutor):
+            # context is pickled here to report unpicklable values in the handler, not in the executor
+            jinja_context = pickle.dumps(get_jinja_context(), pickle.HIGHEST_PROTOCOL)
+            submit_time = time.time()
+            future = self.executor.submit(_render_template_in_process, self.template_filename, jinja_context)
+        else:
+            submit_time = time.time()
+            future = self.executor.submit(job)
+
+        self._job_future = future
         self.ioloop.add_future(future, self.handler.check_finished(job_callback))
         return future
 
@@ -113,7 +164,59 @@ class JsonProducer(object):
         self.log.debug('finishing without templating')
         if self.handler._headers.get('Content-Type') is None:
             self.handler.set_header('Content-Type', 'application/json; charset=utf-8')
-        callback(utf8(self.json.to_string()))
+
+        # template postprocessors need the whole response
+        if options.json_stream_chunk_size > 0 and not self.handler._template_postprocessors:
+            self._stream_json(callback)
+        else:
+            callback(utf8(self.json.to_string()))
+
+    def _stream_json(self, callback):
+        parts = self.json.iter_encode()
+        start_time = time.time()
+
+        def write_chunk():
+            if self.handler._finished:
+                return
+
+            chunk_size = 0
+            for part in parts:
+                part = utf8(part)
+                self.handler.write(part)
+                chunk_size += len(part)
+
+                if chunk_size >= options.json_stream_chunk_size:
+                    self.handler.flush()
+                    self.ioloop.add_callback(write_chunk)
+                    return
+
+            self.log.debug('streamed JSON in %.2fms', (time.time() - start_time) * 1000)
+            callback(None)
+
+        write_chunk()
 
     def __repr__(self):
         return '{}.{}'.format(__package__, self.__class__.__name__)
+
+
+def _get_template_error_log(exception):
+    if isinstance(exception, jinja2.TemplateSyntaxError):
+        return u'{} in file "{}", line {}\n\t{}'.format(
+            exception.__class__.__name__, to_unicode(exception.filename),
+            exception.lineno, to_unicode(exception.message)
+        )
+    elif isinstance(exception, jinja2.TemplateError):
+        return u'{} error\n\t{}'.format(exception.__class__.__name__, to_unicode(exception.message))
+
+    return None
+
+
+def _render_template_in_process(template_filename, jinja_context):
+    start_time = time.time()
+
+    try:
+        result = _process_environment.get_template(template_filename).render(**pickle.loads(jinja_context))
+    except Exception as e:
+        raise frontik.jobs.ProcessJobError.from_exception(e, _get_template_error_log(e))
+
+    return start_time, utf8(result)
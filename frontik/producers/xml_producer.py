@@ -1,6 +1,5 @@
 # coding=utf-8
 
-import copy
 import time
 import weakref
 
@@ -12,10 +11,13 @@ import frontik.doc
 import frontik.jobs
 import frontik.util
 from frontik import file_cache
-from frontik.producers import ProducerFactory
+from frontik.producers import EXECUTOR_WAIT_DURATION, PRODUCER_DURATION, ProducerFactory
 from frontik.util import raise_future_exception
 from frontik.xml_util import xml_from_file, xsl_from_file
 
+# XSL cache for jobs running in the process executor, worker processes get a copy of it when they are forked
+_process_xsl_cache = None
+
 
 class XMLProducerFactory(ProducerFactory):
     def __init__(self, application):
@@ -27,7 +29,8 @@ class XMLProducerFactory(ProducerFactory):
             xml_from_file,
             getattr(config, 'XML_cache_limit', None),
             getattr(config, 'XML_cache_step', None),
-            deepcopy=True
+            deepcopy=True,
+            revalidate_interval=getattr(config, 'XML_cache_revalidate_interval', None)
         )
 
         self.xsl_cache = file_cache.make_file_cache(
@@ -35,12 +38,21 @@ class XMLProducerFactory(ProducerFactory):
             getattr(config, 'XSL_root', None),
             xsl_from_file,
             getattr(config, 'XSL_cache_limit', None),
-            getattr(config, 'XSL_cache_step', None)
+            getattr(config, 'XSL_cache_step', None),
+            revalidate_interval=getattr(config, 'XSL_cache_revalidate_interval', None)
         )
 
+        if tornado.options.options.xsl_executor == 'process':
+            global _process_xsl_cache
+            _process_xsl_cache = self.xsl_cache
+
     def get_producer(self, handler):
         return XmlProducer(handler, xml_cache=self.xml_cache, xsl_cache=self.xsl_cache)
 
+    def warm_up(self, log):
+        self.xsl_cache.warm_up(log, extension='.xsl')
+        self.xml_cache.warm_up(log, extension='.xml')
+
 
 class XmlProducer(object):
     def __init__(self, handler, xml_cache=None, xsl_cache=None):
@@ -55,6 +67,7 @@ class XmlProducer(object):
         self.doc = frontik.doc.Doc()
         self.transform = None
         self.transform_filename = None
+        self._job_future = None
 
     def __call__(self, callback):
         if any(frontik.util.get_cookie_or_url_param_value(self.handler, p) is not None for p in ('noxsl', 'notpl')):
@@ -84,44 +97,76 @@ class XmlProducer(object):
     def set_xsl(self, filename):
         self.transform_filename = filename
 
+    def cancel(self):
+        """Cancels XSLT job, if it has not been started by the executor yet"""
+        if self._job_future is not None and self._job_future.cancel():
+            self.log.info('XSLT job cancelled')
+
     def _finish_with_xslt(self, callback):
         self.log.debug('finishing with XSLT')
 
         if self.handler._headers.get('Content-Type') is None:
             self.handler.set_header('Content-Type', 'text/html; charset=utf-8')
 
+        profile_run = self.handler.debug_mode.profile_xslt
+
         def job():
             start_time = time.time()
-            result = self.transform(copy.deepcopy(self.doc.to_etree_element()),
-                                    profile_run=self.handler.debug_mode.profile_xslt)
-            return start_time, str(result), result.xslt_profile
+            # XSLT does not modify the input tree, which is built once and is used only by this job
+            result = self.transform(self.doc.to_etree_element(), profile_run=profile_run)
+            xslt_profile = result.xslt_profile.getroot() if result.xslt_profile is not None else None
+            return start_time, str(result), xslt_profile, _get_xsl_log(self.transform.error_log)
 
         def job_callback(future):
-            if future.exception() is not None:
+            if future.cancelled():
+                return
+
+            exception = future.exception()
+            if exception is not None:
                 self.log.error('failed transformation with XSL %s', self.transform_filename)
-                self.log.error(get_xsl_log())
+
+                if isinstance(exception, frontik.jobs.ProcessJobError):
+                    if exception.details:
+                        self.log.error(exception.details)
+                else:
+                    self.log.error(_get_xsl_log(self.transform.error_log))
 
                 raise_future_exception(future)
                 return
 
-            start_time, xml_result, xslt_profile = future.result()
+            start_time, xml_result, xslt_profile, xsl_log = future.result()
+            self.log.add_executor_wait_time(submit_time, start_time)
+
+            xsl_time = time.time() - start_time
+            PRODUCER_DURATION.labels('xsl').observe(xsl_time)
+            EXECUTOR_WAIT_DURATION.labels('xsl').observe(max(0, start_time - submit_time))
 
-            self.log.info('applied XSL %s in %.2fms', self.transform_filename, (time.time() - start_time) * 1000)
+            self.log.info('applied XSL %s in %.2fms', self.transform_filename, xsl_time * 1000)
 
             if xslt_profile is not None:
-                self.log.debug('XSLT profiling results', extra={'_xslt_profile': xslt_profile.getroot()})
+                if isinstance(xslt_profile, bytes):
+                    xslt_profile = etree.fromstring(xslt_profile)
 
-            if len(self.transform.error_log):
-                self.log.warning(get_xsl_log())
+                self.log.debug('XSLT profiling results', extra={'_xslt_profile': xslt_profile})
+
+            if xsl_log:
+                self.log.warning(xsl_log)
 
             self.log.stage_tag('xsl')
             callback(xml_result)
 
-        def get_xsl_log():
-            xsl_line = 'XSLT {0.level_name} in file "{0.filename}", line {0.line}, column {0.column}\n\t{0.message}'
-            return '\n'.join(map(xsl_line.format, self.transform.error_log))
+        # lazy results of requests are parsed here, the job only builds the tree from them
+        self.doc.resolve_results()
+
+        submit_time = time.time()
+        if isinstance(self.executor, frontik.jobs.ProcessExecutor):
+            future = self.executor.submit(
+                _apply_xsl_in_process, self.transform_filename, self.doc.to_string(), profile_run
+            )
+        else:
+            future = self.executor.submit(job)
 
-        future = self.executor.submit(job)
+        self._job_future = future
         self.ioloop.add_future(future, self.handler.check_finished(job_callback))
         return future
 
@@ -136,3 +181,24 @@ class XmlProducer(object):
 
     def __repr__(self):
         return '{}.{}'.format(__package__, self.__class__.__name__)
+
+
+def _get_xsl_log(error_log):
+    xsl_line = 'XSLT {0.level_name} in file "{0.filename}", line {0.line}, column {0.column}\n\t{0.message}'
+    return '\n'.join(map(xsl_line.format, error_log))
+
+
+def _apply_xsl_in_process(filename, xml, profile_run):
+    start_time = time.time()
+    transform = None
+
+    try:
+        transform = _process_xsl_cache.load(filename, frontik.jobs.jobs_logger)
+        result = transform(etree.fromstring(xml), profile_run=profile_run)
+    except Exception as e:
+        raise frontik.jobs.ProcessJobError.from_exception(
+            e, _get_xsl_log(transform.error_log) if transform is not None else None
+        )
+
+    xslt_profile = etree.tostring(result.xslt_profile) if result.xslt_profile is not None else None
+    return start_time, str(result), xslt_profile, _get_xsl_log(transform.error_log)
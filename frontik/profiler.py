@@ -0,0 +1,90 @@
+# coding=utf-8
+
+import signal
+
+from frontik.compat import iteritems
+from frontik.request_context import RequestContext
+
+DEFAULT_DURATION = 10
+MAX_DURATION = 60
+DEFAULT_INTERVAL = 0.01
+MIN_INTERVAL = 0.001
+
+NO_HANDLER = '(no handler)'
+
+
+class SamplingProfiler(object):
+    """Statistical profiler of the IOLoop thread.
+
+    While the profiler is running, SIGPROF is delivered every `interval` seconds of CPU time used by the process
+    and the stack of the main thread is recorded together with the name of the page handler from `RequestContext`
+    (which is available, because Python signal handlers are always run in the main thread).
+    ITIMER_PROF counts CPU time of all threads of the process, so the time spent by other threads (executors
+    of XSLT and templates) is charged to whatever the main thread is doing at that moment, usually to the IOLoop
+    waiting for events. Only time when the main thread is idle and no other thread uses CPU is not sampled.
+    """
+
+    def __init__(self):
+        self._samples = None
+        self._frame_names = {}
+        self._prev_signal_handler = None
+
+    @property
+    def running(self):
+        return self._samples is not None
+
+    def start(self, interval=DEFAULT_INTERVAL):
+        if self.running:
+            raise RuntimeError('profiler is already running')
+
+        self._samples = {}
+        self._prev_signal_handler = signal.signal(signal.SIGPROF, self._sample)
+        # restart system calls interrupted by SIGPROF instead of failing them with EINTR
+        signal.siginterrupt(signal.SIGPROF, False)
+        signal.setitimer(signal.ITIMER_PROF, interval, interval)
+
+    def stop(self):
+        """Stops the profiler and returns collected samples: a dict of stacks (tuples of frame names
+        starting with the handler name) and the number of their samples"""
+
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._prev_signal_handler)
+
+        samples = self._samples
+        self._samples = self._prev_signal_handler = None
+        self._frame_names.clear()
+
+        return samples
+
+    def _sample(self, signum, frame):
+        samples = self._samples
+        if samples is None:
+            return
+
+        stack = []
+        while frame is not None:
+            stack.append(self._get_frame_name(frame.f_code))
+            frame = frame.f_back
+
+        stack.append(RequestContext.get('handler_name') or NO_HANDLER)
+        stack = tuple(reversed(stack))
+        samples[stack] = samples.get(stack, 0) + 1
+
+    def _get_frame_name(self, code):
+        name = self._frame_names.get(code)
+        if name is None:
+            name = self._frame_names[code] = '{} ({}:{})'.format(code.co_name, code.co_filename, code.co_firstlineno)
+
+        return name
+
+
+def format_collapsed_stacks(samples):
+    """Formats samples as collapsed stacks (one `frame;frame;frame count` line per stack),
+    which are accepted by flamegraph.pl and most flame graph viewers"""
+
+    return ''.join(
+        '{} {}\n'.format(';'.join(stack), count) for stack, count in sorted(iteritems(samples))
+    )
+
+
+sampling_profiler = SamplingProfiler()
@@ -3,9 +3,15 @@
 import importlib
 import logging
 import os
+import pkgutil
 import re
+import sre_parse
 
+from tornado.options import options
+
+import frontik.options  # noqa, routers can be created in application config before options are parsed
 from frontik.compat import iteritems
+from frontik.file_cache import LimitedDict
 from frontik.handler import ErrorHandler
 from frontik.util import reverse_regex_named_groups
 
@@ -14,9 +20,69 @@ routing_logger = logging.getLogger('frontik.routing')
 MAX_MODULE_NAME_LENGTH = os.pathconf('/', 'PC_PATH_MAX') - 1
 
 
+def preload_page_modules(package_name):
+    """Imports all modules from the pages package, errors are logged and ignored.
+    Returns a dict of imported modules and a set of names of modules, which failed to import.
+    """
+    modules = {}
+    failed_module_names = set()
+
+    try:
+        package = importlib.import_module(package_name)
+    except Exception:
+        routing_logger.exception('failed to import pages package %s', package_name)
+        return modules, failed_module_names
+
+    modules[package_name] = package
+
+    def onerror(module_name):
+        failed_module_names.add(module_name)
+
+    for _, module_name, _ in pkgutil.walk_packages(package.__path__, package.__name__ + '.', onerror=onerror):
+        try:
+            modules[module_name] = importlib.import_module(module_name)
+        except Exception as e:
+            failed_module_names.add(module_name)
+            routing_logger.warning('failed to preload page module %s: %s', module_name, e)
+
+    return modules, failed_module_names
+
+
 class FileMappingRouter(object):
-    def __init__(self, module):
+    """Maps request path to `Page` class from the module with the same name in the pages package.
+
+    Found `Page` classes are cached. Paths without pages are remembered in a cache of
+    `routing_negative_cache_size` entries. If `preload` is True (`preload_pages` option by default),
+    all modules are imported on creation, and only modules, which have failed to import, are imported on requests.
+    With autoreload both the cache of missing pages and the check of preloaded modules are disabled,
+    because new pages can appear, so modules for unknown paths are always imported.
+    """
+
+    def __init__(self, module, preload=None):
         self.name = module.__name__
+        self.pages = {}
+        self.failed_modules = None
+        self.missing_pages = LimitedDict(0 if options.autoreload else options.routing_negative_cache_size)
+
+        if options.preload_pages if preload is None else preload:
+            self._preload_pages()
+
+        self._only_preloaded = self.failed_modules is not None and not options.autoreload
+
+    def _preload_pages(self):
+        modules, self.failed_modules = preload_page_modules(self.name)
+
+        for module_name, module in iteritems(modules):
+            if hasattr(module, 'Page'):
+                self.pages[module_name] = module.Page
+
+        routing_logger.info('found %d pages in %s', len(self.pages), self.name)
+
+    def _is_missing(self, page_module_name):
+        if page_module_name in self.missing_pages:
+            return True
+
+        return self._only_preloaded and page_module_name not in self.failed_modules
 
     def __call__(self, application, request, **kwargs):
         url_parts = request.path.strip('/').split('/')
@@ -33,11 +99,20 @@ class FileMappingRouter(object):
             routing_logger.info('page module name exceeds PATH_MAX (%s), using 404 page', MAX_MODULE_NAME_LENGTH)
             return self.handle_404(application, request, **kwargs)
 
+        page_class = self.pages.get(page_module_name)
+        if page_class is not None:
+            return page_class(application, request, **kwargs)
+
+        if self._is_missing(page_module_name):
+            routing_logger.info('%s module not found, using 404 page', page_module_name)
+            return self.handle_404(application, request, **kwargs)
+
         try:
             page_module = importlib.import_module(page_module_name)
             routing_logger.debug('using %s from %s', page_module_name, page_module.__file__)
         except ImportError:
             routing_logger.warning('%s module not found', (self.name, page_module_name))
+            self.missing_pages[page_module_name] = True
             return self.handle_404(application, request, **kwargs)
         except:
             routing_logger.exception('error while importing %s module', page_module_name)
@@ -45,8 +120,10 @@ class FileMappingRouter(object):
 
         if not hasattr(page_module, 'Page'):
             routing_logger.error('%s.Page class not found', page_module_name)
+            self.missing_pages[page_module_name] = True
             return self.handle_404(application, request, **kwargs)
 
+        self.pages[page_module_name] = page_module.Page
         return page_module.Page(application, request, **kwargs)
 
     def handle_404(self, application, request, **kwargs):
@@ -54,11 +131,37 @@ class FileMappingRouter(object):
         return handler_class(application, request, **dict(kwargs, **handler_kwargs))
 
 
+class _TrieNode(object):
+    __slots__ = ('children', 'routes')
+
+    def __init__(self):
+        self.children = {}
+        self.routes = []
+
+
 class FrontikRouter(object):
+    """Matches request uri against url patterns, the first matching pattern is used.
+
+    If there are more than `LINEAR_SCAN_MAX_ROUTES` patterns, they are put into a trie by their literal prefixes,
+    so only patterns with a prefix of the uri are matched as regexes (patterns without any special characters
+    don't need a regex match at all). Smaller lists of patterns are matched one by one.
+
+    Results are cached for `routing_cache_size` recently requested urls. Most patterns can't match the query string
+    (they don't match `?` character and don't check what follows the path), so if the matched pattern and all
+    patterns before it are like that, the result is cached for the path of the request, otherwise for the full uri.
+    """
+
+    LINEAR_SCAN_MAX_ROUTES = 25
+
     def __init__(self, application):
         self.application = application
         self.handlers = []
         self.handler_names = {}
+        self.routes_trie = _TrieNode()
+        self.routes_cache = LimitedDict(options.routing_cache_size)
+
+        # number of leading patterns, which can't match the query string
+        self._path_only_routes = None
 
         for handler_spec in application.application_urls():
             if len(handler_spec) > 2:
@@ -67,27 +170,100 @@ class FrontikRouter(object):
                 handler_name = None
                 pattern, handler = handler_spec
 
+            if self._path_only_routes is None and _can_match_query(pattern):
+                self._path_only_routes = len(self.handlers)
+
+            self._add_route(len(self.handlers), pattern)
             self.handlers.append((re.compile(pattern), handler))
 
             if handler_name is not None:
                 self.handler_names[handler_name] = pattern
 
+        if self._path_only_routes is None:
+            self._path_only_routes = len(self.handlers)
+
+        self._use_trie = len(self.handlers) > self.LINEAR_SCAN_MAX_ROUTES
+
     def __call__(self, application, request, **kwargs):
-        routing_logger.info('requested url: %s', request.uri)
+        routing_logger.debug('requested url: %s', request.uri)
+
+        route = self._get_route(request)
+
+        handler_index, arguments = route
+        if handler_index is None:
+            routing_logger.error('match for request url "%s" not found', request.uri)
+            return self.handle_404(application, request, **kwargs)
+
+        handler = self.handlers[handler_index][1]
+        routing_logger.debug('using %r', handler)
+        _extend_request_arguments(request, arguments)
+
+        try:
+            return handler(application, request, **kwargs)
+        except Exception as e:
+            routing_logger.exception('error handling request: %s in %r', e, handler)
+            return ErrorHandler(application, request, status_code=500, **kwargs)
+
+    def _get_route(self, request):
+        uri, path = request.uri, request.path
+
+        if self.routes_cache.max_len == 0:
+            return self._find_route(uri)
+
+        # entries cached for the path are marked with True, entries cached for the uri without query string with False
+        entry = self.routes_cache.get(path)
+        if entry is not None and (entry[1] or uri == path):
+            return entry[0]
+
+        if uri != path:
+            entry = self.routes_cache.get(uri)
+            if entry is not None:
+                return entry[0]
+
+        route = self._find_route(uri)
+        handler_index = route[0]
+        for_path = (handler_index if handler_index is not None else len(self.handlers)) < self._path_only_routes
+
+        self.routes_cache[path if for_path else uri] = (route, for_path)
+        return route
+
+    def _add_route(self, index, pattern):
+        prefix, is_literal = _get_literal_prefix(pattern)
+
+        node = self.routes_trie
+        for char in prefix:
+            node = node.children.setdefault(char, _TrieNode())
+
+        node.routes.append((index, is_literal))
+
+    def _find_route(self, uri):
+        if not self._use_trie:
+            for index, (pattern, _) in enumerate(self.handlers):
+                match = pattern.match(uri)
+                if match:
+                    return index, match.groupdict()
+
+            return None, None
+
+        node = self.routes_trie
+        candidates = list(node.routes)
 
-        for pattern, handler in self.handlers:
-            match = pattern.match(request.uri)
+        for char in uri:
+            node = node.children.get(char)
+            if node is None:
+                break
+
+            candidates.extend(node.routes)
+
+        for index, is_literal in sorted(candidates):
+            if is_literal:
+                return index, {}
+
+            match = self.handlers[index][0].match(uri)
             if match:
-                routing_logger.debug('using %r', handler)
-                extend_request_arguments(request, match)
-                try:
-                    return handler(application, request, **kwargs)
-                except Exception as e:
-                    routing_logger.exception('error handling request: %s in %r', e, handler)
-                    return ErrorHandler(application, request, status_code=500, **kwargs)
+                return index, match.groupdict()
 
-        routing_logger.error('match for request url "%s" not found', request.uri)
-        return self.handle_404(application, request, **kwargs)
+        return None, None
 
     def reverse_url(self, name, *args, **kwargs):
         if name not in self.handler_names:
@@ -101,7 +277,74 @@ class FrontikRouter(object):
 
 
 def extend_request_arguments(request, match):
-    arguments = match.groupdict()
+    _extend_request_arguments(request, match.groupdict())
+
+
+def _extend_request_arguments(request, arguments):
     for name, value in iteritems(arguments):
         if value:
             request.arguments.setdefault(name, []).append(value)
+
+
+def _get_literal_prefix(pattern):
+    """Returns the string, which any match of the pattern starts with,
+    and a flag telling whether the pattern matches exactly this string
+    """
+    parsed_pattern = sre_parse.parse(pattern)
+    if parsed_pattern.pattern.flags & re.IGNORECASE:
+        return '', False
+
+    prefix = []
+    for op, value in parsed_pattern:
+        if op != sre_parse.LITERAL or value > 127:
+            return ''.join(prefix), False
+
+        prefix.append(chr(value))
+
+    return ''.join(prefix), True
+
+
+_QUESTION_MARK = ord('?')
+_PATH_ONLY_CATEGORIES = frozenset((sre_parse.CATEGORY_DIGIT, sre_parse.CATEGORY_SPACE, sre_parse.CATEGORY_WORD))
+_PATH_ONLY_ASSERTIONS = frozenset((sre_parse.AT_BEGINNING, sre_parse.AT_BEGINNING_STRING))
+
+
+def _can_match_query(pattern):
+    """Returns False if the pattern can't match `?` character and doesn't check what follows the matched part
+    (like `$` does), so it matches the uri with any query string the same way as the path of the uri.
+    Returns True for anything else, including patterns too complex to be checked.
+    """
+    try:
+        return _can_match_query_parsed(sre_parse.parse(pattern))
+    except Exception:
+        return True
+
+
+def _can_match_query_parsed(parsed_pattern):
+    for op, value in parsed_pattern:
+        if op == sre_parse.LITERAL:
+            if value == _QUESTION_MARK:
+                return True
+        elif op == sre_parse.IN:
+            for item_op, item_value in value:
+                if item_op == sre_parse.LITERAL:
+                    if item_value == _QUESTION_MARK:
+                        return True
+                elif item_op == sre_parse.RANGE:
+                    if item_value[0] <= _QUESTION_MARK <= item_value[1]:
+                        return True
+                elif item_op != sre_parse.CATEGORY or item_value not in _PATH_ONLY_CATEGORIES:
+                    return True
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            if _can_match_query_parsed(value[2]):
+                return True
+        elif op == sre_parse.SUBPATTERN:
+            if _can_match_query_parsed(value[-1]):
+                return True
+        elif op == sre_parse.BRANCH:
+            if any(_can_match_query_parsed(branch) for branch in value[1]):
+                return True
+        elif op != sre_parse.AT or value not in _PATH_ONLY_ASSERTIONS:
+            return True
+
+    return False
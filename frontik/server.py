@@ -10,11 +10,14 @@ import traceback
 import tornado.autoreload
 import tornado.httpserver
 import tornado.ioloop
+import tornado.netutil
 import tornado.options
 from tornado.options import options
 
+import frontik.process
 from frontik.app import FrontikApplication
 from frontik.loggers import bootstrap_core_logging
+from frontik.routing import preload_page_modules
 
 log = logging.getLogger('frontik.server')
 
@@ -48,22 +51,35 @@ def parse_configs(config_files):
             tornado.autoreload.watch(config)
 
 
-def run_server(app):
+def run_server(app, sockets=None):
     """
-    — run server on host:port
+    — run server on host:port (or on already bound sockets in worker processes)
     — launch autoreload on file changes
     """
 
     try:
         log.info('starting server on %s:%s', options.host, options.port)
         http_server = tornado.httpserver.HTTPServer(app, xheaders=options.xheaders)
-        http_server.listen(options.port, options.host)
+
+        if sockets is not None:
+            http_server.add_sockets(sockets)
+        else:
+            http_server.listen(options.port, options.host)
 
         io_loop = tornado.ioloop.IOLoop.current()
 
         if options.autoreload:
             tornado.autoreload.start(io_loop, 1000)
 
+        if frontik.process.worker_id is not None:
+            def publish_status():
+                status = app.get_current_status()
+                status.pop('processes', None)
+                frontik.process.publish_worker_status(status)
+
+            publish_status()
+            tornado.ioloop.PeriodicCallback(publish_status, 1000, io_loop=io_loop).start()
+
         def log_ioloop_block(signum, frame):
             io_loop.add_callback_from_signal(
                 log.warning, 'IOLoop blocked for %f seconds in\n%s',
@@ -125,6 +141,23 @@ def main(config_file=None):
 
     application = getattr(module, options.app_class) if options.app_class is not None else FrontikApplication
 
+    sockets = None
+    if options.workers > 1:
+        if options.autoreload:
+            log.warning('autoreload is not supported with several workers, disabling it')
+            options.autoreload = False
+
+        # imported modules are shared by worker processes with copy-on-write
+        preload_page_modules('{}.pages'.format(options.app))
+
+        if options.warm_up_caches:
+            # compiled XSL files and templates are shared by worker processes with copy-on-write as well
+            application.warm_up_caches_before_fork(**options.as_dict())
+
+        sockets = tornado.netutil.bind_sockets(options.port, options.host)
+        worker_id = frontik.process.fork_workers(options.workers, options.stop_timeout)
+        log.info('worker %d started', worker_id)
+
     try:
         tornado_app = application(**options.as_dict())
         ioloop = tornado.ioloop.IOLoop.current()
@@ -134,7 +167,7 @@ def main(config_file=None):
                 log.error('failed to initialize application, init_async returned: %s', future.exception())
                 sys.exit(1)
 
-            run_server(tornado_app)
+            run_server(tornado_app, sockets)
 
         def _async_init_cb():
             try:
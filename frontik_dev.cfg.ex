@@ -1,6 +1,6 @@
 host = '0.0.0.0'
 port = 9300
-workers_count = 1
+workers = 1
 
 app = '/path/to/application'
 
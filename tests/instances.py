@@ -140,6 +140,16 @@ frontik_no_debug_app = FrontikTestInstance(
     command='./frontik-test --app=tests.projects.no_debug_app --config=tests/projects/frontik_no_debug.cfg'
 )
 
+frontik_workers_app = FrontikTestInstance(
+    command='./frontik-test --app=tests.projects.no_debug_app --config=tests/projects/frontik_no_debug.cfg --workers=2 '
+            '--warm_up_caches'
+)
+
+frontik_process_executor_app = FrontikTestInstance(
+    command='./frontik-test --app=tests.projects.test_app --config=tests/projects/frontik_debug.cfg '
+            '--xsl_executor=process --json_executor=process --process_executor_pool_size=1'
+)
+
 frontik_broken_config_app = FrontikTestInstance(
     command='./frontik-test --app=tests.projects.broken_config_app --config=tests/projects/frontik_debug.cfg'
 )
@@ -21,5 +21,5 @@ urls = [
     ('/id/(?P<id1>[^/]+)/(?P<id2>[^/]+)', handler_404.Page, 'two_ids'),
     ('/not_simple', simple.Page),
     ('/exception_on_prepare_regex', exception_on_prepare.Page),
-    ('(?!/not_matching_regex)', FileMappingRouter(pages))
+    ('(?!/not_matching_regex)', FileMappingRouter(pages, preload=True))
 ]
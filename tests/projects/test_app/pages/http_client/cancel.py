@@ -0,0 +1,32 @@
+# coding=utf-8
+
+import time
+
+import frontik.handler
+
+
+class Page(frontik.handler.PageHandler):
+    requests = []
+
+    def modify_http_client_request(self, request):
+        Page.requests.append(request)
+        return request
+
+    def get_page(self):
+        if self.get_argument('backend', None) is not None:
+            self.add_timeout(time.time() + 1, self.finish_group.add_notification())
+            return
+
+        if self.get_argument('result', None) is not None:
+            self.json.put({'cancelled': [getattr(r, '_frontik_cancelled', False) for r in Page.requests]})
+            return
+
+        Page.requests = []
+        url = self.request.host + self.request.path
+
+        # requests outside of the finish group are never cancelled
+        self.get_url(url, data={'backend': 'true'}, add_to_finish_group=False)
+        self.get_url(url, data={'backend': 'true'})
+
+        if self.get_argument('wait', None) is None:
+            self.finish('finished')
@@ -0,0 +1,29 @@
+# coding=utf-8
+
+import frontik.handler
+
+
+class Page(frontik.handler.PageHandler):
+    backend_requests = 0
+
+    def get_page(self):
+        if self.get_argument('backend', None) is not None:
+            Page.backend_requests += 1
+            self.json.put({'backend': True})
+            return
+
+        backend_requests_before = Page.backend_requests
+        url = self.request.host + self.request.path
+
+        def callback(results):
+            self.json.put({
+                'backend_requests': Page.backend_requests - backend_requests_before,
+                'results': [results[name].data for name in sorted(results)]
+            })
+
+        self.group({
+            'first': self.get_url(url, data={'backend': 'true'}, coalesce=True),
+            'second': self.get_url(url, data={'backend': 'true'}, coalesce=True),
+            'third': self.get_url(url, data={'backend': 'true'}, coalesce=True),
+            'not_coalesced': self.get_url(url, data={'backend': 'true'}, coalesce=False),
+        }, callback)
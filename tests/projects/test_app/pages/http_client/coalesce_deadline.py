@@ -0,0 +1,7 @@
+# coding=utf-8
+
+from . import coalesce
+
+
+class Page(coalesce.Page):
+    page_timeout = 1
@@ -0,0 +1,31 @@
+# coding=utf-8
+
+import time
+
+import frontik.handler
+
+
+class Page(frontik.handler.PageHandler):
+    page_timeout = 0.5
+    backend_requests = 0
+
+    def get_page(self):
+        if self.get_argument('backend', None) is not None:
+            Page.backend_requests += 1
+            self.json.put({'timeout': int(self.request.headers['X-Outer-Timeout-Ms'])})
+            return
+
+        backend_requests_before = Page.backend_requests
+
+        def callback(data, response):
+            self.json.put({
+                'code': response.code,
+                'backend': data,
+                'backend_requests': Page.backend_requests - backend_requests_before
+            })
+
+        def make_request():
+            self.get_url(self.request.host + self.request.path, data={'backend': 'true'}, callback=callback)
+
+        wait = float(self.get_argument('wait', 0))
+        self.add_timeout(time.time() + wait, self.finish_group.add(make_request))
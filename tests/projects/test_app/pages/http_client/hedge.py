@@ -0,0 +1,43 @@
+# coding=utf-8
+
+import time
+from functools import partial
+
+import frontik.handler
+from frontik.handler import HTTPError
+
+
+class Page(frontik.handler.PageHandler):
+    backend_requests = 0
+
+    def get_page(self):
+        backend = self.get_argument('backend', None)
+        if backend is not None:
+            Page.backend_requests += 1
+
+            # the first request is slow or fails, hedged or retried request is fast
+            if Page.backend_requests == 1:
+                if backend == 'error':
+                    raise HTTPError(503)
+
+                self.add_timeout(time.time() + 1, self.finish_group.add(partial(self.json.put, {'slow': True})))
+                return
+
+            self.json.put({'fast': True})
+            return
+
+        Page.backend_requests = 0
+
+        def callback(data, response):
+            self.json.put({
+                'backend_requests': Page.backend_requests,
+                'result': data,
+                'labels': response.request._frontik_labels,
+            })
+
+        mode = self.get_argument('mode')
+        # requests with non-positive timeout are rejected like requests after the page deadline
+        request_timeout = -1 if mode == 'rejected' else None
+
+        url = self.request.host + self.request.path
+        self.get_url(url, data={'backend': mode}, request_timeout=request_timeout, hedge=True, callback=callback)
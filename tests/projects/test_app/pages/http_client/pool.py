@@ -0,0 +1,32 @@
+# coding=utf-8
+
+import frontik.handler
+
+
+class Page(frontik.handler.PageHandler):
+    backend_requests = []
+
+    def get_page(self):
+        name = self.get_argument('backend', None)
+        if name is not None:
+            Page.backend_requests.append(name)
+            self.json.put({name: True})
+            return
+
+        Page.backend_requests = []
+        url = self.request.host + self.request.path
+
+        def callback(results):
+            self.json.put({
+                'order': Page.backend_requests,
+                'results': [results[name].data for name in ('first', 'low', 'high')],
+            })
+
+        self.group({
+            'first': self.get_url(url, data={'backend': 'first'}, pool='test'),
+            'low': self.get_url(url, data={'backend': 'low'}, pool='test', priority=-1),
+            'high': self.post_url(url + '?backend=high', pool='test', priority=1),
+        }, callback)
+
+    def post_page(self):
+        self.get_page()
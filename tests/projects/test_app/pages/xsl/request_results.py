@@ -0,0 +1,21 @@
+# coding=utf-8
+
+from lxml import etree
+
+import frontik.handler
+
+
+class Page(frontik.handler.PageHandler):
+    def get_page(self):
+        if self.get_argument('backend', None) is not None:
+            self.doc.root_node = etree.Element('ok')
+            return
+
+        self.set_xsl('simple.xsl')
+
+        # results are not parsed until the document is built, the tree is built in the XSL executor thread
+        url = self.request.host + self.request.path
+        for i in range(3):
+            self.doc.put(self.get_url(url, data={'backend': i}))
+
+        self.doc.put(self.get_url(url, data={'backend': 'raw'}, parse_response=False))
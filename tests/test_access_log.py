@@ -0,0 +1,67 @@
+# coding=utf-8
+
+import json
+import logging
+import time
+import unittest
+from io import BytesIO
+
+from tornado.httpclient import HTTPRequest, HTTPResponse
+
+from frontik.loggers import ACCESS_LOGGER, AccessLogFormatter
+from frontik.loggers.request import RequestLogger
+from frontik.request_context import RequestContext
+
+
+class Request(object):
+    def __init__(self):
+        self._start_time = time.time()
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super(RecordingHandler, self).__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+class TestAccessLog(unittest.TestCase):
+    def setUp(self):
+        self.handler = RecordingHandler()
+        self.handler.setFormatter(AccessLogFormatter())
+        ACCESS_LOGGER.addHandler(self.handler)
+
+    def tearDown(self):
+        ACCESS_LOGGER.removeHandler(self.handler)
+
+    def test_log_access(self):
+        with RequestContext({'request_id': '123', 'handler_name': 'pages.Page'}):
+            log = RequestLogger(Request())
+            log.stage_tag('page')
+            log.stage_tag('xsl')
+
+            for body in (b'a' * 10, b'b' * 20):
+                log.add_upstream_response(
+                    HTTPResponse(HTTPRequest('http://backend/'), 200, buffer=BytesIO(body), request_time=0.1)
+                )
+
+            log.add_executor_wait_time(10.0, 10.005)
+            log.log_access('GET', 200)
+
+        self.assertEqual(len(self.handler.lines), 1)
+        access_log = json.loads(self.handler.lines[0])
+
+        self.assertEqual(access_log['request_id'], '123')
+        self.assertEqual(access_log['handler'], 'pages.Page')
+        self.assertEqual(access_log['method'], 'GET')
+        self.assertEqual(access_log['status'], 200)
+        self.assertEqual(sorted(access_log['stages']), ['page', 'xsl'])
+        # stages and total are rounded separately
+        self.assertAlmostEqual(access_log['total'], sum(access_log['stages'].values()), delta=0.011)
+        self.assertEqual(access_log['upstream_requests'], 2)
+        self.assertEqual(access_log['upstream_time'], 200.0)
+        self.assertEqual(access_log['upstream_bytes'], 30)
+        self.assertEqual(access_log['executor_wait_time'], 5.0)
+        self.assertIn('time', access_log)
@@ -0,0 +1,62 @@
+# coding=utf-8
+
+import logging
+import threading
+import unittest
+
+from frontik.loggers import BackgroundLogHandler
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self, level=logging.NOTSET):
+        super(RecordingHandler, self).__init__(level)
+        self.messages = []
+        self.threads = set()
+        self.unblocked = threading.Event()
+        self.unblocked.set()
+
+    def emit(self, record):
+        self.unblocked.wait()
+        self.messages.append(record.getMessage())
+        self.threads.add(threading.current_thread().name)
+
+
+def make_record(msg, level=logging.INFO):
+    return logging.makeLogRecord({'msg': msg, 'levelno': level, 'levelname': logging.getLevelName(level)})
+
+
+class TestBackgroundLogHandler(unittest.TestCase):
+    def test_write_records(self):
+        info_handler = RecordingHandler()
+        error_handler = RecordingHandler(logging.ERROR)
+        handler = BackgroundLogHandler([info_handler, error_handler], 100)
+
+        handler.handle(make_record('info'))
+        handler.handle(make_record('error', logging.ERROR))
+        handler.stop()
+
+        self.assertEqual(info_handler.messages, ['info', 'error'])
+        self.assertEqual(error_handler.messages, ['error'])
+        self.assertEqual(info_handler.threads, {'frontik-log-writer'})
+        self.assertEqual(handler.get_stats(), {'queued': 0, 'written': 2, 'dropped': 0})
+
+        handler.handle(make_record('after stop'))
+        handler.close()
+
+        self.assertEqual(info_handler.messages, ['info', 'error', 'after stop'])
+
+    def test_drop_records(self):
+        blocked_handler = RecordingHandler()
+        blocked_handler.unblocked.clear()
+        handler = BackgroundLogHandler([blocked_handler], 2)
+
+        for i in range(10):
+            handler.handle(make_record(str(i)))
+
+        blocked_handler.unblocked.set()
+        handler.stop()
+
+        stats = handler.get_stats()
+        self.assertGreater(stats['dropped'], 0)
+        self.assertEqual(stats['written'] + stats['dropped'], 10)
+        self.assertEqual(len(blocked_handler.messages), stats['written'])
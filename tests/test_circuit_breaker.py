@@ -0,0 +1,249 @@
+# coding=utf-8
+
+import time
+import unittest
+from io import BytesIO
+
+from tornado.httpclient import HTTPRequest, HTTPResponse
+from tornado.httputil import HTTPHeaders
+from tornado.options import options
+from tornado.testing import AsyncTestCase
+
+import frontik.http_client_pool
+import frontik.options  # noqa
+from frontik.circuit_breaker import CircuitBreaker, circuit_breakers
+from frontik.http_client import HttpClient, response_cache
+from frontik.http_client_pool import HttpClientPool
+
+
+class MockRequest(object):
+    pass
+
+
+class MockResponse(object):
+    def __init__(self, code, request_time=0.01):
+        self.code = code
+        self.request_time = request_time
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def make_breaker(self, **kwargs):
+        params = dict(window=10, min_requests=4, error_rate=0.5, slow_time=0, open_time=0.05)
+        params.update(kwargs)
+        return CircuitBreaker('backend:80', **params)
+
+    def add_results(self, breaker, *codes):
+        for code in codes:
+            request = MockRequest()
+            self.assertTrue(breaker.allow_request(request))
+            breaker.add_result(request, MockResponse(code))
+
+    def test_min_requests(self):
+        breaker = self.make_breaker()
+        self.add_results(breaker, 599, 500, 502)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+        self.add_results(breaker, 200)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow_request(MockRequest()))
+
+    def test_error_rate(self):
+        breaker = self.make_breaker(window=4)
+        self.add_results(breaker, 200, 200, 200, 404, 500, 200, 200)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+        self.add_results(breaker, 599)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_slow_requests(self):
+        breaker = self.make_breaker(min_requests=1, slow_time=0.5)
+
+        request = MockRequest()
+        breaker.allow_request(request)
+        breaker.add_result(request, MockResponse(200, request_time=1.0))
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_half_open(self):
+        breaker = self.make_breaker(min_requests=1)
+        old_request = MockRequest()
+        breaker.allow_request(old_request)
+        self.add_results(breaker, 500)
+
+        time.sleep(0.06)
+        probe = MockRequest()
+        self.assertTrue(breaker.allow_request(probe))
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.allow_request(MockRequest()))
+
+        breaker.add_result(old_request, MockResponse(200))
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+
+        breaker.add_result(probe, MockResponse(500))
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        time.sleep(0.06)
+        self.add_results(breaker, 200)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.failures, 0)
+
+
+class MockDebugMode(object):
+    enabled = False
+    pass_debug = False
+
+
+class MockLog(object):
+    def add_upstream_response(self, response):
+        pass
+
+    def isEnabledFor(self, level):
+        return False
+
+
+class MockHandler(object):
+    _finished = False
+    request_id = 'request_id'
+    debug_mode = MockDebugMode()
+    log = MockLog()
+
+
+class MockHttpClientImpl(object):
+    def __init__(self):
+        self.requests = []
+
+    def fetch(self, request, callback):
+        self.requests.append((request, callback))
+
+
+class TestHttpClientCircuitBreaker(AsyncTestCase):
+    HOST = 'circuit-breaker-backend:80'
+
+    def setUp(self):
+        super(TestHttpClientCircuitBreaker, self).setUp()
+        self.options = dict((name, getattr(options, name)) for name in (
+            'http_client_circuit_breaker', 'http_client_cache_size', 'http_client_coalesce_requests'
+        ))
+        self.pools = frontik.http_client_pool._pools
+
+        options.http_client_circuit_breaker = True
+        frontik.http_client_pool._pools = {'test': HttpClientPool('test', 1)}
+
+        self.http_client_impl = MockHttpClientImpl()
+        self.http_client = HttpClient(MockHandler(), self.http_client_impl, lambda request: request)
+        self.responses = []
+
+        self.breaker = circuit_breakers.get(self.HOST)
+        self.breaker._set_state(CircuitBreaker.CLOSED)
+        self.breaker.probe_in_flight = False
+
+    def tearDown(self):
+        for name, value in self.options.items():
+            setattr(options, name, value)
+        frontik.http_client_pool._pools = self.pools
+
+        super(TestHttpClientCircuitBreaker, self).tearDown()
+
+    def fetch(self, coalesce=None, pool=None, request_timeout=1, path='/page'):
+        url = 'http://{}{}'.format(self.HOST, path)
+        request = HTTPRequest(url, request_timeout=request_timeout, connect_timeout=1)
+        request._frontik_coalesce = coalesce
+        request._frontik_pool = pool
+
+        self.http_client.fetch(request, self.responses.append, add_to_finish_group=False)
+        return request
+
+    def respond(self, index, code):
+        request, callback = self.http_client_impl.requests[index]
+        callback(HTTPResponse(request, code, request_time=0.01))
+
+    def open_breaker(self):
+        self.breaker._set_state(CircuitBreaker.OPEN)
+        self.breaker.opened_at = 0
+
+    def wait_for_callbacks(self, delay=0.01):
+        self.io_loop.add_timeout(self.io_loop.time() + delay, self.stop)
+        self.wait()
+
+    def assert_probe_released(self):
+        self.assertFalse(self.breaker.probe_in_flight)
+
+        probe = self.fetch(path='/probe')
+        self.assertTrue(getattr(probe, '_frontik_circuit_breaker_probe', False))
+
+    def test_probe_is_not_coalesced(self):
+        self.fetch(coalesce=True)
+        self.open_breaker()
+        probe = self.fetch(coalesce=True)
+
+        self.assertEqual(len(self.http_client_impl.requests), 2)
+        self.assertIs(self.http_client_impl.requests[1][0], probe)
+
+        self.respond(0, 200)
+        self.wait_for_callbacks()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+        self.respond(1, 200)
+        self.wait_for_callbacks()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertFalse(self.breaker.probe_in_flight)
+
+    def test_probe_result_is_added_for_shared_response(self):
+        self.open_breaker()
+        request = self.fetch()
+        other_request = HTTPRequest(request.url)
+
+        response = HTTPResponse(request, 200, request_time=0.01)
+        HttpClient._add_circuit_breaker_result(self.breaker, other_request, self.responses.append, response)
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+        self.http_client_impl.requests[0][1](response)
+        self.wait_for_callbacks()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_cache_hit(self):
+        options.http_client_cache_size = 1024
+
+        request = HTTPRequest('http://{}/page'.format(self.HOST))
+        response = HTTPResponse(
+            request, 200, headers=HTTPHeaders({'Cache-Control': 'max-age=60'}), buffer=BytesIO(b'cached')
+        )
+        response_cache.put(request, response)
+
+        self.open_breaker()
+        self.fetch()
+        self.wait_for_callbacks()
+
+        self.assertEqual([r.code for r in self.responses], [200])
+        self.assertEqual(self.http_client_impl.requests, [])
+        self.assert_probe_released()
+
+    def test_expired_deadline(self):
+        self.open_breaker()
+        self.fetch(request_timeout=-1)
+        self.wait_for_callbacks()
+
+        self.assertEqual([r.code for r in self.responses], [599])
+        self.assert_probe_released()
+
+    def test_pool_timeout(self):
+        self.fetch(pool='test')
+        self.open_breaker()
+        probe = self.fetch(pool='test', request_timeout=0.05)
+        self.assertTrue(probe._frontik_circuit_breaker_probe)
+
+        self.wait_for_callbacks(0.1)
+
+        self.assertEqual([r.code for r in self.responses], [599])
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assert_probe_released()
+
+    def test_send_error(self):
+        def fail(request, callback):
+            raise ValueError('send error')
+
+        self.open_breaker()
+        self.http_client_impl.fetch = fail
+        self.assertRaises(ValueError, self.fetch)
+
+        self.assertFalse(self.breaker.probe_in_flight)
@@ -1,11 +1,20 @@
 # coding=utf-8
 
 import base64
+import logging
+import sys
 import unittest
+from io import BytesIO
 
+from lxml import etree
 from tornado.escape import to_unicode
+from tornado.httpclient import HTTPRequest, HTTPResponse
+from tornado.httputil import HTTPHeaders
+from tornado.options import options
 
+import frontik.options  # noqa
 from frontik import http_codes
+from frontik.debug import DebugBufferedHandler
 
 from .instances import create_basic_auth_header, frontik_no_debug_app
 
@@ -155,3 +164,97 @@ class DebugTestCase(unittest.TestCase):
                 'simple', http_codes.OK,
                 headers={'Cookie': '{}=true;'.format(param), 'Authorization': self.DEBUG_BASIC_AUTH}
             )
+
+
+class DebugBufferedHandlerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.body_limit = options.debug_response_body_limit
+        self.size_limit = options.debug_log_size_limit
+
+    def tearDown(self):
+        options.debug_response_body_limit = self.body_limit
+        options.debug_log_size_limit = self.size_limit
+
+    @staticmethod
+    def log_response(handler, body):
+        response = HTTPResponse(
+            HTTPRequest('http://backend/'), 200, headers=HTTPHeaders({'Content-Type': 'text/plain'}),
+            buffer=BytesIO(body), request_time=0.1
+        )
+
+        record = logging.makeLogRecord({'msg': 'got response', '_response': response})
+        handler.handle(record)
+
+    def test_truncated_bodies(self):
+        options.debug_response_body_limit = 10
+        options.debug_log_size_limit = 1000
+
+        handler = DebugBufferedHandler()
+        self.log_response(handler, b'short')
+        self.log_response(handler, b'0123456789abcdef')
+
+        log = handler.produce_all()
+        bodies = log.findall('entry/response/body')
+
+        self.assertEqual(bodies[0].text, 'short')
+        self.assertEqual(bodies[1].text, '0123456789\n... (16 bytes total, truncated)')
+        self.assertEqual(log.get('truncated-bodies'), '1')
+
+    def test_log_size_limit(self):
+        options.debug_log_size_limit = 50
+
+        handler = DebugBufferedHandler()
+        self.log_response(handler, b'a' * 20)
+        self.log_response(handler, b'b' * 20)
+        self.log_response(handler, b'c' * 20)
+
+        bodies = handler.produce_all().findall('entry/response/body')
+
+        self.assertEqual(bodies[0].text, 'a' * 20)
+        self.assertEqual(bodies[1].text, 'b' * 6 + '\n... (20 bytes total, truncated)')
+        self.assertEqual(bodies[2].text, '\n... (20 bytes total, truncated)')
+
+    def test_request_body_limit(self):
+        options.debug_response_body_limit = 10
+
+        handler = DebugBufferedHandler()
+        request = HTTPRequest('http://backend/', method='POST', body=b'0123456789abcdef')
+        handler.handle(logging.makeLogRecord({'msg': 'got response', '_request': request}))
+
+        log = handler.produce_all()
+        self.assertEqual(log.findtext('entry/request/body'), '0123456789\n... (16 bytes total, truncated)')
+        self.assertEqual(log.get('truncated-bodies'), '1')
+
+    def test_trees_size_limit(self):
+        options.debug_log_size_limit = 100
+
+        handler = DebugBufferedHandler()
+        for name in ('a', 'b'):
+            debug_response = etree.Element('log')
+            debug_response.append(etree.Element('entry', msg=name * 30))
+            handler.handle(logging.makeLogRecord({'msg': 'inherited', '_debug_response': debug_response}))
+
+        xslt_profile = etree.Element('profile')
+        xslt_profile.append(etree.Element('template', name='c' * 30))
+        handler.handle(logging.makeLogRecord({'msg': 'profile', '_xslt_profile': xslt_profile}))
+
+        log = handler.produce_all()
+        self.assertEqual([e.get('msg') for e in log.findall('entry/debug/log/entry')], ['a' * 30])
+        self.assertIsNone(log.find('entry/profile'))
+        self.assertEqual(log.get('truncated-bodies'), '2')
+
+    def test_exception_size_limit(self):
+        options.debug_log_size_limit = 100
+
+        try:
+            raise ValueError('error')
+        except ValueError:
+            exc_info = sys.exc_info()
+
+        handler = DebugBufferedHandler()
+        handler.handle(logging.makeLogRecord({'msg': 'failed', 'exc_info': exc_info}))
+
+        log = handler.produce_all()
+        self.assertIsNone(log.find('entry/exception/trace'))
+        self.assertTrue(log.findtext('entry/exception/text').startswith('Traceback'))
+        self.assertTrue(log.findtext('entry/exception/text').endswith('truncated)'))
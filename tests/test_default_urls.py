@@ -1,11 +1,12 @@
 # coding=utf-8
 
 import json
+import threading
 import unittest
 
 from tornado.escape import to_unicode
 
-from .instances import frontik_re_app, frontik_test_app
+from .instances import create_basic_auth_header, frontik_no_debug_app, frontik_re_app, frontik_test_app
 
 
 class TestDefaultUrls(unittest.TestCase):
@@ -40,3 +41,68 @@ class TestDefaultUrls(unittest.TestCase):
         self.assertIn('workers', json_response)
         self.assertIn('total', json_response['workers'])
         self.assertIn('free', json_response['workers'])
+
+        self.assertIn('handlers', json_response)
+        self.assertEqual(json_response['handlers']['limit'], 100)
+        self.assertEqual(json_response['handlers']['active'], 0)
+
+        self.assertIn('coalescing', json_response)
+        self.assertIn('hit_rate', json_response['coalescing'])
+
+        self.assertIn('http_cache', json_response)
+        self.assertIn('hits', json_response['http_cache'])
+
+        self.assertIn('upstreams', json_response)
+
+        self.assertIn('logging', json_response)
+
+        self.assertIn('circuit_breakers', json_response)
+        self.assertEqual(json_response['circuit_breakers']['open'], [])
+
+    def test_metrics(self):
+        frontik_test_app.get_page('http_client/post_simple')
+        response = frontik_test_app.get_page('metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+
+        metrics = to_unicode(response.content)
+        self.assertIn('# TYPE frontik_stage_duration_seconds histogram', metrics)
+        self.assertIn('frontik_stage_duration_seconds_bucket{stage="page",le="+Inf"}', metrics)
+        self.assertIn('frontik_requests_total{code="200"}', metrics)
+        self.assertIn('frontik_http_client_responses_total{code="200"}', metrics)
+        self.assertIn('frontik_handlers_limit 100', metrics)
+
+    def test_profile(self):
+        def load():
+            while not profile_finished.is_set():
+                frontik_test_app.get_page('simple_xml')
+
+        profile_finished = threading.Event()
+        load_thread = threading.Thread(target=load)
+        load_thread.start()
+
+        try:
+            response = frontik_test_app.get_page('profile?duration=1&interval=0.001')
+        finally:
+            profile_finished.set()
+            load_thread.join()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Type'], 'text/plain; charset=utf-8')
+
+        stacks = [line.rsplit(' ', 1)[0].split(';') for line in to_unicode(response.content).splitlines()]
+        self.assertIn('tests.projects.test_app.pages.simple_xml.Page', [stack[0] for stack in stacks])
+
+    def test_profile_wrong_arguments(self):
+        self.assertEqual(frontik_test_app.get_page('profile?duration=100').status_code, 400)
+        self.assertEqual(frontik_test_app.get_page('profile?duration=1&interval=abc').status_code, 400)
+
+    def test_profile_requires_debug_access(self):
+        response = frontik_no_debug_app.get_page('profile?duration=0')
+        self.assertEqual(response.status_code, 401)
+
+        response = frontik_no_debug_app.get_page(
+            'profile?duration=0', headers={'Authorization': create_basic_auth_header('user:god')}
+        )
+        self.assertEqual(response.status_code, 200)
@@ -1,15 +1,29 @@
 # coding=utf-8
 
+import threading
 import unittest
+from io import BytesIO
 
 from lxml import etree
 from lxml_asserts.testcase import LxmlTestCaseMixin
 from tornado.concurrent import Future
+from tornado.httpclient import HTTPRequest, HTTPResponse
+from tornado.httputil import HTTPHeaders
 
 from frontik.doc import Doc
 from frontik.http_client import RequestResult, FailedRequestException
 
 
+def raw_xml_result(body, content_type='text/xml'):
+    response = HTTPResponse(
+        HTTPRequest('http://backend/'), 200, headers=HTTPHeaders({'Content-Type': content_type}), buffer=BytesIO(body)
+    )
+
+    result = RequestResult()
+    result.set(response.body, response)
+    return result
+
+
 class TestDoc(unittest.TestCase, LxmlTestCaseMixin):
     def test_simple(self):
         d = Doc('a')
@@ -127,3 +141,99 @@ class TestDoc(unittest.TestCase, LxmlTestCaseMixin):
 
     def test_root_node_invalid(self):
         self.assertRaises(TypeError, Doc, root_node=etree.Comment('invalid root doc'))
+
+    def test_raw_xml(self):
+        def make_doc():
+            d = Doc('a')
+            d.put(raw_xml_result(b"<?xml version='1.0' encoding='utf-8'?>\n<b c='1'><!--raw-->\xd1\x82</b>"))
+            d.put(etree.Element('d'))
+            return d
+
+        self.assertEqual(
+            make_doc().to_string(),
+            b"""<?xml version='1.0' encoding='utf-8'?>\n<a><b c='1'><!--raw-->\xd1\x82</b><d/></a>"""
+        )
+        self.assertXmlEqual(make_doc().to_etree_element(), b"""<a><b c="1"><!--raw-->\xd1\x82</b><d/></a>""")
+
+    def test_raw_xml_nested_doc(self):
+        b = Doc('b')
+        b.put(raw_xml_result(b'<c/>'))
+
+        a = Doc('a')
+        a.put(b)
+
+        self.assertEqual(a.to_string(), b"""<?xml version='1.0' encoding='utf-8'?>\n<a><b><c/></b></a>""")
+
+    def test_raw_xml_other_encoding(self):
+        d = Doc('a')
+        d.put(raw_xml_result(b"<?xml version='1.0' encoding='windows-1251'?>\n<b>\xf2</b>"))
+
+        self.assertEqual(
+            d.to_string(), b"""<?xml version='1.0' encoding='utf-8'?>\n<a><b>\xd1\x82</b></a>"""
+        )
+
+    def test_raw_xml_invalid(self):
+        d = Doc('a')
+        d.put(raw_xml_result(b'<b>'))
+
+        self.assertXmlEqual(
+            d.to_etree_element(), b"""<a><error url="http://backend/" reason="invalid XML"/></a>"""
+        )
+
+        # malformed (for example, truncated) XML is not inserted as is
+        for body in (b'<b>', b'<b><c></b>', b'<b/><c/>', b"<?xml version='1.0'?>\n<b><c x='1'/"):
+            d = Doc('a')
+            d.put(raw_xml_result(body))
+            d.put(etree.Element('d'))
+
+            self.assertXmlEqual(
+                etree.fromstring(d.to_string()), b"""<a><error url="http://backend/" reason="invalid XML"/><d/></a>"""
+            )
+
+    def test_raw_not_xml(self):
+        d = Doc('a')
+        d.put(raw_xml_result(b'<b/>', content_type='text/plain'))
+
+        self.assertRaises(ValueError, d.to_string)
+
+    def test_lazy_result(self):
+        parsed = []
+
+        def parse():
+            parsed.append(True)
+            return etree.Element('b')
+
+        result = RequestResult()
+        result.set_lazy(parse, None)
+
+        d = Doc('a')
+        d.put(result)
+        self.assertEqual(parsed, [])
+
+        self.assertXmlEqual(d.to_etree_element(), b"""<a><b/></a>""")
+        self.assertEqual(parsed, [True])
+
+    def test_resolve_results(self):
+        parse_threads = []
+
+        def parse():
+            parse_threads.append(threading.current_thread())
+            return etree.Element('b')
+
+        result = RequestResult()
+        result.set_lazy(parse, None)
+        future = Future()
+        future.set_result(result)
+
+        d = Doc('a')
+        d.put(Doc('c').put([future]))
+        d.resolve_results()
+        self.assertEqual(parse_threads, [threading.current_thread()])
+
+        elements = []
+        thread = threading.Thread(target=lambda: elements.append(d.to_etree_element()))
+        thread.start()
+        thread.join()
+
+        self.assertXmlEqual(elements[0], b"""<a><c><b/></c></a>""")
+        self.assertEqual(parse_threads, [threading.current_thread()])
@@ -1,6 +1,8 @@
 # coding=utf-8
 
 import os
+import shutil
+import tempfile
 import unittest
 
 from frontik.file_cache import FileCache, LimitedDict
@@ -44,6 +46,29 @@ class TestFileCache(unittest.TestCase):
         self.assertEqual(len(d), 10)
         self.assertIn(1, d)
 
+    def test_limited_dict_replace_item(self):
+        d = LimitedDict(max_len=2)
+
+        d[1] = 1
+        d[2] = 2
+        d[1] = 3
+
+        self.assertEqual(len(d), 2)
+        self.assertEqual(d.keys(), [2, 1])
+        self.assertEqual(d[1], 3)
+
+    def test_limited_dict_mapping_methods(self):
+        d = LimitedDict(max_len=3)
+        d.update({1: 'a'})
+        d.update([(2, 'b'), (3, 'c')])
+        d.get(1)
+
+        self.assertEqual(list(d), [2, 3, 1])
+        self.assertEqual(d.values(), ['b', 'c', 'a'])
+        self.assertEqual(d.items(), [(2, 'b'), (3, 'c'), (1, 'a')])
+        self.assertEqual(d.setdefault(4, 'd'), 'd')
+        self.assertEqual(dict(d), {3: 'c', 1: 'a', 4: 'd'})
+
     def test_unlimited_dict(self):
         d = LimitedDict()
 
@@ -62,6 +87,8 @@ class TestFileCache(unittest.TestCase):
         def debug(self, message, *args):
             self.message = message % args
 
+        info = debug
+
     def test_file_cache(self):
         c = FileCache('test', self.CACHE_DIR, lambda filename, log: filename, max_len=3)
         log = TestFileCache.MockLog()
@@ -82,3 +109,38 @@ class TestFileCache(unittest.TestCase):
 
         c.load('parse_error.xsl', log)
         self.assertIn('reading file', log.message)
+
+    def test_file_cache_revalidate(self):
+        root_dir = tempfile.mkdtemp()
+        filename = os.path.join(root_dir, 'file.txt')
+
+        def read_file(real_filename, log):
+            with open(real_filename) as f:
+                return f.read()
+
+        def write_file(content):
+            with open(filename, 'w') as f:
+                f.write(content)
+
+        try:
+            write_file('first')
+            c = FileCache('test', root_dir, read_file, max_len=3, revalidate_interval=0)
+            log = TestFileCache.MockLog()
+
+            self.assertEqual(c.load('file.txt', log), 'first')
+            self.assertEqual(c.load('file.txt', log), 'first')
+            self.assertIn('got file.txt file from cache', log.message)
+
+            write_file('second version')
+
+            self.assertEqual(c.load('file.txt', log), 'second version')
+            self.assertIn('reading file', log.message)
+        finally:
+            shutil.rmtree(root_dir)
+
+    def test_file_cache_deepcopy(self):
+        c = FileCache('test', self.CACHE_DIR, lambda filename, log: [filename], max_len=3, deepcopy=True)
+        log = TestFileCache.MockLog()
+
+        c.load('simple.xsl', log).append('modified')
+        self.assertEqual(len(c.load('simple.xsl', log)), 1)
@@ -0,0 +1,132 @@
+# coding=utf-8
+
+import time
+import warnings
+from functools import partial
+
+from tornado.testing import AsyncTestCase
+
+from frontik.handler import HTTPError
+from frontik.handler_active_limit import ActiveHandlersLimit, AdaptiveActiveHandlersLimit, PageHandlerActiveLimit
+
+
+class MockRequest(object):
+    method = 'GET'
+    connection = None
+
+    def __init__(self, uri):
+        self.uri = uri
+
+
+class MockHandler(object):
+    def __init__(self, active_limit, uri):
+        self.application = self
+        self.active_limit = active_limit
+        self.request = MockRequest(uri)
+        self.log = self
+
+    def warning(self, *args):
+        pass
+
+
+class TestActiveHandlersLimit(AsyncTestCase):
+    def setUp(self):
+        super(TestActiveHandlersLimit, self).setUp()
+        self.dispatched = []
+        self.rejected = []
+
+    def execute(self, limit, uri):
+        limit.execute(MockRequest(uri), partial(self.dispatched.append, uri))
+
+    def reject(self, request):
+        self.rejected.append(request.uri)
+
+    def test_limit(self):
+        limit = ActiveHandlersLimit(self.reject, limit=1)
+        requests = [MockRequest(str(i)) for i in range(3)]
+
+        for request in requests:
+            limit.execute(request, partial(self.dispatched.append, request.uri))
+
+        self.assertEqual(self.dispatched, ['0', '1'])
+        self.assertEqual(self.rejected, ['2'])
+
+        limit.release(requests[0])
+        limit.release(requests[0])
+        self.assertEqual(limit.get_stats(), {'active': 1, 'limit': 1, 'queued': 0, 'rejected': 1})
+
+    def test_queue(self):
+        limit = ActiveHandlersLimit(self.reject, limit=0, queue_size=2, queue_timeout=0.05)
+        first_request = MockRequest('0')
+        limit.execute(first_request, partial(self.dispatched.append, '0'))
+
+        for uri in ('1', '2', '3'):
+            self.execute(limit, uri)
+
+        self.assertEqual(self.dispatched, ['0'])
+        self.assertEqual(self.rejected, ['3'])
+        self.assertEqual(limit.get_stats()['queued'], 2)
+
+        limit.release(first_request)
+        self.assertEqual(self.dispatched, ['0', '1'])
+
+        self.io_loop.add_timeout(time.time() + 0.1, self.stop)
+        self.wait()
+
+        self.assertEqual(self.rejected, ['3', '2'])
+        self.assertEqual(limit.get_stats()['queued'], 0)
+
+    def test_page_handler_active_limit(self):
+        limit = ActiveHandlersLimit(self.reject, limit=0)
+
+        with warnings.catch_warnings(record=True) as caught_warnings:
+            warnings.simplefilter('always')
+            handler_limit = PageHandlerActiveLimit(MockHandler(limit, '0'))
+
+        self.assertEqual(caught_warnings[0].category, DeprecationWarning)
+        self.assertEqual(limit.active, 1)
+        self.assertRaises(HTTPError, PageHandlerActiveLimit, MockHandler(limit, '1'))
+
+        handler_limit.release()
+        handler_limit.release()
+        self.assertEqual(limit.active, 0)
+
+        # requests dispatched by the application limit are not counted twice
+        handler = MockHandler(limit, '2')
+        limit.execute(handler.request, lambda: None)
+        handler_limit = PageHandlerActiveLimit(handler)
+        handler_limit.release()
+        self.assertEqual(limit.active, 1)
+
+
+class TestAdaptiveActiveHandlersLimit(AsyncTestCase):
+    def run_window(self, limit, request_time, concurrency):
+        requests = [MockRequest(str(i)) for i in range(limit.WINDOW_SIZE)]
+
+        for i in range(0, len(requests), concurrency):
+            batch = requests[i:i + concurrency]
+            for request in batch:
+                limit.execute(request, lambda: None)
+
+            for request in batch:
+                request._frontik_limit_start_time = time.time() - request_time
+                limit.release(request)
+
+    def test_adaptive_limit(self):
+        limit = AdaptiveActiveHandlersLimit(lambda request: None, min_limit=5, max_limit=10)
+
+        self.run_window(limit, 0.01, concurrency=10)
+        self.assertEqual(limit.limit, 10)
+
+        self.run_window(limit, 0.1, concurrency=10)
+        self.assertEqual(limit.limit, 9)
+
+        for _ in range(10):
+            self.run_window(limit, 0.1, concurrency=10)
+
+        self.assertEqual(limit.limit, 5)
+
+        for _ in range(10):
+            self.run_window(limit, 0.01, concurrency=10)
+
+        self.assertEqual(limit.limit, 10)
@@ -1,10 +1,14 @@
 # coding=utf-8
 
+import time
 import unittest
 
+import requests
 from lxml import etree
 from tornado.escape import utf8
 
+import frontik.options  # noqa
+from frontik.http_client import UpstreamStats
 from .instances import frontik_test_app
 
 
@@ -57,6 +61,149 @@ class TestHttpClient(unittest.TestCase):
         json = frontik_test_app.get_page_json('http_client/future')
         self.assertEqual(json, {'main_callback_called': True, 'additional_callback_called': True})
 
+    def test_coalesce(self):
+        coalesced_before = frontik_test_app.get_page_json('status')['coalescing']['coalesced']
+
+        json = frontik_test_app.get_page_json('http_client/coalesce')
+        self.assertEqual(json['backend_requests'], 2)
+        self.assertEqual(json['results'], [{'backend': True}] * 4)
+
+        coalesced_after = frontik_test_app.get_page_json('status')['coalescing']['coalesced']
+        self.assertEqual(coalesced_after - coalesced_before, 2)
+
+    def test_coalesce_with_deadline(self):
+        json = frontik_test_app.get_page_json('http_client/coalesce_deadline')
+        self.assertEqual(json['backend_requests'], 2)
+        self.assertEqual(json['results'], [{'backend': True}] * 4)
+
+    def test_cache(self):
+        json = frontik_test_app.get_page_json('http_client/cache?cache_control=max-age%3D60')
+        self.assertEqual(json['backend_requests'], 1)
+        self.assertEqual(json['first'], '<doc><backend/></doc>')
+        self.assertEqual(json['second'], '<doc><backend/></doc>')
+
+        status = frontik_test_app.get_page_json('status')
+        self.assertGreater(status['http_cache']['hits'], 0)
+
+    def test_cache_no_store(self):
+        json = frontik_test_app.get_page_json('http_client/cache?cache_control=max-age%3D60,no-store')
+        self.assertEqual(json['backend_requests'], 2)
+
+    def test_cache_authorized_request(self):
+        json = frontik_test_app.get_page_json('http_client/cache?cache_control=max-age%3D60&authorization=true')
+        self.assertEqual(json['backend_requests'], 2)
+
+        json = frontik_test_app.get_page_json('http_client/cache?cache_control=public,max-age%3D60&authorization=true')
+        self.assertEqual(json['backend_requests'], 1)
+
+        json = frontik_test_app.get_page_json('http_client/cache?cache_control=s-maxage%3D60&authorization=true')
+        self.assertEqual(json['backend_requests'], 1)
+
+    def test_hedged_request(self):
+        start_time = time.time()
+        json = frontik_test_app.get_page_json('http_client/hedge?mode=slow')
+
+        self.assertLess(time.time() - start_time, 1)
+        self.assertEqual(json, {'backend_requests': 2, 'result': {'fast': True}, 'labels': ['hedged']})
+
+    def test_retried_request(self):
+        hedging_before = frontik_test_app.get_page_json('status')['hedging']
+
+        json = frontik_test_app.get_page_json('http_client/hedge?mode=error')
+        self.assertEqual(json, {'backend_requests': 2, 'result': {'fast': True}, 'labels': ['retry']})
+
+        hedging_after = frontik_test_app.get_page_json('status')['hedging']
+        self.assertEqual(hedging_after['retried'] - hedging_before['retried'], 1)
+        self.assertEqual(hedging_after['won'] - hedging_before['won'], 1)
+
+    def test_rejected_request_is_not_retried(self):
+        hedging_before = frontik_test_app.get_page_json('status')['hedging']
+
+        json = frontik_test_app.get_page_json('http_client/hedge?mode=rejected')
+        self.assertEqual(json, {'backend_requests': 0, 'result': None, 'labels': None})
+
+        hedging_after = frontik_test_app.get_page_json('status')['hedging']
+        self.assertEqual(hedging_after['retried'], hedging_before['retried'])
+
+    def test_pool(self):
+        json = frontik_test_app.get_page_json('http_client/pool')
+        self.assertEqual(json['order'], ['first', 'high', 'low'])
+        self.assertEqual(json['results'], [{'first': True}, {'low': True}, {'high': True}])
+
+        pool_stats = frontik_test_app.get_page_json('status')['pools']['test']
+        self.assertEqual(pool_stats['limit'], 1)
+        self.assertEqual(pool_stats['active'], 0)
+
+    def test_page_timeout(self):
+        json = frontik_test_app.get_page_json('http_client/deadline')
+        self.assertEqual(json['code'], 200)
+        self.assertLessEqual(json['backend']['timeout'], 500)
+        self.assertGreater(json['backend']['timeout'], 0)
+
+    def test_outer_timeout(self):
+        response = frontik_test_app.get_page('http_client/deadline', headers={'X-Outer-Timeout-Ms': '300'})
+        self.assertLessEqual(response.json()['backend']['timeout'], 300)
+
+    def test_expired_deadline(self):
+        json = frontik_test_app.get_page_json('http_client/deadline?wait=0.6')
+        self.assertEqual(json, {'code': 599, 'backend': None, 'backend_requests': 0})
+
+    def test_cancel_on_finish(self):
+        self.assertEqual(frontik_test_app.get_page_text('http_client/cancel'), 'finished')
+
+        time.sleep(0.1)
+        json = frontik_test_app.get_page_json('http_client/cancel?result=true')
+        self.assertEqual(json['cancelled'], [False, True])
+
+    def test_cancel_on_connection_close(self):
+        with self.assertRaises(requests.exceptions.Timeout):
+            frontik_test_app.get_page('http_client/cancel?wait=true', timeout=0.3)
+
+        time.sleep(0.1)
+        json = frontik_test_app.get_page_json('http_client/cancel?result=true')
+        self.assertEqual(json['cancelled'], [False, True])
+
     def test_http_client_fetch(self):
         text = frontik_test_app.get_page_text('http_client/fetch')
         self.assertEqual(text, 'fetch success')
+
+    def test_upstreams_status(self):
+        frontik_test_app.get_page_text('http_client/fibonacci?n=2')
+
+        upstreams = frontik_test_app.get_page_json('status/upstreams')
+        host = next(h for h in upstreams if h.endswith(':{}'.format(frontik_test_app.port)))
+
+        self.assertGreaterEqual(upstreams[host]['requests'], 2)
+        self.assertLessEqual(upstreams[host]['reuse_ratio'], 1.0)
+        self.assertEqual(set(upstreams[host]['time']['total']), {'p50', 'p95', 'p99'})
+        self.assertLessEqual(upstreams[host]['time']['total']['p50'], upstreams[host]['time']['total']['p99'])
+
+
+class TestUpstreamStats(unittest.TestCase):
+    class Request(object):
+        url = 'http://backend:80/page'
+
+    class Response(object):
+        code = 200
+
+        def __init__(self, total):
+            self.time_info = {'total': total}
+
+    def add_responses(self, stats, total, count):
+        for _ in range(count):
+            stats.add(self.Request(), self.Response(total))
+
+    def test_percentile_cache(self):
+        stats = UpstreamStats()
+        self.add_responses(stats, 0.01, UpstreamStats.MIN_PERCENTILE_RESPONSES - 1)
+        self.assertIsNone(stats.get_percentile('backend:80', 'total', 50))
+
+        self.add_responses(stats, 0.01, 1)
+        self.assertEqual(stats.get_percentile('backend:80', 'total', 99), 10)
+
+        # the cached value is returned until enough new responses are received
+        self.add_responses(stats, 1, UpstreamStats.PERCENTILE_UPDATE_RESPONSES - 1)
+        self.assertEqual(stats.get_percentile('backend:80', 'total', 99), 10)
+
+        self.add_responses(stats, 1, 1)
+        self.assertEqual(stats.get_percentile('backend:80', 'total', 99), 1000)
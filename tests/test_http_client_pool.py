@@ -0,0 +1,132 @@
+# coding=utf-8
+
+from functools import partial
+
+from tornado.testing import AsyncTestCase
+
+from frontik.circuit_breaker import CircuitBreaker
+from frontik.http_client import HttpClient
+from frontik.http_client_pool import HttpClientPool
+
+
+class MockRequest(object):
+    connect_timeout = 0.05
+    request_timeout = 0.05
+
+    def __init__(self, url):
+        self.url = url
+
+
+class MockResponse(object):
+    code = 200
+
+
+class TestHttpClientPool(AsyncTestCase):
+    def setUp(self):
+        super(TestHttpClientPool, self).setUp()
+        self.sent = []
+        self.responses = []
+
+    def fetch_impl(self, request, callback):
+        self.sent.append((request.url, callback))
+
+    def fetch(self, pool, url, priority=0):
+        pool.fetch(MockRequest(url), priority, self.fetch_impl, partial(self.on_response, url))
+
+    def on_response(self, url, response):
+        self.responses.append((url, response.code))
+
+    def test_priority(self):
+        pool = HttpClientPool('test', 1)
+
+        self.fetch(pool, 'first')
+        self.fetch(pool, 'low', priority=-1)
+        self.fetch(pool, 'normal')
+        self.fetch(pool, 'high', priority=1)
+        self.fetch(pool, 'normal2')
+
+        self.assertEqual([url for url, _ in self.sent], ['first'])
+        self.assertEqual(pool.get_stats(), {'active': 1, 'limit': 1, 'queued': 4, 'timed_out': 0})
+
+        for _ in range(4):
+            self.sent[-1][1](MockResponse())
+
+        self.assertEqual([url for url, _ in self.sent], ['first', 'high', 'normal', 'normal2', 'low'])
+        self.assertEqual(pool.get_stats(), {'active': 1, 'limit': 1, 'queued': 0, 'timed_out': 0})
+
+    def test_timeout(self):
+        pool = HttpClientPool('test', 1)
+
+        self.fetch(pool, 'first')
+        self.fetch(pool, 'second')
+
+        self.io_loop.add_timeout(self.io_loop.time() + 0.1, self.stop)
+        self.wait()
+
+        self.assertEqual(self.responses, [('second', 599)])
+        self.assertEqual(pool.get_stats(), {'active': 1, 'limit': 1, 'queued': 0, 'timed_out': 1})
+
+        self.sent[0][1](MockResponse())
+        self.assertEqual(self.responses, [('second', 599), ('first', 200)])
+        self.assertEqual(pool.get_stats(), {'active': 0, 'limit': 1, 'queued': 0, 'timed_out': 1})
+
+    def test_queue_time_is_subtracted_from_timeouts(self):
+        pool = HttpClientPool('test', 1)
+
+        self.fetch(pool, 'first')
+        request = MockRequest('second')
+        pool.fetch(request, 0, self.fetch_impl, partial(self.on_response, 'second'))
+
+        self.io_loop.add_timeout(self.io_loop.time() + 0.02, self.stop)
+        self.wait()
+        self.sent[0][1](MockResponse())
+
+        self.assertEqual([url for url, _ in self.sent], ['first', 'second'])
+        self.assertLess(request.request_timeout, 0.035)
+        self.assertGreater(request.request_timeout, 0)
+        self.assertEqual(request.connect_timeout, request.request_timeout)
+
+    def test_send_error(self):
+        pool = HttpClientPool('test', 1)
+
+        def failing_fetch_impl(request, callback):
+            raise ValueError('send error')
+
+        self.assertRaises(ValueError, pool.fetch, MockRequest('first'), 0, failing_fetch_impl, self.on_response)
+        self.assertEqual(pool.get_stats(), {'active': 0, 'limit': 1, 'queued': 0, 'timed_out': 0})
+
+    def test_queued_send_error(self):
+        pool = HttpClientPool('test', 1)
+
+        def failing_fetch_impl(request, callback):
+            raise ValueError('send error')
+
+        self.fetch(pool, 'first')
+        pool.fetch(MockRequest('second'), 0, failing_fetch_impl, partial(self.on_response, 'second'))
+        self.fetch(pool, 'third')
+
+        # the error is delivered to the callback of the queued request, the next one is sent
+        self.sent[0][1](MockResponse())
+
+        self.assertEqual(self.responses, [('second', 599), ('first', 200)])
+        self.assertEqual([url for url, _ in self.sent], ['first', 'third'])
+        self.assertEqual(pool.get_stats(), {'active': 1, 'limit': 1, 'queued': 0, 'timed_out': 0})
+
+    def test_timeout_does_not_open_circuit_breaker(self):
+        pool = HttpClientPool('test', 1)
+        breaker = CircuitBreaker('backend:80', window=10, min_requests=1, error_rate=0.5, slow_time=0, open_time=1)
+
+        self.fetch(pool, 'first')
+
+        request = MockRequest('second')
+        self.assertTrue(breaker.allow_request(request))
+        callback = partial(self.on_response, 'second')
+        callback = partial(HttpClient._add_circuit_breaker_result, breaker, request, callback)
+        pool.fetch(request, 0, self.fetch_impl, callback)
+
+        self.io_loop.add_timeout(self.io_loop.time() + 0.1, self.stop)
+        self.wait()
+
+        self.assertEqual(self.responses, [('second', 599)])
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow_request(MockRequest('third')))
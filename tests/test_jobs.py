@@ -1,8 +1,16 @@
 # coding=utf-8
 
+import os
+import signal
+import time
 import unittest
 
-from .instances import frontik_test_app
+from concurrent.futures import TimeoutError
+from tornado.testing import AsyncTestCase
+from tornado.web import HTTPError
+
+from frontik.jobs import BrokenProcessPool, ProcessExecutor
+from .instances import frontik_process_executor_app, frontik_test_app
 
 
 class TestJobs(unittest.TestCase):
@@ -12,3 +20,91 @@ class TestJobs(unittest.TestCase):
 
         xml = frontik_test_app.get_page_text('job_fail?nofail=True')
         self.assertIn('<ok result="True"/>', xml)
+
+
+class TestProcessExecutor(unittest.TestCase):
+    def test_queue_size(self):
+        executor = ProcessExecutor(max_workers=1, queue_size=2)
+
+        futures = [executor.submit(time.sleep, 0.2) for _ in range(2)]
+        with self.assertRaises(HTTPError) as context:
+            executor.submit(time.sleep, 0.2)
+
+        self.assertEqual(context.exception.status_code, 503)
+
+        for future in futures:
+            future.result()
+
+        # done callbacks may run after result() returns
+        for _ in range(10):
+            if executor.pending == 0:
+                break
+            time.sleep(0.05)
+
+        self.assertEqual(executor.pending, 0)
+        executor.submit(time.sleep, 0).result()
+
+    @unittest.skipIf(BrokenProcessPool is None, 'broken process pool is not detected on Python 2')
+    def test_broken_pool(self):
+        executor = ProcessExecutor(max_workers=1, queue_size=10)
+        worker_pid = executor.submit(os.getpid).result()
+
+        future = executor.submit(time.sleep, 10)
+        time.sleep(0.1)
+        os.kill(worker_pid, signal.SIGKILL)
+
+        self.assertRaises(BrokenProcessPool, future.result, 5)
+
+        self.assertNotEqual(executor.submit(os.getpid).result(5), worker_pid)
+        self.assertEqual(executor.submit(sum, [1, 2]).result(5), 3)
+
+    def test_xsl(self):
+        response = frontik_process_executor_app.get_page('xsl/simple')
+        self.assertEqual(response.content, b'<html><body><h1>ok</h1></body></html>\n')
+
+        html = frontik_process_executor_app.get_page_text('xsl/apply_error?debug')
+        self.assertIn('XSLT ERROR in file', html)
+
+    def test_jinja(self):
+        response = frontik_process_executor_app.get_page('json_page')
+        self.assertEqual(response.content, b'<html><body><b>1</b><i>2</i></body></html>')
+
+        response = frontik_process_executor_app.get_page('json_page?custom_render=true')
+        self.assertEqual(response.content, b'<html><body><b>custom1</b><i>custom2</i></body></html>')
+
+        debug_response = frontik_process_executor_app.get_page('json_page?template_error=true&debug')
+        self.assertIn(b"'req1' is undefined", debug_response.content)
+
+        debug_response = frontik_process_executor_app.get_page('json_page?template=jinja-syntax-error.html&debug')
+        self.assertIn(b"unexpected '}'", debug_response.content)
+
+
+class TestProcessExecutorJobTimeout(AsyncTestCase):
+    def test_job_timeout(self):
+        executor = ProcessExecutor(max_workers=1, queue_size=10, job_timeout=0.5)
+
+        self.io_loop.add_future(executor.submit(os.getpid), self.stop)
+        worker_pid = self.wait().result()
+
+        # a killed worker is not detected by futures backport on Python 2, so the job fails by timeout
+        self.io_loop.add_future(executor.submit(time.sleep, 10), self.stop)
+        os.kill(worker_pid, signal.SIGKILL)
+        self.assertIsInstance(self.wait(timeout=5).exception(), (TimeoutError,) + _broken_pool_errors())
+        self.assertEqual(executor.pending, 0)
+
+        self.io_loop.add_future(executor.submit(os.getpid), self.stop)
+        self.assertNotEqual(self.wait(timeout=5).result(), worker_pid)
+
+    def test_slow_job(self):
+        executor = ProcessExecutor(max_workers=1, queue_size=10, job_timeout=0.2)
+
+        self.io_loop.add_future(executor.submit(time.sleep, 1), self.stop)
+        self.assertIsInstance(self.wait(timeout=5).exception(), TimeoutError)
+        self.assertEqual(executor.pending, 0)
+
+        self.io_loop.add_future(executor.submit(sum, [1, 2]), self.stop)
+        self.assertEqual(self.wait(timeout=5).result(), 3)
+
+
+def _broken_pool_errors():
+    return () if BrokenProcessPool is None else (BrokenProcessPool,)
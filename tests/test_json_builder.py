@@ -6,7 +6,7 @@ import unittest
 
 from tornado.concurrent import Future
 
-from frontik.json_builder import JsonBuilder
+from frontik.json_builder import FrontikJsonEncoder, JsonBuilder
 from frontik.http_client import RequestResult, FailedRequestException
 
 
@@ -196,3 +196,33 @@ class TestJsonBuilder(unittest.TestCase):
         self.assertEqual(
             j.to_dict(), {'some': ['test1', 'test2', 'test3']}
         )
+
+    def test_iter_encode(self):
+        j = JsonBuilder()
+        self.assertEqual(''.join(j.iter_encode()), '{}')
+
+        j.put({'a': [1, 2, 3], 1: None})
+        j.put(b={'c': 'd'})
+        self.assertEqual(''.join(j.iter_encode()), j.to_string())
+
+    def test_iter_encode_root_node(self):
+        j = JsonBuilder(root_node='root')
+        j.put({'a': 'b'}, {'c': 'd'})
+
+        parts = list(j.iter_encode())
+        self.assertEqual(len(parts), 4)
+        self.assertEqual(''.join(parts), j.to_string())
+
+    def test_iter_encode_compact_encoder(self):
+        class CompactJsonEncoder(FrontikJsonEncoder):
+            def __init__(self, **kwargs):
+                kwargs['separators'] = (',', ':')
+                super(CompactJsonEncoder, self).__init__(**kwargs)
+
+        j = JsonBuilder(root_node='root', json_encoder=CompactJsonEncoder)
+        j.put({'a': [1, 2], 'b': {'c': 'd'}}, e=None)
+
+        streamed = ''.join(j.iter_encode())
+        self.assertEqual(json.loads(streamed), json.loads(j.to_string()))
+        self.assertEqual(streamed, j.to_string())
+        self.assertNotIn(' ', streamed)
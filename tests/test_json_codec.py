@@ -0,0 +1,63 @@
+# coding=utf-8
+
+import unittest
+
+from tornado.options import options
+
+import frontik.options  # noqa
+from frontik.json_builder import JsonBuilder
+from frontik.json_codec import get_json_codec, JSON_CODECS
+
+
+class TestJsonCodec(unittest.TestCase):
+    def tearDown(self):
+        options.json_codec = None
+
+    def test_default(self):
+        codec = get_json_codec()
+        self.assertEqual(codec.name, 'default')
+        self.assertEqual(codec.loads(b'{"a": [1, null]}'), {'a': [1, None]})
+        self.assertEqual(codec.dumps({'a': {1}}, default=list), '{"a": [1]}')
+
+    def test_simplejson(self):
+        options.json_codec = 'simplejson'
+        codec = get_json_codec()
+        self.assertEqual(codec.name, 'simplejson')
+
+        j = JsonBuilder(root_node='root')
+        j.put({'a': frozenset(['b'])}, c=1)
+        self.assertEqual(j.to_string(), '{"root": {"a": ["b"], "c": 1}}')
+        self.assertEqual(''.join(j.iter_encode()), j.to_string())
+
+    def test_fallback_to_default(self):
+        options.json_codec = 'orjson'
+
+        try:
+            import orjson  # noqa
+            self.skipTest('orjson is installed')
+        except ImportError:
+            pass
+
+        self.assertEqual(get_json_codec().name, 'default')
+
+    def test_invalid_codec(self):
+        options.json_codec = 'pickle'
+        self.assertRaises(ValueError, get_json_codec)
+
+    def test_not_serializable(self):
+        options.json_codec = 'simplejson'
+
+        j = JsonBuilder()
+        j.put(a=object())
+        self.assertRaises(TypeError, j.to_string)
+
+    def test_non_string_keys(self):
+        for name in [None] + sorted(JSON_CODECS):
+            options.json_codec = name
+            codec = get_json_codec()
+
+            self.assertEqual(codec.loads(codec.dumps({1: 'a', 2.5: None}, default=None)), {'1': 'a', '2.5': None})
+
+            j = JsonBuilder()
+            j.put({1: {2: 3}})
+            self.assertEqual(codec.loads(j.to_string()), {'1': {'2': 3}})
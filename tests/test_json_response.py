@@ -17,6 +17,11 @@ class TestJsonResponse(unittest.TestCase):
         self.assertEqual(data['req1']['result'], '1')
         self.assertEqual(data['req2']['result'], '2')
 
+    def test_streamed_json(self):
+        response = frontik_test_app.get_page('json_page', notpl=True)
+        self.assertEqual(response.headers.get('transfer-encoding'), 'chunked')
+        self.assertNotIn('content-length', response.headers)
+
     def test_invalid_json(self):
         response = frontik_test_app.get_page('json_page?invalid=true', notpl=True)
         self.assertTrue(response.headers['content-type'].startswith('application/json'))
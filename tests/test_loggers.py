@@ -0,0 +1,146 @@
+# coding=utf-8
+
+import logging
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from tornado.options import options
+
+import frontik.loggers
+import frontik.options  # noqa
+from frontik.compat import PY3
+from frontik.loggers import (
+    ACCESS_LOGGER, BackgroundLogHandler, ROOT_LOGGER, ContextFilter, bootstrap_core_logging, set_request_log_context
+)
+from frontik.loggers.request import RequestLogger
+from frontik.request_context import RequestContext
+
+
+class Request(object):
+    def __init__(self):
+        self._start_time = time.time()
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super(RecordingHandler, self).__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def make_record(name):
+    return logging.makeLogRecord({'name': name, 'msg': 'message', 'levelno': logging.INFO})
+
+
+class TestContextFilter(unittest.TestCase):
+    def test_request_context(self):
+        with RequestContext({}):
+            set_request_log_context('123', 'pages.Page')
+            record = make_record('tornado.general')
+            self.assertTrue(ContextFilter().filter(record))
+
+        self.assertEqual(record.request_id, '123')
+        self.assertEqual(record.handler_name, 'pages.Page')
+        self.assertEqual(record.name, 'tornado.general.pages.Page.123')
+
+    def test_no_request_context(self):
+        with RequestContext({}):
+            record = make_record('tornado.general')
+            ContextFilter().filter(record)
+
+        self.assertIsNone(record.request_id)
+        self.assertIsNone(record.handler_name)
+        self.assertEqual(record.name, 'tornado.general')
+
+    def test_idempotent(self):
+        with RequestContext({}):
+            set_request_log_context('123')
+            record = make_record('frontik.handler')
+
+            # the same record is passed to each handler with its own filter
+            ContextFilter().filter(record)
+            ContextFilter().filter(record)
+
+        self.assertEqual(record.request_id, '123')
+        self.assertIsNone(record.handler_name)
+        self.assertEqual(record.name, 'frontik.handler.123')
+
+
+class TestRequestLogger(unittest.TestCase):
+    def setUp(self):
+        self.output_level = frontik.loggers._output_level
+        frontik.loggers._output_level = logging.INFO
+
+        self.handler = RecordingHandler()
+        self.logger = logging.getLogger('frontik.handler')
+        self.logger_level = self.logger.level
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        frontik.loggers._output_level = self.output_level
+        self.logger.setLevel(self.logger_level)
+        self.logger.removeHandler(self.handler)
+
+    def test_debug_log_handler(self):
+        with RequestContext({'log_handler': RecordingHandler()}):
+            request_logger = RequestLogger(Request())
+            self.assertTrue(request_logger.isEnabledFor(logging.DEBUG))
+            request_logger.debug('debug message')
+
+        self.assertEqual([r.getMessage() for r in self.handler.records], ['debug message'])
+
+    def test_level_below_output(self):
+        with RequestContext({}):
+            request_logger = RequestLogger(Request())
+            self.assertFalse(request_logger.isEnabledFor(logging.DEBUG))
+            self.assertTrue(request_logger.isEnabledFor(logging.INFO))
+
+            request_logger.info('info message')
+            if PY3:
+                # Python 2 LoggerAdapter does not check isEnabledFor before creating records
+                request_logger.debug('debug message')
+
+        self.assertEqual([r.getMessage() for r in self.handler.records], ['info message'])
+
+
+class TestBootstrapCoreLogging(unittest.TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.access_log_file = options.access_log_file
+        self.root_handlers = list(ROOT_LOGGER.handlers)
+        self.access_handlers = list(ACCESS_LOGGER.handlers)
+        self.access_propagate = ACCESS_LOGGER.propagate
+        self.output_level = frontik.loggers._output_level
+
+    def tearDown(self):
+        for handler in ACCESS_LOGGER.handlers:
+            handler.close()
+
+        options.access_log_file = self.access_log_file
+        ROOT_LOGGER.handlers = self.root_handlers
+        ACCESS_LOGGER.handlers = self.access_handlers
+        ACCESS_LOGGER.propagate = self.access_propagate
+        frontik.loggers._output_level = self.output_level
+        shutil.rmtree(self.log_dir)
+
+    def test_access_log_handler_is_replaced(self):
+        options.access_log_file = os.path.join(self.log_dir, 'access.log')
+
+        bootstrap_core_logging()
+        bootstrap_core_logging()
+
+        handlers = [h for h in ACCESS_LOGGER.handlers if isinstance(h, BackgroundLogHandler)]
+        self.assertEqual(len(handlers), 1)
+        self.assertIn(handlers[0], frontik.loggers._background_handlers)
+
+        ACCESS_LOGGER.info('access log', extra={'_access_log': {'status': 200}})
+        handlers[0].stop()
+
+        with open(options.access_log_file) as access_log:
+            self.assertEqual(len(access_log.read().splitlines()), 1)
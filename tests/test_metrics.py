@@ -0,0 +1,55 @@
+# coding=utf-8
+
+import unittest
+
+from frontik.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter(self):
+        counter = Counter('requests_total', 'Requests', ['method', 'code'], metrics_registry=self.registry)
+        counter.labels('GET', '200').inc()
+        counter.labels('GET', '200').inc(2)
+        counter.labels('POST', '5"0\\0').inc()
+
+        self.assertEqual(self.registry.expose(), (
+            '# HELP requests_total Requests\n'
+            '# TYPE requests_total counter\n'
+            'requests_total{method="GET",code="200"} 3\n'
+            'requests_total{method="POST",code="5\\"0\\\\0"} 1\n'
+        ))
+
+    def test_gauge(self):
+        gauge = Gauge('active', 'Active requests', metrics_registry=self.registry)
+        gauge.inc(3)
+        gauge.dec()
+        self.assertIn('\nactive 2\n', self.registry.expose())
+
+        gauge.set_function(lambda: 0.5)
+        self.assertIn('\nactive 0.5\n', self.registry.expose())
+
+    def test_histogram(self):
+        histogram = Histogram('duration_seconds', 'Duration', buckets=(0.1, 1), metrics_registry=self.registry)
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe(value)
+
+        self.assertEqual(self.registry.expose(), (
+            '# HELP duration_seconds Duration\n'
+            '# TYPE duration_seconds histogram\n'
+            'duration_seconds_bucket{le="0.1"} 2\n'
+            'duration_seconds_bucket{le="1"} 3\n'
+            'duration_seconds_bucket{le="+Inf"} 4\n'
+            'duration_seconds_sum 2.65\n'
+            'duration_seconds_count 4\n'
+        ))
+
+    def test_duplicate_metric(self):
+        Counter('requests_total', 'Requests', metrics_registry=self.registry)
+        self.assertRaises(ValueError, Counter, 'requests_total', 'Requests', metrics_registry=self.registry)
+
+    def test_wrong_labels(self):
+        counter = Counter('requests_total', 'Requests', ['method'], metrics_registry=self.registry)
+        self.assertRaises(ValueError, counter.labels, 'GET', '200')
@@ -0,0 +1,46 @@
+# coding=utf-8
+
+import time
+import unittest
+
+from frontik.profiler import NO_HANDLER, SamplingProfiler, format_collapsed_stacks
+from frontik.request_context import RequestContext
+
+
+def burn_cpu(seconds):
+    start_time = time.time()
+    while time.time() - start_time < seconds:
+        sum(range(1000))
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_samples(self):
+        profiler = SamplingProfiler()
+        profiler.start(0.001)
+        self.assertTrue(profiler.running)
+        self.assertRaises(RuntimeError, profiler.start)
+
+        with RequestContext({'handler_name': 'pages.profiled.Page'}):
+            burn_cpu(0.2)
+
+        burn_cpu(0.1)
+
+        samples = profiler.stop()
+        self.assertFalse(profiler.running)
+
+        handler_stacks = [stack for stack in samples if stack[0] == 'pages.profiled.Page']
+        self.assertTrue(handler_stacks)
+        self.assertTrue(all(stack[-1].startswith('burn_cpu (') for stack in handler_stacks))
+        self.assertTrue(any(stack[0] == NO_HANDLER and stack[-1].startswith('burn_cpu (') for stack in samples))
+
+    def test_format_collapsed_stacks(self):
+        samples = {
+            ('pages.b.Page', 'get_page (b.py:1)'): 2,
+            ('pages.a.Page', 'get_page (a.py:1)', 'render (a.py:10)'): 5,
+        }
+
+        self.assertEqual(
+            format_collapsed_stacks(samples),
+            'pages.a.Page;get_page (a.py:1);render (a.py:10) 5\n'
+            'pages.b.Page;get_page (b.py:1) 2\n'
+        )
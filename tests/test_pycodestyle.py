@@ -10,7 +10,7 @@ from . import FRONTIK_ROOT
 
 
 class TestPycodestyle(unittest.TestCase):
-    CHECKED_PATHS = ('frontik', 'tests', 'examples', 'setup.py', 'frontik-test')
+    CHECKED_PATHS = ('frontik', 'tests', 'examples', 'benchmarks', 'setup.py', 'frontik-test')
 
     def test_pycodestyle(self):
         style_guide = pycodestyle.StyleGuide(
@@ -2,7 +2,8 @@
 
 import unittest
 
-from frontik.routing import MAX_MODULE_NAME_LENGTH
+import frontik.options  # noqa
+from frontik.routing import _get_literal_prefix, FileMappingRouter, FrontikRouter, MAX_MODULE_NAME_LENGTH
 
 from .instances import frontik_re_app, frontik_test_app
 
@@ -77,3 +78,115 @@ class TestRouting(unittest.TestCase):
 
         response = frontik_re_app.get_page('reverse_url?fail_missing=true')
         self.assertEqual(response.status_code, 500)
+
+
+class TestFrontikRouter(unittest.TestCase):
+    class Application(object):
+        def __init__(self, urls):
+            self.urls = urls
+
+        def application_urls(self):
+            return self.urls
+
+    class Request(object):
+        def __init__(self, uri):
+            self.uri = uri
+            self.path = uri.partition('?')[0]
+            self.arguments = {}
+
+    class TrieRouter(FrontikRouter):
+        LINEAR_SCAN_MAX_ROUTES = 0
+
+    def route(self, router, uri):
+        request = TestFrontikRouter.Request(uri)
+        return router(None, request), request.arguments
+
+    def test_literal_prefix(self):
+        self.assertEqual(_get_literal_prefix('/not_simple'), ('/not_simple', True))
+        self.assertEqual(_get_literal_prefix(r'/a\.b/(?P<id>\d+)'), ('/a.b/', False))
+        self.assertEqual(_get_literal_prefix('/ab?'), ('/a', False))
+        self.assertEqual(_get_literal_prefix('/a|/b'), ('/', False))
+        self.assertEqual(_get_literal_prefix('(?!/not_matching_regex)'), ('', False))
+        self.assertEqual(_get_literal_prefix('(?i)/abc'), ('', False))
+
+    def test_first_match_is_used(self):
+        urls = [
+            ('/id/(?P<id>[^/]+)', lambda app, request: 'id'),
+            ('/id/(?P<id1>[^/]+)/(?P<id2>[^/]+)', lambda app, request: 'two_ids'),
+            ('/id', lambda app, request: 'literal'),
+            ('/i', lambda app, request: 'short'),
+            ('.*', lambda app, request: 'any'),
+        ]
+
+        for router in (FrontikRouter(self.Application(urls)), self.TrieRouter(self.Application(urls))):
+            for _ in range(2):  # second time results are taken from cache
+                self.assertEqual(self.route(router, '/id/1/2'), ('id', {'id': ['1']}))
+                self.assertEqual(self.route(router, '/id'), ('literal', {}))
+                self.assertEqual(self.route(router, '/id_list?a=b'), ('literal', {}))
+                self.assertEqual(self.route(router, '/item'), ('short', {}))
+                self.assertEqual(self.route(router, '/'), ('any', {}))
+
+    def test_cache_key(self):
+        router = FrontikRouter(self.Application([
+            (r'/item/(?P<id>\d+)', lambda app, request: 'item'),
+            ('/page/?$', lambda app, request: 'page'),
+            ('/page', lambda app, request: 'page_with_query'),
+        ]))
+
+        for i in range(3):
+            self.assertEqual(self.route(router, '/item/1?a={}'.format(i)), ('item', {'id': ['1']}))
+
+        self.assertEqual(list(router.routes_cache), ['/item/1'])
+
+        self.assertEqual(self.route(router, '/page'), ('page', {}))
+        self.assertEqual(self.route(router, '/page?a=b'), ('page_with_query', {}))
+        self.assertEqual(self.route(router, '/page'), ('page', {}))
+        self.assertEqual(list(router.routes_cache), ['/item/1', '/page?a=b', '/page'])
+
+
+class TestFileMappingRouter(unittest.TestCase):
+    class Application(object):
+        def application_404_handler(self, request):
+            return (lambda application, request: 404), {}
+
+    class Request(object):
+        def __init__(self, path):
+            self.path = path
+
+    def test_missing_pages_cache(self):
+        from .projects.test_app import pages
+
+        router = FileMappingRouter(pages)
+        for _ in range(2):
+            self.assertEqual(router(self.Application(), self.Request('/no/such/page')), 404)
+
+        self.assertIn('tests.projects.test_app.pages.no.such.page', router.missing_pages)
+
+    def test_preload(self):
+        from .projects.test_app import pages
+
+        router = FileMappingRouter(pages, preload=True)
+        self.assertIn('tests.projects.test_app.pages.nested.nested.nested', router.pages)
+        self.assertIn('tests.projects.test_app.pages.error_on_import', router.failed_modules)
+
+        self.assertEqual(router(self.Application(), self.Request('/no_page/really')), 404)
+        self.assertNotIn('tests.projects.test_app.pages.no_page.really', router.missing_pages)
+
+    def test_preload_with_autoreload(self):
+        from tornado.options import options
+        from .projects.test_app import pages
+
+        options.autoreload = True
+        try:
+            router = FileMappingRouter(pages, preload=True)
+        finally:
+            options.autoreload = False
+
+        # a page, which has appeared after preloading, is imported instead of being treated as missing
+        from .projects.test_app.pages import simple_xml
+        page_class = router.pages.pop('tests.projects.test_app.pages.simple_xml')
+        simple_xml.Page = lambda application, request: 200
+        try:
+            self.assertEqual(router(self.Application(), self.Request('/simple_xml')), 200)
+        finally:
+            simple_xml.Page = page_class
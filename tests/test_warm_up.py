@@ -0,0 +1,44 @@
+# coding=utf-8
+
+import logging
+import unittest
+
+# noinspection PyUnresolvedReferences
+import frontik.options
+from frontik.app import FrontikApplication
+from frontik.producers.json_producer import JsonProducerFactory
+from frontik.producers.xml_producer import XMLProducerFactory
+from tests.projects.no_debug_app import TestApplication
+from tests.projects.test_app import config
+
+
+class MockApplication(object):
+    config = config
+
+
+class TestWarmUp(unittest.TestCase):
+    def test_warm_up(self):
+        log = logging.getLogger('frontik.test_warm_up')
+
+        xml_factory = XMLProducerFactory(MockApplication())
+        xml_factory.xsl_cache.cache.max_len = None
+        xml_factory.warm_up(log)
+
+        self.assertIn('simple.xsl', xml_factory.xsl_cache.cache)
+        self.assertNotIn('syntax_error.xsl', xml_factory.xsl_cache.cache)
+        self.assertIn('aaa.xml', xml_factory.xml_cache.cache)
+
+        json_factory = JsonProducerFactory(MockApplication())
+        json_factory.warm_up(log)
+
+        self.assertEqual(len(json_factory.environment.cache), 2)
+
+    def test_warm_up_before_fork(self):
+        try:
+            TestApplication.warm_up_caches_before_fork(app='tests.projects.no_debug_app')
+            xml_factory, json_factory = FrontikApplication._preforked_producers
+
+            self.assertIn('simple.xsl', xml_factory.xsl_cache.cache)
+            self.assertIsNone(json_factory.environment)
+        finally:
+            FrontikApplication._preforked_producers = None
@@ -0,0 +1,92 @@
+# coding=utf-8
+
+import errno
+import os
+import signal
+import time
+import unittest
+
+from .instances import FrontikTestInstance, find_free_port, frontik_workers_app, run_command
+
+
+def get_processes_status(instance, alive=2):
+    for i in range(50):
+        processes = instance.get_page_json('status')['processes']
+        if processes['alive'] == alive:
+            break
+
+        time.sleep(0.1)
+
+    return processes
+
+
+def is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        if e.errno == errno.ESRCH:
+            return False
+        raise
+
+    return True
+
+
+def wait_for_exit(popen, timeout):
+    for i in range(int(timeout * 10)):
+        if popen.poll() is not None:
+            return popen.returncode
+
+        time.sleep(0.1)
+
+    popen.kill()
+    return None
+
+
+class TestWorkers(unittest.TestCase):
+    def test_status(self):
+        processes = get_processes_status(frontik_workers_app)
+
+        self.assertEqual(processes['count'], 2)
+        self.assertEqual(processes['alive'], 2)
+        self.assertEqual(sorted(s['worker_id'] for s in processes['statuses']), [0, 1])
+        self.assertNotEqual(processes['statuses'][0]['pid'], processes['statuses'][1]['pid'])
+
+    def test_pages(self):
+        for i in range(4):
+            self.assertIn('<h1>ok</h1>', frontik_workers_app.get_page_text('simple'))
+
+    def test_killed_worker_is_restarted(self):
+        killed_pid = get_processes_status(frontik_workers_app)['statuses'][0]['pid']
+        os.kill(killed_pid, signal.SIGKILL)
+
+        for i in range(50):
+            time.sleep(0.1)
+            statuses = frontik_workers_app.get_page_json('status')['processes']['statuses']
+            pids = [s['pid'] for s in statuses if s is not None]
+            if len(pids) == 2 and killed_pid not in pids:
+                break
+
+        self.assertEqual(len(pids), 2)
+        self.assertNotIn(killed_pid, pids)
+        self.assertIn('<h1>ok</h1>', frontik_workers_app.get_page_text('simple'))
+
+    def test_sigterm_stops_workers(self):
+        instance = FrontikTestInstance(frontik_workers_app.command)
+        instance.start()
+
+        try:
+            worker_pids = [s['pid'] for s in get_processes_status(instance)['statuses']]
+        finally:
+            instance.stop()
+
+        self.assertEqual(wait_for_exit(instance.popen, 10), 0)
+        self.assertFalse(any(is_running(pid) for pid in worker_pids))
+
+    def test_crashing_workers_stop_server(self):
+        popen = run_command(
+            './frontik-test --app=tests.projects.broken_async_init_app --config=tests/projects/frontik_debug.cfg '
+            '--workers=2',
+            find_free_port()
+        )
+
+        self.assertEqual(wait_for_exit(popen, 30), 0)
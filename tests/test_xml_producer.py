@@ -11,6 +11,10 @@ class TestXsl(unittest.TestCase):
         self.assertTrue(response.headers['content-type'].startswith('text/html'))
         self.assertEqual(response.content, b'<html><body><h1>ok</h1></body></html>\n')
 
+    def test_xsl_request_results(self):
+        response = frontik_test_app.get_page('xsl/request_results')
+        self.assertEqual(response.content, b'<html><body>' + b'\n<h1>ok</h1>' * 4 + b'\n</body></html>\n')
+
     def test_xsl_apply_error(self):
         response = frontik_test_app.get_page('xsl/apply_error')
         self.assertEqual(response.status_code, 500)